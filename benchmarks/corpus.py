@@ -0,0 +1,205 @@
+import datetime
+import os
+from collections.abc import Callable
+
+import numpy as np
+from PIL import Image
+
+from utils.audio import FORMATOS_AUDIO, converter_audio
+from utils.imagem import FORMATOS_IMAGEM
+from utils.video import FORMATOS_VIDEO, converter_video
+
+
+# Semente fixa para que o corpus seja o mesmo entre execuções e versões
+SEMENTE = 20241018
+
+TAMANHO_FOTO = (4000, 3000)
+DURACAO_AUDIO_SEGUNDOS = 60
+TAXA_AMOSTRAGEM = 44100
+TAMANHO_VIDEO = (640, 360)
+DURACAO_VIDEO_SEGUNDOS = 5
+FPS_VIDEO = 24
+# Clipe de referência da conversão em segmentos: longo o bastante para dividir, em
+# VP8 para que a conversão para mp4 precise recodificar
+TAMANHO_VIDEO_REFERENCIA = (1280, 720)
+DURACAO_VIDEO_REFERENCIA_SEGUNDOS = 60
+INTERVALO_QUADROS_CHAVE = 2 * FPS_VIDEO
+QUANTIDADE_CURRICULOS = 20
+
+
+def _gerar_foto() -> Image.Image:
+    """
+    Gera uma "foto" sintética: gradientes suaves com ruído, parecida com uma foto real
+    em termos de compressibilidade.
+    """
+    rng = np.random.default_rng(SEMENTE)
+    largura, altura = TAMANHO_FOTO
+    x = np.linspace(0, 1, largura, dtype=np.float32)
+    y = np.linspace(0, 1, altura, dtype=np.float32)[:, None]
+    canais = [
+        128 + 100 * np.sin(2 * np.pi * (x * 3 + y * 2)),
+        128 + 100 * np.cos(2 * np.pi * (x * 2 - y * 4)),
+        128 + 100 * np.sin(2 * np.pi * x * y * 6),
+    ]
+    pixels = np.stack(canais, axis=-1) + rng.normal(0, 12, (altura, largura, 3))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
+
+
+def preparar_imagens(diretorio: str) -> dict[str, str]:
+    """
+    Grava a foto sintética em todos os formatos de imagem suportados.
+
+    Params:
+        diretorio (str): Diretório do corpus.
+
+    Returns:
+        dict[str, str]: Caminho do arquivo de cada formato.
+    """
+    caminhos = {}
+    foto = _gerar_foto()
+    for formato in FORMATOS_IMAGEM:
+        caminhos[formato] = os.path.join(diretorio, f"foto.{formato}")
+        if not os.path.exists(caminhos[formato]):
+            foto.save(caminhos[formato], format=formato)
+    return caminhos
+
+
+def preparar_audios(diretorio: str) -> dict[str, str]:
+    """
+    Gera um áudio sintético (acordes com ruído) em todos os formatos de áudio suportados.
+
+    Params:
+        diretorio (str): Diretório do corpus.
+
+    Returns:
+        dict[str, str]: Caminho do arquivo de cada formato.
+    """
+    from pydub import AudioSegment
+
+    rng = np.random.default_rng(SEMENTE)
+    t = np.arange(DURACAO_AUDIO_SEGUNDOS * TAXA_AMOSTRAGEM) / TAXA_AMOSTRAGEM
+    sinal = sum(np.sin(2 * np.pi * f * t) for f in (220, 277.18, 329.63)) / 4
+    sinal = sinal * (0.6 + 0.4 * np.sin(2 * np.pi * 0.25 * t)) + rng.normal(0, 0.02, t.size)
+    amostras = (np.clip(sinal, -1, 1) * 32767).astype("<i2")
+    estereo = np.repeat(amostras[:, None], 2, axis=1)
+    segmento = AudioSegment(
+        estereo.tobytes(), frame_rate=TAXA_AMOSTRAGEM, sample_width=2, channels=2
+    )
+
+    caminhos = {"wav": os.path.join(diretorio, "audio.wav")}
+    if not os.path.exists(caminhos["wav"]):
+        segmento.export(caminhos["wav"], format="wav")
+    with open(caminhos["wav"], "rb") as wav:
+        dados_wav = wav.read()
+    for formato in FORMATOS_AUDIO:
+        caminhos[formato] = os.path.join(diretorio, f"audio.{formato}")
+        if not os.path.exists(caminhos[formato]):
+            with open(caminhos[formato], "wb") as arquivo:
+                arquivo.write(converter_audio(dados_wav, formato))
+    return caminhos
+
+
+def _gerador_quadros(largura: int, altura: int) -> Callable[[float], np.ndarray]:
+    x = np.arange(largura)[None, :]
+    y = np.arange(altura)[:, None]
+
+    def gerar_quadro(t: float) -> np.ndarray:
+        deslocamento = int(t * 120)
+        r = (x + deslocamento) % 256
+        g = (y * 2 + deslocamento) % 256
+        b = ((x // 40 + y // 40 + int(t * 4)) % 2) * 200
+        return np.stack(np.broadcast_arrays(r, g, b), axis=-1).astype(np.uint8)
+
+    return gerar_quadro
+
+
+def preparar_video_referencia(diretorio: str) -> str:
+    """
+    Gera o clipe de referência da comparação entre a conversão sequencial e a em segmentos.
+
+    Params:
+        diretorio (str): Diretório do corpus.
+
+    Returns:
+        str: Caminho do clipe (webm, VP8, com quadros-chave a cada 2 segundos).
+    """
+    from moviepy.editor import VideoClip
+
+    caminho = os.path.join(diretorio, "referencia.webm")
+    if not os.path.exists(caminho):
+        clip = VideoClip(_gerador_quadros(*TAMANHO_VIDEO_REFERENCIA), duration=DURACAO_VIDEO_REFERENCIA_SEGUNDOS)
+        clip.write_videofile(
+            caminho,
+            fps=FPS_VIDEO,
+            codec="libvpx",
+            ffmpeg_params=["-g", str(INTERVALO_QUADROS_CHAVE)],
+            logger=None,
+        )
+        clip.close()
+    return caminho
+
+
+def preparar_videos(diretorio: str) -> dict[str, str]:
+    """
+    Gera um vídeo sintético com movimento em todos os formatos de vídeo suportados.
+
+    Params:
+        diretorio (str): Diretório do corpus.
+
+    Returns:
+        dict[str, str]: Caminho do arquivo de cada formato.
+    """
+    from moviepy.editor import VideoClip
+
+    caminhos = {"mp4": os.path.join(diretorio, "video.mp4")}
+    if not os.path.exists(caminhos["mp4"]):
+        clip = VideoClip(_gerador_quadros(*TAMANHO_VIDEO), duration=DURACAO_VIDEO_SEGUNDOS)
+        clip.write_videofile(caminhos["mp4"], fps=FPS_VIDEO, codec="libx264", logger=None)
+        clip.close()
+    for formato in FORMATOS_VIDEO:
+        caminhos[formato] = os.path.join(diretorio, f"video.{formato}")
+        if not os.path.exists(caminhos[formato]):
+            converter_video(caminhos["mp4"], caminhos[formato], formato)
+    return caminhos
+
+
+def gerar_curriculos() -> list[dict]:
+    """
+    Gera currículos sintéticos com a mesma estrutura usada em gerar_curriculo.
+
+    Returns:
+        list[dict]: Currículos com as chaves dados_basicos, experiencias, formacoes e habilidades.
+    """
+    curriculos = []
+    for n in range(QUANTIDADE_CURRICULOS):
+        curriculos.append({
+            "dados_basicos": {
+                "Nome Completo": f"Pessoa de Teste {n}",
+                "Data de Nascimento": datetime.date(1990, 1 + n % 12, 1 + n % 28),
+                "Celular": f"(11) 9{n:04d}-0000",
+                "Email": f"pessoa{n}@exemplo.com",
+                "Cargo Desejado": "Analista de Sistemas",
+            },
+            "experiencias": [
+                {
+                    "Empresa": f"Empresa {i}",
+                    "Cargo": "Desenvolvedor",
+                    "Admissão": datetime.date(2010 + i, 1, 1),
+                    "Demissão": datetime.date(2011 + i, 12, 31) if i < 2 else None,
+                    "Descrição": "Desenvolvimento e manutenção de sistemas. " * (1 + n % 5),
+                }
+                for i in range(3)
+            ],
+            "formacoes": [
+                {
+                    "Instituição": "Universidade de Teste",
+                    "Curso": "Ciência da Computação",
+                    "Nível": "Ensino Superior",
+                    "Ano de Início": 2008,
+                    "Ano de Término": 2012,
+                    "Situação": "Concluído",
+                }
+            ],
+            "habilidades": ["python", "sql", "git", "docker"][: 1 + n % 4],
+        })
+    return curriculos
@@ -0,0 +1,293 @@
+"""
+Benchmark das conversões sobre um corpus sintético fixo.
+
+Mede latência (mediana), vazão (MB/s da entrada) e pico de memória de cada par de
+formatos de imagem, áudio e vídeo, e da geração de currículos em PDF. Cada caso
+roda em um processo novo, para que o pico de memória de um não contamine o outro.
+
+O grupo video_paralelo compara a conversão de vídeo sequencial com a conversão em
+segmentos paralelos em um clipe de referência de 60 segundos.
+
+Uso:
+    python -m benchmarks.executar --saida resultados.json
+    python -m benchmarks.executar --grupos imagem audio --comparar resultados.json
+    python -m benchmarks.executar --grupos video_paralelo --repeticoes 1
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from benchmarks import corpus
+
+
+GRUPOS = ["imagem", "audio", "video", "video_paralelo", "curriculo"]
+DIRETORIO_CORPUS = os.path.join(tempfile.gettempdir(), "detudo-benchmark-corpus")
+
+
+def _pico_memoria_mb() -> float:
+    """
+    Retorna o maior uso de memória (RSS) do processo e dos subprocessos (ex.: ffmpeg).
+    """
+    proprio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(proprio, filhos) / 1024  # ru_maxrss vem em KiB no Linux
+
+
+def _cronometrar(funcao: Callable[[], int], repeticoes: int) -> dict:
+    """
+    Executa a função várias vezes e mede tempo e memória.
+
+    Params:
+        funcao (Callable[[], int]): Função a medir, que retorna o tamanho da saída em bytes.
+        repeticoes (int): Quantidade de execuções.
+
+    Returns:
+        dict: Latências, tamanho da saída e crescimento do pico de memória.
+    """
+    memoria_inicial = _pico_memoria_mb()
+    latencias = []
+    tamanho_saida = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        tamanho_saida = funcao()
+        latencias.append(time.perf_counter() - inicio)
+    return {
+        "latencias_s": latencias,
+        "tamanho_saida": tamanho_saida,
+        "pico_memoria_mb": round(max(0.0, _pico_memoria_mb() - memoria_inicial), 1),
+    }
+
+
+def _medir_imagem(caminho: str, destino: str, repeticoes: int) -> dict:
+    from utils.imagem import converter_imagem
+
+    with open(caminho, "rb") as arquivo:
+        dados = arquivo.read()
+    return _cronometrar(lambda: len(converter_imagem(dados, destino)), repeticoes)
+
+
+def _medir_audio(caminho: str, destino: str, repeticoes: int) -> dict:
+    from utils.audio import converter_audio
+
+    with open(caminho, "rb") as arquivo:
+        dados = arquivo.read()
+    return _cronometrar(lambda: len(converter_audio(dados, destino)), repeticoes)
+
+
+def _medir_video(caminho: str, destino: str, repeticoes: int) -> dict:
+    from utils.video import converter_video
+
+    saida = os.path.join(tempfile.mkdtemp(), f"saida.{destino}")
+
+    def converter() -> int:
+        converter_video(caminho, saida, destino)
+        return os.path.getsize(saida)
+
+    try:
+        return _cronometrar(converter, repeticoes)
+    finally:
+        os.remove(saida)
+
+
+def _medir_video_paralelo(caminho: str, destino: str, metodo: str, repeticoes: int) -> dict:
+    from utils.video import converter_video, converter_video_paralelo
+
+    converter = converter_video_paralelo if metodo == "segmentos" else converter_video
+    saida = os.path.join(tempfile.mkdtemp(), f"saida.{destino}")
+
+    def medir() -> int:
+        converter(caminho, saida, destino)
+        return os.path.getsize(saida)
+
+    try:
+        return _cronometrar(medir, repeticoes)
+    finally:
+        os.remove(saida)
+
+
+def _medir_curriculo(repeticoes: int) -> dict:
+    from utils.curriculo import gerar_html, gerar_pdf
+
+    curriculos = corpus.gerar_curriculos()
+
+    def gerar() -> int:
+        return sum(len(gerar_pdf(gerar_html(**curriculo))) for curriculo in curriculos)
+
+    return _cronometrar(gerar, repeticoes)
+
+
+def listar_casos(grupos: list[str]) -> list[dict]:
+    """
+    Prepara o corpus e lista os casos de cada grupo.
+
+    Params:
+        grupos (list[str]): Grupos a medir (ver GRUPOS).
+
+    Returns:
+        list[dict]: Um caso por par de formatos (ou um por grupo, no caso do currículo).
+    """
+    os.makedirs(DIRETORIO_CORPUS, exist_ok=True)
+    preparar = {
+        "imagem": corpus.preparar_imagens,
+        "audio": corpus.preparar_audios,
+        "video": corpus.preparar_videos,
+    }
+    casos = []
+    for grupo in grupos:
+        if grupo == "curriculo":
+            casos.append({
+                "grupo": grupo,
+                "caso": f"curriculo->pdf x{corpus.QUANTIDADE_CURRICULOS}",
+                "entrada": None,
+                "destino": "pdf",
+            })
+            continue
+        if grupo == "video_paralelo":
+            referencia = corpus.preparar_video_referencia(DIRETORIO_CORPUS)
+            for metodo in ("sequencial", "segmentos"):
+                casos.append({
+                    "grupo": grupo,
+                    "caso": f"webm->mp4 {metodo}",
+                    "entrada": referencia,
+                    "destino": "mp4",
+                    "metodo": metodo,
+                })
+            continue
+        caminhos = preparar[grupo](DIRETORIO_CORPUS)
+        for origem, caminho in caminhos.items():
+            for destino in caminhos:
+                if origem != destino:
+                    casos.append({
+                        "grupo": grupo,
+                        "caso": f"{origem}->{destino}",
+                        "entrada": caminho,
+                        "destino": destino,
+                    })
+    return casos
+
+
+def medir_caso(caso: dict, repeticoes: int) -> dict:
+    """
+    Mede um caso. Deve rodar em um processo novo.
+
+    Params:
+        caso (dict): Caso retornado por listar_casos.
+        repeticoes (int): Quantidade de execuções.
+
+    Returns:
+        dict: Caso com latência mediana, vazão e pico de memória.
+    """
+    if caso["grupo"] == "curriculo":
+        medicao = _medir_curriculo(repeticoes)
+        tamanho_entrada = 0
+    elif caso["grupo"] == "video_paralelo":
+        medicao = _medir_video_paralelo(caso["entrada"], caso["destino"], caso["metodo"], repeticoes)
+        tamanho_entrada = os.path.getsize(caso["entrada"])
+    else:
+        medir = {"imagem": _medir_imagem, "audio": _medir_audio, "video": _medir_video}
+        medicao = medir[caso["grupo"]](caso["entrada"], caso["destino"], repeticoes)
+        tamanho_entrada = os.path.getsize(caso["entrada"])
+
+    mediana = statistics.median(medicao["latencias_s"])
+    return {
+        **caso,
+        "tamanho_entrada": tamanho_entrada,
+        "tamanho_saida": medicao["tamanho_saida"],
+        "latencia_mediana_s": round(mediana, 4),
+        "latencia_min_s": round(min(medicao["latencias_s"]), 4),
+        "vazao_mb_s": round(tamanho_entrada / 1024 ** 2 / mediana, 2) if mediana else 0,
+        "pico_memoria_mb": medicao["pico_memoria_mb"],
+    }
+
+
+def comparar(atuais: list[dict], referencia: list[dict], tolerancia: float) -> list[str]:
+    """
+    Compara os resultados com uma execução anterior.
+
+    Params:
+        atuais (list[dict]): Resultados desta execução.
+        referencia (list[dict]): Resultados da execução de referência.
+        tolerancia (float): Piora relativa aceita (ex.: 0.15 para 15%).
+
+    Returns:
+        list[str]: Descrição de cada regressão encontrada.
+    """
+    anteriores = {(r["grupo"], r["caso"]): r for r in referencia}
+    regressoes = []
+    for atual in atuais:
+        if not (anterior := anteriores.get((atual["grupo"], atual["caso"]))):
+            continue
+        for metrica in ("latencia_mediana_s", "pico_memoria_mb"):
+            if anterior[metrica] and atual[metrica] > anterior[metrica] * (1 + tolerancia):
+                regressoes.append(
+                    f"{atual['grupo']} {atual['caso']}: {metrica} "
+                    f"{anterior[metrica]} -> {atual[metrica]}"
+                )
+    return regressoes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grupos", nargs="+", choices=GRUPOS, default=GRUPOS)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--saida", help="Arquivo JSON onde os resultados serão gravados.")
+    parser.add_argument("--comparar", help="Arquivo JSON de uma execução anterior.")
+    parser.add_argument("--tolerancia", type=float, default=0.15)
+    args = parser.parse_args()
+
+    resultados = []
+    contexto = get_context("spawn")
+    for caso in listar_casos(args.grupos):
+        with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as pool:
+            resultado = pool.submit(medir_caso, caso, args.repeticoes).result()
+        resultados.append(resultado)
+        print(
+            f"{resultado['grupo']:<10} {resultado['caso']:<24} "
+            f"{resultado['latencia_mediana_s']:>9.4f}s "
+            f"{resultado['vazao_mb_s']:>9.2f} MB/s "
+            f"{resultado['pico_memoria_mb']:>9.1f} MB"
+        )
+
+    # Ganho da conversão em segmentos sobre a sequencial
+    paralelos = {r["metodo"]: r for r in resultados if r["grupo"] == "video_paralelo"}
+    if len(paralelos) == 2 and paralelos["segmentos"]["latencia_mediana_s"]:
+        aceleracao = paralelos["sequencial"]["latencia_mediana_s"] / paralelos["segmentos"]["latencia_mediana_s"]
+        print(f"\nConversão em segmentos: {aceleracao:.2f}x mais rápida que a sequencial.")
+
+    if args.saida:
+        with open(args.saida, "w") as arquivo:
+            json.dump(
+                {
+                    "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "plataforma": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "repeticoes": args.repeticoes,
+                    "resultados": resultados,
+                },
+                arquivo,
+                indent=2,
+            )
+
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            referencia = json.load(arquivo)["resultados"]
+        if regressoes := comparar(resultados, referencia, args.tolerancia):
+            print("\nRegressões:")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            return 1
+        print("\nNenhuma regressão encontrada.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,8 +1,23 @@
-from io import BytesIO
+import os
+import time
+from typing import BinaryIO
 
 import streamlit as st
 from loguru import logger
-from pydub import AudioSegment
+
+from utils.audio import (
+    FORMATOS_AUDIO,
+    FORMATOS_AUDIO_PARALELO,
+    calcular_forma_de_onda,
+    estimar_espaco_audio,
+    transcodificar_audio,
+    transcodificar_audio_paralelo,
+)
+from utils.cache import hash_conteudo, obter_cache_conversao
+from utils.compactacao import ZipEmDisco
+from utils.processos import MAX_PROCESSOS, mapear_em_pool
+from utils.resultados import botao_baixar_resultado, guardar_resultado
+from utils.temporarios import EspacoInsuficiente, reservar_temporarios
 
 
 # Informação da página
@@ -10,6 +25,49 @@ st.header("Converter áudio")
 st.write("Converta áudio com rapidez e qualidade.")
 
 
+@st.cache_data(max_entries=32, show_spinner=False)
+def obter_forma_de_onda(hash_audio: str, _audio: BinaryIO) -> dict:
+    picos, duracao = calcular_forma_de_onda(_audio)
+    passo = duracao / len(picos) if len(picos) else 0
+    return {
+        "Tempo (s)": [round(n * passo, 2) for n in range(len(picos))],
+        "Máximo": picos[:, 1].tolist(),
+        "Mínimo": picos[:, 0].tolist(),
+    }
+
+
+def converter_em_segmentos(diretorio: str, caminho_saida: str) -> None:
+    """
+    Converte o áudio em segmentos paralelos e, se pedido, mede o ganho sobre a
+    conversão em um único processo.
+
+    Params:
+        diretorio (str): Diretório temporário da conversão.
+        caminho_saida (str): Caminho onde o áudio convertido será gravado.
+    """
+    # Os segmentos são lidos por vários processos, então o upload vai para o disco
+    entrada = os.path.join(diretorio, f"entrada_{audio.name}")
+    with open(entrada, "wb") as arquivo:
+        arquivo.write(audio.getbuffer())
+
+    inicio = time.perf_counter()
+    segmentos = transcodificar_audio_paralelo(
+        entrada, caminho_saida, converter_para, diretorio_temporario=diretorio
+    )
+    tempo_paralelo = time.perf_counter() - inicio
+
+    tempo_sequencial = None
+    if comparar:
+        inicio = time.perf_counter()
+        transcodificar_audio(entrada, os.path.join(diretorio, f"sequencial.{converter_para}"), converter_para)
+        tempo_sequencial = time.perf_counter() - inicio
+    st.session_state["converter_audio.aceleracao"] = {
+        "segmentos": segmentos,
+        "tempo_paralelo": tempo_paralelo,
+        "tempo_sequencial": tempo_sequencial,
+    }
+
+
 def converter_audio() -> None:
     if f"audio/{converter_para}" == audio.type:
         st.toast(
@@ -20,23 +78,51 @@ def converter_audio() -> None:
     try:
         botao_converter.status("Convertendo áudio...")
         botao_baixar_novo_audio.empty()
+        st.session_state.pop("converter_audio.aceleracao", None)
 
-        audio_segment = AudioSegment.from_file(audio)
-        novo_audio_bytes = BytesIO()
-        audio_segment.export(novo_audio_bytes, format=converter_para)
-        novo_audio_bytes.seek(0)  # Reseta o ponteiro
-
+        cache = obter_cache_conversao()
+        # O modo entra na chave, para o resultado de um modo não ser servido no outro
+        chave = cache.gerar_chave(
+            hash_conteudo(audio.getbuffer()),
+            converter_para,
+            {"paralelo": paralelo},
+        )
         novo_nome = f"{audio.name.rsplit('.', 1)[0]}.{converter_para}"
         novo_formato = f"audio/{converter_para}"
-        st.session_state["converter_audio.botao_baixar_novo_audio"] = (
-            lambda: st.download_button(
-                f"Baixar áudio {converter_para}",
-                data=novo_audio_bytes.getvalue(),
-                file_name=novo_nome,
-                mime=novo_formato,
-            )
-        )
+        # A comparação precisa converter de novo, mesmo que o resultado esteja no cache
+        arquivo_cache = None if paralelo and comparar else cache.abrir(chave)
+        if arquivo_cache is not None:
+            with arquivo_cache:
+                guardar_resultado(
+                    "converter_audio.resultado",
+                    arquivo_cache,
+                    nome_arquivo=novo_nome,
+                    mime=novo_formato,
+                    rotulo=f"Baixar áudio {converter_para}",
+                )
+        else:
+            espaco = estimar_espaco_audio(audio.size, converter_para, paralelo)
+            if paralelo and comparar:
+                # A comparação grava uma segunda saída
+                espaco *= 2
+            with reservar_temporarios(espaco) as diretorio:
+                novo_audio = os.path.join(diretorio, novo_nome)
+                if paralelo:
+                    converter_em_segmentos(diretorio, novo_audio)
+                else:
+                    # O ffmpeg lê o upload em blocos e grava a saída direto em disco
+                    transcodificar_audio(audio, novo_audio, converter_para)
+                cache.salvar_arquivo(chave, novo_audio)
+                guardar_resultado(
+                    "converter_audio.resultado",
+                    novo_audio,
+                    nome_arquivo=novo_nome,
+                    mime=novo_formato,
+                    rotulo=f"Baixar áudio {converter_para}",
+                )
         st.toast(f"Aúdio convertido para {converter_para}.", icon="✅")
+    except EspacoInsuficiente as ex:
+        st.toast(str(ex), icon="❌")
     except Exception as ex:
         logger.error(ex)
         st.toast(
@@ -45,29 +131,194 @@ def converter_audio() -> None:
         )
 
 
-opcoes_conversao = [
-    "ac3",
-    "aiff",
-    "flac",
-    "mp3",
-    "ogg",
-    "opus",
-    "wav",
-]
+def converter_audios() -> None:
+    try:
+        botao_baixar_novo_audio.empty()
+        inicio = time.perf_counter()
+
+        cache = obter_cache_conversao()
+        situacoes = [{"Arquivo": audio.name, "Situação": "Na fila", "Tempo (s)": None} for audio in audios]
+        convertidos = 0
+        arquivo_zip = ZipEmDisco()
+
+        def atualizar_situacao(indice: int, situacao: str, tempo: float | None = None) -> None:
+            situacoes[indice]["Situação"] = situacao
+            situacoes[indice]["Tempo (s)"] = round(tempo, 1) if tempo is not None else None
+            tabela_situacao.dataframe(situacoes, use_container_width=True, hide_index=True)
+            finalizados = sum(linha["Situação"] not in ("Na fila", "Convertendo") for linha in situacoes)
+            botao_converter.status(
+                f"Convertendo áudios... {finalizados}/{len(audios)} "
+                f"({time.perf_counter() - inicio:.0f}s)"
+            )
+
+        # Reserva o espaço das conversões simultâneas, com os maiores arquivos do lote
+        maiores = sorted((audio.size for audio in audios), reverse=True)[:conversoes_simultaneas]
+        espaco = sum(estimar_espaco_audio(tamanho, converter_para) for tamanho in maiores)
+        with reservar_temporarios(espaco) as diretorio, arquivo_zip:
+            # Áudios já convertidos antes saem direto do cache
+            pendentes = []
+            for indice, audio in enumerate(audios):
+                novo_nome = f"{audio.name.rsplit('.', 1)[0]}.{converter_para}"
+                if audio.name.rsplit(".", 1)[-1].lower() == converter_para:
+                    atualizar_situacao(indice, "Ignorado: já está no formato")
+                    continue
+                chave = cache.gerar_chave(
+                    hash_conteudo(audio.getbuffer()),
+                    converter_para,
+                    {"paralelo": False},
+                )
+                if arquivo_cache := cache.abrir(chave):
+                    with arquivo_cache:
+                        arquivo_zip.adicionar_fluxo(novo_nome, arquivo_cache)
+                    convertidos += 1
+                    atualizar_situacao(indice, "Concluído (cache)", 0)
+                else:
+                    pendentes.append((indice, chave, novo_nome))
+
+            # Cada upload só vai para o disco quando a sua conversão é enviada ao pool
+            enviados_em = {}
+
+            def enviar_pendentes():
+                for indice, _, novo_nome in pendentes:
+                    entrada = os.path.join(diretorio, f"{indice}_entrada")
+                    with open(entrada, "wb") as arquivo:
+                        arquivo.write(audios[indice].getbuffer())
+                    enviados_em[indice] = time.perf_counter()
+                    atualizar_situacao(indice, "Convertendo")
+                    yield entrada, os.path.join(diretorio, f"{indice}_{novo_nome}"), converter_para
+
+            for posicao, futuro in mapear_em_pool(
+                transcodificar_audio, enviar_pendentes(), janela=conversoes_simultaneas
+            ):
+                indice, chave, novo_nome = pendentes[posicao]
+                entrada = os.path.join(diretorio, f"{indice}_entrada")
+                saida = os.path.join(diretorio, f"{indice}_{novo_nome}")
+                tempo = time.perf_counter() - enviados_em[indice]
+                try:
+                    futuro.result()
+                    cache.salvar_arquivo(chave, saida)
+                    arquivo_zip.adicionar_arquivo(novo_nome, saida)
+                    convertidos += 1
+                    atualizar_situacao(indice, "Concluído", tempo)
+                except Exception as ex:
+                    logger.error(f"{audios[indice].name}: {ex}")
+                    atualizar_situacao(indice, f"Erro: {ex}", tempo)
+                finally:
+                    for caminho in (entrada, saida):
+                        if os.path.exists(caminho):
+                            os.remove(caminho)
+
+        duracao = time.perf_counter() - inicio
+        st.session_state["converter_audio.situacao_lote"] = {
+            "linhas": situacoes,
+            "convertidos": convertidos,
+            "duracao": duracao,
+        }
+        if convertidos:
+            guardar_resultado(
+                "converter_audio.resultado",
+                arquivo_zip.arquivo,
+                nome_arquivo=f"audios_{converter_para}.zip",
+                mime="application/zip",
+                rotulo=f"Baixar {convertidos} áudios {converter_para} (ZIP)",
+            )
+        arquivo_zip.descartar()
+        st.toast(
+            f"{convertidos} de {len(audios)} áudios convertidos em {duracao:.1f}s.",
+            icon="✅" if convertidos == len(audios) else "⚠️",
+        )
+    except EspacoInsuficiente as ex:
+        st.toast(str(ex), icon="❌")
+    except Exception as ex:
+        logger.error(ex)
+        st.toast(
+            "Ocorreu um erro ao converter os áudios. Tente novamente.",
+            icon="❌",
+        )
+
+
+opcoes_conversao = FORMATOS_AUDIO
 
 
 # Página
-audio = st.file_uploader("Escolha um áudio", type=opcoes_conversao)
-if audio:
-    st.audio(audio, format=audio.type)
-converter_para = st.selectbox(
-    "Converter para", options=opcoes_conversao, disabled=not audio
+em_lote = st.toggle(
+    "Converter vários áudios",
+    help="Converte vários áudios ao mesmo tempo e baixa o resultado em um arquivo ZIP.",
 )
-botao_converter = st.empty()
-botao_converter.button("Converter áudio", on_click=converter_audio, disabled=not audio)
+if em_lote:
+    audios = st.file_uploader(
+        "Escolha os áudios", type=opcoes_conversao, accept_multiple_files=True
+    )
+    converter_para = st.selectbox(
+        "Converter para", options=opcoes_conversao, disabled=not audios
+    )
+    conversoes_simultaneas = st.slider(
+        "Conversões simultâneas",
+        min_value=1,
+        max_value=max(2, MAX_PROCESSOS),
+        value=MAX_PROCESSOS,
+        disabled=not audios,
+        help="Quantos áudios são convertidos ao mesmo tempo. Cada conversão ocupa um núcleo.",
+    )
+    botao_converter = st.empty()
+    botao_converter.button(
+        "Converter áudios", on_click=converter_audios, disabled=not audios
+    )
+    tabela_situacao = st.empty()
+    if situacao_lote := st.session_state.get("converter_audio.situacao_lote"):
+        tabela_situacao.dataframe(situacao_lote["linhas"], use_container_width=True, hide_index=True)
+        st.caption(
+            f"{situacao_lote['convertidos']} de {len(situacao_lote['linhas'])} áudios "
+            f"convertidos em {situacao_lote['duracao']:.1f}s."
+        )
+else:
+    audio = st.file_uploader("Escolha um áudio", type=opcoes_conversao)
+    if audio:
+        # Só os picos vão para o navegador; o áudio inteiro apenas se a pessoa quiser ouvir
+        try:
+            st.line_chart(
+                obter_forma_de_onda(hash_conteudo(audio.getbuffer()), audio),
+                x="Tempo (s)",
+                y=["Máximo", "Mínimo"],
+                height=160,
+            )
+        except Exception as ex:
+            logger.error(ex)
+            st.warning("Não foi possível gerar a forma de onda do áudio.")
+        if st.checkbox("Ouvir áudio"):
+            st.audio(audio, format=audio.type)
+    converter_para = st.selectbox(
+        "Converter para", options=opcoes_conversao, disabled=not audio
+    )
+    # Só o flac ganha com a divisão (ver FORMATOS_AUDIO_PARALELO)
+    pode_paralelo = converter_para in FORMATOS_AUDIO_PARALELO
+    paralelo = st.toggle(
+        "Conversão paralela",
+        help=(
+            "Divide áudios longos em segmentos convertidos ao mesmo tempo em vários núcleos. "
+            f"Disponível só para {', '.join(FORMATOS_AUDIO_PARALELO)}: wav e aiff já são "
+            "gravados quase sem custo, e nos formatos com perda (mp3, ogg, opus, ac3) as "
+            "emendas entre segmentos ficariam audíveis, então eles são convertidos em um processo."
+        ),
+        disabled=not audio or not pode_paralelo,
+    ) and pode_paralelo
+    if paralelo:
+        comparar = st.checkbox(
+            "Comparar com a conversão em um processo",
+            help="Converte também da forma tradicional para medir o ganho. Leva mais tempo.",
+        )
+    botao_converter = st.empty()
+    botao_converter.button("Converter áudio", on_click=converter_audio, disabled=not audio)
+    if paralelo and (aceleracao := st.session_state.get("converter_audio.aceleracao")):
+        col_segmentos, col_tempo, col_ganho = st.columns(3)
+        col_segmentos.metric("Segmentos", aceleracao["segmentos"])
+        col_tempo.metric("Tempo", f"{aceleracao['tempo_paralelo']:.1f}s")
+        if aceleracao["tempo_sequencial"]:
+            col_ganho.metric(
+                "Aceleração",
+                f"{aceleracao['tempo_sequencial'] / aceleracao['tempo_paralelo']:.1f}x",
+                help=f"Em um processo: {aceleracao['tempo_sequencial']:.1f}s",
+            )
 botao_baixar_novo_audio = st.empty()
-if _botao_baixar_novo_audio := st.session_state.get(
-    "converter_audio.botao_baixar_novo_audio"
-):
-    with botao_baixar_novo_audio.container():
-        _botao_baixar_novo_audio()
+with botao_baixar_novo_audio.container():
+    botao_baixar_resultado("converter_audio.resultado")
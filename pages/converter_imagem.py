@@ -1,8 +1,14 @@
-from io import BytesIO
+import time
 
 import streamlit as st
 from loguru import logger
-from PIL import Image
+
+from utils.cache import hash_conteudo, obter_cache_conversao
+from utils.compactacao import ZipEmDisco
+from utils.imagem import FORMATOS_IMAGEM, ImagemGrandeDemais, converter_imagem as converter_imagem_bytes
+from utils.imagem import NOMES_PREDEFINICOES, PREDEFINICOES, gerar_miniatura, medir_predefinicao
+from utils.processos import executar_em_pool, mapear_em_pool
+from utils.resultados import botao_baixar_resultado, guardar_resultado
 
 
 # Informação da página
@@ -10,6 +16,11 @@ st.header("Converter imagem")
 st.write("Converta imagem com rapidez e qualidade.")
 
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def obter_miniatura(hash_imagem: str, _dados: memoryview) -> bytes:
+    return gerar_miniatura(_dados)
+
+
 def converter_imagem() -> None:
     if f"image/{converter_para}" == imagem.type:
         st.toast(
@@ -21,26 +32,36 @@ def converter_imagem() -> None:
         botao_converter.status("Convertendo imagem...")
         botao_baixar_nova_imagem.empty()
 
-        with Image.open(imagem) as i:
-            # Se a imagem tiver um canal alfa, converta para RGB antes de salvar em JPEG
-            if converter_para == "jpeg" and i.mode == "RGBA":
-                i = i.convert("RGB")
-
-            nova_imagem_bytes = BytesIO()
-            i.save(nova_imagem_bytes, format=converter_para)
-            nova_imagem_bytes.seek(0)  # Reseta o ponteiro
-
-            novo_nome = f"{imagem.name.rsplit('.', 1)[0]}.{converter_para}"
-            novo_formato = f"image/{converter_para}"
-            st.session_state["converter_imagem.botao_baixar_nova_imagem"] = (
-                lambda: st.download_button(
-                    f"Baixar imagem {converter_para}",
-                    data=nova_imagem_bytes.getvalue(),
-                    file_name=novo_nome,
-                    mime=novo_formato,
-                )
+        cache = obter_cache_conversao()
+        chave = cache.gerar_chave(
+            hash_conteudo(imagem.getbuffer()),
+            converter_para,
+            {"imagem_grande": imagem_grande, "predefinicao": predefinicao},
+        )
+        nova_imagem_bytes = cache.obter(chave)
+        if nova_imagem_bytes is None:
+            # Converte em outro processo para que uma imagem enorme não derrube o servidor
+            nova_imagem_bytes = executar_em_pool(
+                converter_imagem_bytes,
+                imagem.getvalue(),
+                converter_para,
+                imagem_grande,
+                predefinicao,
             )
-            st.toast(f"Imagem convertida para {converter_para}.", icon="✅")
+            cache.salvar(chave, nova_imagem_bytes)
+
+        novo_nome = f"{imagem.name.rsplit('.', 1)[0]}.{converter_para}"
+        novo_formato = f"image/{converter_para}"
+        guardar_resultado(
+            "converter_imagem.resultado",
+            nova_imagem_bytes,
+            nome_arquivo=novo_nome,
+            mime=novo_formato,
+            rotulo=f"Baixar imagem {converter_para}",
+        )
+        st.toast(f"Imagem convertida para {converter_para}.", icon="✅")
+    except ImagemGrandeDemais as ex:
+        st.toast(str(ex), icon="❌")
     except Exception as ex:
         logger.error(ex)
         st.toast(
@@ -49,22 +70,178 @@ def converter_imagem() -> None:
         )
 
 
-opcoes_conversao = ["jpeg", "png", "bmp", "webp"]
+def converter_imagens() -> None:
+    try:
+        botao_baixar_nova_imagem.empty()
+        progresso = botao_converter.progress(0, text="Convertendo imagens...")
+        inicio = time.perf_counter()
+
+        cache = obter_cache_conversao()
+        erros = []
+        concluidas = 0
+        arquivo_zip = ZipEmDisco()
+
+        def atualizar_progresso() -> None:
+            progresso.progress(
+                concluidas / len(imagens),
+                text=f"Convertendo imagens... {concluidas}/{len(imagens)}",
+            )
+
+        with arquivo_zip:
+            # Imagens já convertidas antes saem direto do cache
+            pendentes = []
+            for indice, imagem in enumerate(imagens):
+                chave = cache.gerar_chave(
+                    hash_conteudo(imagem.getbuffer()),
+                    converter_para,
+                    {"imagem_grande": imagem_grande, "predefinicao": predefinicao},
+                )
+                novo_nome = f"{imagem.name.rsplit('.', 1)[0]}.{converter_para}"
+                if arquivo_cache := cache.abrir(chave):
+                    with arquivo_cache:
+                        arquivo_zip.adicionar_fluxo(novo_nome, arquivo_cache)
+                    concluidas += 1
+                    atualizar_progresso()
+                else:
+                    pendentes.append((indice, chave, novo_nome))
+
+            # Os bytes de cada imagem só são lidos quando a tarefa é enviada ao pool
+            argumentos = (
+                (imagens[indice].getvalue(), converter_para, imagem_grande, predefinicao)
+                for indice, _, _ in pendentes
+            )
+            for posicao, futuro in mapear_em_pool(converter_imagem_bytes, argumentos):
+                indice, chave, novo_nome = pendentes[posicao]
+                imagem = imagens[indice]
+                try:
+                    nova_imagem = futuro.result()
+                    cache.salvar(chave, nova_imagem)
+                    # Cada resultado vai direto para o ZIP e é descartado em seguida
+                    arquivo_zip.adicionar(novo_nome, nova_imagem)
+                except Exception as ex:
+                    logger.error(f"{imagem.name}: {ex}")
+                    erros.append({"Arquivo": imagem.name, "Erro": str(ex)})
+                concluidas += 1
+                atualizar_progresso()
+        logger.debug(f"Cache de conversão: {cache.estatisticas()}")
+
+        duracao = time.perf_counter() - inicio
+        convertidas = len(imagens) - len(erros)
+        st.session_state["converter_imagem.erros_lote"] = erros
+        if convertidas:
+            guardar_resultado(
+                "converter_imagem.resultado",
+                arquivo_zip.arquivo,
+                nome_arquivo=f"imagens_{converter_para}.zip",
+                mime="application/zip",
+                rotulo=f"Baixar {convertidas} imagens {converter_para} (ZIP)",
+            )
+        arquivo_zip.descartar()
+        st.toast(
+            f"{convertidas} de {len(imagens)} imagens convertidas em {duracao:.1f}s.",
+            icon="✅" if not erros else "⚠️",
+        )
+    except Exception as ex:
+        logger.error(ex)
+        st.toast(
+            "Ocorreu um erro ao converter as imagens. Tente novamente.",
+            icon="❌",
+        )
+
+
+def comparar_predefinicoes() -> None:
+    try:
+        botao_comparar.status("Comparando predefinições...")
+        argumentos = [
+            (imagem.getvalue(), converter_para, imagem_grande, nome)
+            for nome in PREDEFINICOES
+        ]
+        comparacao = []
+        for _, futuro in mapear_em_pool(medir_predefinicao, argumentos):
+            medicao = futuro.result()
+            comparacao.append({
+                "Predefinição": NOMES_PREDEFINICOES[medicao["predefinicao"]],
+                "Tamanho (KB)": round(medicao["tamanho"] / 1024, 1),
+                "Tamanho (% do original)": round(100 * medicao["tamanho"] / imagem.size, 1),
+                "Tempo de codificação (ms)": round(medicao["tempo_s"] * 1000, 1),
+            })
+        comparacao.sort(key=lambda linha: linha["Tamanho (KB)"])
+        st.session_state["converter_imagem.comparacao"] = {
+            "formato": converter_para,
+            "linhas": comparacao,
+        }
+    except ImagemGrandeDemais as ex:
+        st.toast(str(ex), icon="❌")
+    except Exception as ex:
+        logger.error(ex)
+        st.toast(
+            "Ocorreu um erro ao comparar as predefinições. Tente novamente.",
+            icon="❌",
+        )
+
+
+opcoes_conversao = FORMATOS_IMAGEM
 
 # Página
-imagem = st.file_uploader("Escolha uma imagem", type=opcoes_conversao)
-if imagem:
-    st.image(imagem, use_column_width=True)
-converter_para = st.selectbox(
-    "Converter para", options=opcoes_conversao, disabled=not imagem
+em_lote = st.toggle(
+    "Converter várias imagens",
+    help="Converte várias imagens em paralelo e baixa o resultado em um arquivo ZIP.",
 )
-botao_converter = st.empty()
-botao_converter.button(
-    "Converter imagem", on_click=converter_imagem, disabled=not imagem
+imagem_grande = st.radio(
+    "Imagens muito grandes",
+    options=["recusar", "reduzir"],
+    format_func=str.capitalize,
+    horizontal=True,
+    help="Imagens que passam do limite de memória podem ser recusadas ou, se forem JPEG, reduzidas durante a leitura. Os demais formatos são sempre recusados.",
 )
+predefinicao = st.selectbox(
+    "Predefinição do codificador",
+    options=list(PREDEFINICOES),
+    format_func=NOMES_PREDEFINICOES.get,
+    help="Rápido codifica mais depressa; Menor arquivo gasta mais tempo para reduzir o tamanho.",
+)
+if em_lote:
+    imagens = st.file_uploader(
+        "Escolha as imagens", type=opcoes_conversao, accept_multiple_files=True
+    )
+    converter_para = st.selectbox(
+        "Converter para", options=opcoes_conversao, disabled=not imagens
+    )
+    botao_converter = st.empty()
+    botao_converter.button(
+        "Converter imagens", on_click=converter_imagens, disabled=not imagens
+    )
+    if erros_lote := st.session_state.get("converter_imagem.erros_lote"):
+        with st.expander(f"Imagens com erro ({len(erros_lote)})"):
+            st.dataframe(erros_lote, use_container_width=True)
+else:
+    imagem = st.file_uploader("Escolha uma imagem", type=opcoes_conversao)
+    if imagem:
+        # Exibe uma miniatura em vez de enviar a imagem original ao navegador
+        try:
+            st.image(
+                obter_miniatura(hash_conteudo(imagem.getbuffer()), imagem.getbuffer()),
+                use_column_width=True,
+            )
+        except ImagemGrandeDemais as ex:
+            st.warning(ex)
+    converter_para = st.selectbox(
+        "Converter para", options=opcoes_conversao, disabled=not imagem
+    )
+    botao_converter = st.empty()
+    botao_converter.button(
+        "Converter imagem", on_click=converter_imagem, disabled=not imagem
+    )
+    botao_comparar = st.empty()
+    botao_comparar.button(
+        "Comparar predefinições",
+        on_click=comparar_predefinicoes,
+        disabled=not imagem,
+        help="Codifica a imagem com todas as predefinições em paralelo e mostra o tamanho e o tempo de cada uma.",
+    )
+    if comparacao := st.session_state.get("converter_imagem.comparacao"):
+        st.caption(f"Comparação para {comparacao['formato']}")
+        st.dataframe(comparacao["linhas"], use_container_width=True, hide_index=True)
 botao_baixar_nova_imagem = st.empty()
-if _botao_baixar_nova_imagem := st.session_state.get(
-    "converter_imagem.botao_baixar_nova_imagem"
-):
-    with botao_baixar_nova_imagem.container():
-        _botao_baixar_nova_imagem()
+with botao_baixar_nova_imagem.container():
+    botao_baixar_resultado("converter_imagem.resultado")
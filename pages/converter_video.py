@@ -1,15 +1,185 @@
 import os
-import tempfile
-from io import BytesIO
+from collections.abc import Callable
+from typing import BinaryIO
 
 import streamlit as st
 from loguru import logger
-from moviepy.editor import VideoFileClip
+
+from utils.audio import CONTEINERES_AUDIO, FORMATOS_AUDIO, estimar_espaco_extracao
+from utils.audio import extrair_audio as extrair_audio_arquivo
+from utils.cache import hash_conteudo, obter_cache_conversao
+from utils.ffmpeg import listar_quadros_chave, sondar_midia
+from utils.resultados import (
+    botao_baixar_resultado,
+    guardar_resultado,
+    obter_armazem_resultados,
+    registrar_resultado,
+)
+from utils.sessao import id_sessao
+from utils.tarefas import Tarefa, obter_gerenciador_tarefas
+from utils.temporarios import EspacoInsuficiente, reservar_temporarios
+from utils.video import FORMATOS_VIDEO, NOMES_PERFIS_VIDEO, PERFIS_VIDEO, MedicaoConversao
+from utils.video import converter_video as converter_video_arquivo
+from utils.video import converter_video_paralelo, estimar_espaco_video, gerar_folha_contato
 
 # Informação da página
 st.header("Converter vídeo")
 st.write("Converta vídeo com rapidez e qualidade.")
 
+# Tempo que uma conversão pode esperar na fila por espaço em disco
+ESPERA_MAXIMA_ESPACO_SEGUNDOS = 10 * 60
+# Trecho inicial do vídeo lido para estimar o intervalo entre quadros-chave
+JANELA_QUADROS_CHAVE_SEGUNDOS = 30
+
+
+def hash_video() -> str:
+    """
+    Retorna o hash do vídeo enviado, calculado uma vez por upload.
+
+    O hash fica na sessão junto do file_id do upload, para não ler o vídeo inteiro
+    de novo a cada interação com a página.
+
+    Returns:
+        str: Hash do conteúdo do vídeo.
+    """
+    file_id, hash_salvo = st.session_state.get("converter_video.hash", (None, None))
+    if file_id != video.file_id:
+        hash_salvo = hash_conteudo(video.getbuffer())
+        st.session_state["converter_video.hash"] = (video.file_id, hash_salvo)
+    return hash_salvo
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def inspecionar_video(hash_video: str, _video: BinaryIO) -> dict:
+    """
+    Lê os metadados dos cabeçalhos e monta a folha de contato do vídeo.
+
+    Params:
+        hash_video (str): Hash do conteúdo, usado como chave do cache.
+        _video (BinaryIO): Vídeo enviado.
+
+    Returns:
+        dict: Resumo dos metadados e a folha de contato em JPEG.
+    """
+    with reservar_temporarios(_video.size) as diretorio:
+        caminho = os.path.join(diretorio, "entrada")
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(_video.getbuffer())
+        info = sondar_midia(caminho)
+        # O intervalo entre quadros-chave é estimado só pelo começo do vídeo, para o
+        # custo da inspeção não crescer com o tamanho do arquivo
+        quadros_chave = listar_quadros_chave(caminho, ate=JANELA_QUADROS_CHAVE_SEGUNDOS)
+        folha = gerar_folha_contato(caminho, info.duracao)
+
+    videos = info.fluxos_do_tipo("video")
+    audios = info.fluxos_do_tipo("audio")
+    intervalos = [b - a for a, b in zip(quadros_chave, quadros_chave[1:])]
+    return {
+        "video": videos[0].model_dump() if videos else None,
+        "audio": audios[0].model_dump() if audios else None,
+        "duracao": info.duracao,
+        "taxa_bits": info.taxa_bits,
+        "intervalo_quadros_chave": sum(intervalos) / len(intervalos) if intervalos else None,
+        "folha_contato": folha,
+    }
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def sondar_audio(hash_video: str, _video: BinaryIO) -> dict:
+    """
+    Lê só os cabeçalhos do vídeo, sem a folha de contato nem os quadros-chave, para
+    decidir a extração do áudio.
+
+    Params:
+        hash_video (str): Hash do conteúdo, usado como chave do cache.
+        _video (BinaryIO): Vídeo enviado.
+
+    Returns:
+        dict: Duração do vídeo e o primeiro fluxo de áudio (ou None).
+
+    Raises:
+        RuntimeError: Se o ffprobe não estiver instalado ou não reconhecer o vídeo.
+    """
+    with reservar_temporarios(_video.size) as diretorio:
+        caminho = os.path.join(diretorio, "entrada")
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(_video.getbuffer())
+        info = sondar_midia(caminho)
+    audios = info.fluxos_do_tipo("audio")
+    return {"duracao": info.duracao, "audio": audios[0].model_dump() if audios else None}
+
+
+def guardar_do_cache(chave: str, novo_nome: str, novo_formato: str, rotulo: str) -> bool:
+    """
+    Registra o resultado a partir do cache, se a conversão já tiver sido feita antes.
+
+    Returns:
+        bool: True se o resultado estava em cache.
+    """
+    if (arquivo_cache := obter_cache_conversao().abrir(chave)) is None:
+        return False
+    with arquivo_cache:
+        guardar_resultado(
+            "converter_video.resultado",
+            arquivo_cache,
+            nome_arquivo=novo_nome,
+            mime=novo_formato,
+            rotulo=rotulo,
+        )
+    return True
+
+
+def enviar_tarefa(
+    descricao: str,
+    chave: str,
+    novo_nome: str,
+    novo_formato: str,
+    rotulo: str,
+    espaco: int,
+    processar: Callable[[Tarefa, str, str], tuple[str, MedicaoConversao | None]],
+) -> None:
+    """
+    Envia o processamento do vídeo para uma tarefa em segundo plano.
+
+    Params:
+        descricao (str): Descrição da tarefa.
+        chave (str): Chave do resultado no cache de conversões.
+        novo_nome (str): Nome do arquivo para download.
+        novo_formato (str): Tipo MIME do resultado.
+        rotulo (str): Texto do botão de download.
+        espaco (int): Estimativa de bytes temporários em disco.
+        processar (Callable): Recebe a tarefa, o caminho do vídeo e o diretório
+            temporário, e retorna o caminho do resultado e a medição (ou None).
+    """
+    upload = video
+    extensao = video.name.rsplit(".", 1)[1]
+    sessao = id_sessao()
+
+    def executar(tarefa: Tarefa) -> dict:
+        # A tarefa espera na fila enquanto não houver espaço em disco, e o diretório
+        # é apagado ao final em qualquer caso (sucesso, erro ou cancelamento)
+        with reservar_temporarios(
+            espaco,
+            espera_maxima=ESPERA_MAXIMA_ESPACO_SEGUNDOS,
+            ao_aguardar=lambda: tarefa.progredir(0.0, "Aguardando espaço em disco"),
+        ) as diretorio:
+            # getbuffer() expõe o buffer do upload sem copiá-lo, ao contrário de read()
+            temp_video_path = os.path.join(diretorio, f"entrada.{extensao}")
+            with open(temp_video_path, "wb") as temp_file:
+                temp_file.write(upload.getbuffer())
+            temp_output_path, medicao = processar(tarefa, temp_video_path, diretorio)
+            obter_cache_conversao().salvar_arquivo(chave, temp_output_path)
+            return {
+                "resultado": obter_armazem_resultados().guardar_arquivo(
+                    sessao, temp_output_path, novo_nome, novo_formato, rotulo
+                ),
+                "medicao": medicao,
+            }
+
+    st.session_state["converter_video.tarefa"] = obter_gerenciador_tarefas().submeter(
+        sessao, descricao, executar
+    )
+
 
 def converter_video() -> None:
     if f"video/{converter_para}" == video.type:
@@ -20,85 +190,241 @@ def converter_video() -> None:
         return None
 
     try:
-        botao_converter.status("Convertendo o vídeo...")
         botao_baixar_novo_video.empty()
+        st.session_state.pop("converter_video.medicao", None)
 
-        # Cria um arquivo temporário para salvar o vídeo enviado
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=f".{video.name.rsplit('.', 1)[1]}"
-        ) as temp_file:
-            temp_file.write(video.read())
-            temp_video_path = temp_file.name
+        chave = obter_cache_conversao().gerar_chave(
+            hash_video(), converter_para, {"perfil": perfil}
+        )
+        novo_nome = f"{video.name.rsplit('.', 1)[0]}.{converter_para}"
+        novo_formato = f"video/{converter_para}"
+        rotulo = f"Baixar vídeo {converter_para}"
+        if guardar_do_cache(chave, novo_nome, novo_formato, rotulo):
+            st.toast(f"Vídeo convertido para {converter_para}.", icon="✅")
+            return None
 
-        # Carrega o vídeo a partir do arquivo temporário
-        video_clip = VideoFileClip(temp_video_path)
+        formato, perfil_escolhido, paralelo_escolhido = converter_para, perfil, paralelo
 
-        # Cria um novo arquivo temporário para o vídeo convertido
-        novo_nome = f"{video.name.rsplit('.', 1)[0]}.{converter_para}"
-        novo_video_bytes = BytesIO()
-
-        # Exporta o vídeo para o novo formato e grava temporariamente
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=f".{converter_para}"
-        ) as temp_output_file:
-            video_clip.write_videofile(
-                temp_output_file.name,
-                codec="libx264" if converter_para != "webm" else None,
-            )
-            video_clip.close()
-            temp_output_file.seek(0)
-            novo_video_bytes.write(temp_output_file.read())
+        def processar(tarefa: Tarefa, temp_video_path: str, diretorio: str) -> tuple[str, MedicaoConversao]:
+            temp_output_path = os.path.join(diretorio, f"saida.{formato}")
+            if paralelo_escolhido:
+                medicao = converter_video_paralelo(
+                    temp_video_path,
+                    temp_output_path,
+                    formato,
+                    perfil_escolhido,
+                    ao_progredir=tarefa.progredir,
+                    diretorio_temporario=diretorio,
+                )
+            else:
+                medicao = converter_video_arquivo(
+                    temp_video_path,
+                    temp_output_path,
+                    formato,
+                    perfil_escolhido,
+                    ao_progredir=tarefa.progredir,
+                )
+            return temp_output_path, medicao
 
-        novo_video_bytes.seek(0)
-        novo_formato = f"video/{converter_para}"
+        enviar_tarefa(
+            f"Converter {video.name} para {formato}",
+            chave,
+            novo_nome,
+            novo_formato,
+            rotulo,
+            estimar_espaco_video(video.size),
+            processar,
+        )
+    except Exception as ex:
+        logger.error(ex)
+        st.toast(
+            "Ocorreu um erro ao converter o vídeo. Tente novamente.",
+            icon="❌",
+        )
 
-        # Botão de download para o vídeo convertido
-        st.session_state["converter_video.botao_baixar_novo_video"] = (
-            lambda: st.download_button(
-                f"Baixar vídeo {converter_para}",
-                data=novo_video_bytes.getvalue(),
-                file_name=novo_nome,
-                mime=novo_formato,
-            )
+
+def extrair_audio() -> None:
+    try:
+        botao_baixar_novo_video.empty()
+        st.session_state.pop("converter_video.medicao", None)
+
+        # A sondagem decide a cópia; na recodificação ela só melhora a estimativa de
+        # espaço, então uma falha (ex.: sem ffprobe) não impede a extração
+        try:
+            sondagem = sondar_audio(hash_video(), video)
+        except RuntimeError as ex:
+            if formato_audio == "copia":
+                logger.error(ex)
+                st.toast("Não foi possível ler o áudio do vídeo. Escolha um formato.", icon="❌")
+                return None
+            logger.warning(f"Não foi possível sondar o vídeo, o espaço será estimado pelo tamanho: {ex}")
+            sondagem = {"duracao": None, "audio": None}
+        fluxo_audio = sondagem["audio"]
+        if formato_audio == "copia":
+            if not fluxo_audio:
+                st.toast("O vídeo não tem áudio.", icon="❌")
+                return None
+            if fluxo_audio["codec"] not in CONTEINERES_AUDIO:
+                st.toast(
+                    f"Não é possível copiar áudio {fluxo_audio['codec']}. Escolha um formato.",
+                    icon="❌",
+                )
+                return None
+            extensao = CONTEINERES_AUDIO[fluxo_audio["codec"]][0]
+        else:
+            extensao = formato_audio
+
+        chave = obter_cache_conversao().gerar_chave(
+            hash_video(), extensao, {"extrair_audio": formato_audio}
         )
-        st.toast(f"Vídeo convertido para {converter_para}.", icon="✅")
+        novo_nome = f"{video.name.rsplit('.', 1)[0]}.{extensao}"
+        novo_formato = f"audio/{extensao}"
+        rotulo = f"Baixar áudio {extensao}"
+        if guardar_do_cache(chave, novo_nome, novo_formato, rotulo):
+            st.toast("Áudio extraído.", icon="✅")
+            return None
+
+        formato = None if formato_audio == "copia" else formato_audio
 
-        if os.path.exists(temp_video_path):
-            logger.debug(f"Excluindo o arquivo temporário: {temp_video_path}")
-            os.remove(temp_video_path)
-        if os.path.exists(temp_output_file.name):
-            logger.debug(f"Excluindo o arquivo temporário: {temp_output_file.name}")
-            os.remove(temp_output_file.name)
+        def processar(tarefa: Tarefa, temp_video_path: str, diretorio: str) -> tuple[str, None]:
+            tarefa.progredir(0.0, "Extraindo o áudio")
+            temp_output_path = os.path.join(diretorio, f"saida.{extensao}")
+            extrair_audio_arquivo(temp_video_path, temp_output_path, formato)
+            return temp_output_path, None
 
+        enviar_tarefa(
+            f"Extrair áudio de {video.name} ({extensao})",
+            chave,
+            novo_nome,
+            novo_formato,
+            rotulo,
+            estimar_espaco_extracao(video.size, sondagem["duracao"], formato, fluxo_audio),
+            processar,
+        )
     except Exception as ex:
         logger.error(ex)
         st.toast(
-            "Ocorreu um erro ao converter o vídeo. Tente novamente.",
+            "Ocorreu um erro ao extrair o áudio. Tente novamente.",
             icon="❌",
         )
 
 
+def cancelar_conversao() -> None:
+    if id_tarefa := st.session_state.get("converter_video.tarefa"):
+        obter_gerenciador_tarefas().cancelar(id_tarefa)
+
+
+@st.fragment(run_every=1)
+def acompanhar_conversao() -> None:
+    """
+    Mostra o andamento da conversão em segundo plano e, quando ela termina,
+    registra o resultado e recarrega a página para exibir o download.
+    """
+    tarefa = obter_gerenciador_tarefas().obter(st.session_state["converter_video.tarefa"])
+    if tarefa and not tarefa.encerrada:
+        texto = "Na fila..." if tarefa.situacao == "na_fila" else f"{tarefa.descricao}..."
+        st.progress(tarefa.progresso, text=f"{texto} {tarefa.mensagem}")
+        st.button("Cancelar", on_click=cancelar_conversao)
+        return None
+
+    st.session_state.pop("converter_video.tarefa", None)
+    if tarefa and tarefa.situacao == "concluida":
+        registrar_resultado("converter_video.resultado", tarefa.resultado["resultado"])
+        st.session_state["converter_video.medicao"] = tarefa.resultado["medicao"]
+        st.toast(f"{tarefa.descricao}: concluído.", icon="✅")
+    elif tarefa and tarefa.situacao == "cancelada":
+        st.toast(f"{tarefa.descricao}: cancelado.", icon="⚠️")
+    elif tarefa and tarefa.tipo_erro == EspacoInsuficiente.__name__:
+        st.toast(tarefa.erro, icon="❌")
+    elif tarefa:
+        st.toast(
+            f"{tarefa.descricao}: ocorreu um erro. Tente novamente.",
+            icon="❌",
+        )
+    st.rerun()
+
+
 # Opções de formatos de conversão de vídeo
-opcoes_conversao = [
-    "mp4",
-    "avi",
-    "mkv",
-    "mov",
-    "webm",
-]
+opcoes_conversao = FORMATOS_VIDEO
 
 # Página
 video = st.file_uploader("Escolha um vídeo", type=opcoes_conversao)
 if video:
-    st.video(video, format=video.type)
-converter_para = st.selectbox(
-    "Converter para", options=opcoes_conversao, disabled=not video
+    # Os metadados vêm só dos cabeçalhos, e a folha de contato evita enviar o vídeo ao navegador
+    try:
+        inspecao = inspecionar_video(hash_video(), video)
+        col_codec, col_resolucao, col_duracao, col_taxa, col_chave = st.columns(5)
+        if fluxo_video := inspecao["video"]:
+            col_codec.metric("Codec", fluxo_video["codec"])
+            col_resolucao.metric("Resolução", f"{fluxo_video['largura']}x{fluxo_video['altura']}")
+        if inspecao["duracao"]:
+            col_duracao.metric("Duração", f"{inspecao['duracao']:.1f}s")
+        if inspecao["taxa_bits"]:
+            col_taxa.metric("Taxa de bits", f"{inspecao['taxa_bits'] / 1000:.0f} kb/s")
+        if inspecao["intervalo_quadros_chave"]:
+            col_chave.metric("Quadros-chave", f"a cada {inspecao['intervalo_quadros_chave']:.1f}s")
+        if fluxo_audio := inspecao["audio"]:
+            st.caption(
+                f"Áudio: {fluxo_audio['codec']}, {fluxo_audio['taxa_amostragem']} Hz, "
+                f"{fluxo_audio['canais']} canais"
+            )
+        st.image(inspecao["folha_contato"], use_column_width=True)
+    except Exception as ex:
+        logger.error(ex)
+        st.warning("Não foi possível inspecionar o vídeo.")
+    if st.checkbox("Assistir vídeo"):
+        st.video(video, format=video.type)
+acao = st.radio(
+    "O que fazer",
+    options=["converter", "extrair_audio"],
+    format_func={"converter": "Converter vídeo", "extrair_audio": "Extrair áudio"}.get,
+    horizontal=True,
+    help="Extrair áudio lê só a trilha de áudio, sem decodificar os quadros do vídeo.",
 )
+em_andamento = "converter_video.tarefa" in st.session_state
 botao_converter = st.empty()
-botao_converter.button("Converter vídeo", on_click=converter_video, disabled=not video)
+if acao == "extrair_audio":
+    formato_audio = st.selectbox(
+        "Formato do áudio",
+        options=["copia", *FORMATOS_AUDIO],
+        format_func=lambda formato: "Original (sem recodificar)" if formato == "copia" else formato,
+        disabled=not video,
+    )
+    botao_converter.button(
+        "Extrair áudio", on_click=extrair_audio, disabled=not video or em_andamento
+    )
+else:
+    converter_para = st.selectbox(
+        "Converter para", options=opcoes_conversao, disabled=not video
+    )
+    perfil = st.selectbox(
+        "Perfil de codificação",
+        options=list(PERFIS_VIDEO),
+        index=1,
+        format_func=NOMES_PERFIS_VIDEO.get,
+        disabled=not video,
+        help="Rascunho codifica mais depressa com arquivo maior; Arquivo gasta mais tempo para ter mais qualidade.",
+    )
+    paralelo = st.toggle(
+        "Conversão paralela",
+        disabled=not video,
+        help="Divide vídeos longos em segmentos nos quadros-chave e converte os segmentos ao mesmo tempo em vários núcleos.",
+    )
+    botao_converter.button(
+        "Converter vídeo", on_click=converter_video, disabled=not video or em_andamento
+    )
+if em_andamento:
+    # A conversão continua mesmo que a página seja recarregada ou trocada
+    acompanhar_conversao()
+if medicao := st.session_state.get("converter_video.medicao"):
+    col_metodo, col_fps, col_tempo_real = st.columns(3)
+    col_metodo.metric(
+        "Método",
+        {"copia": "Cópia dos fluxos", "recodificacao": "Recodificação", "segmentos": "Segmentos em paralelo"}[medicao.metodo],
+        help=f"{medicao.tempo_s:.1f}s para {medicao.duracao_video:.1f}s de vídeo",
+    )
+    col_fps.metric("Quadros/s", f"{medicao.quadros_por_segundo:.0f}")
+    col_tempo_real.metric("Velocidade", f"{medicao.fator_tempo_real:.1f}x tempo real")
 botao_baixar_novo_video = st.empty()
-if _botao_baixar_novo_video := st.session_state.get(
-    "converter_video.botao_baixar_novo_video"
-):
-    with botao_baixar_novo_video.container():
-        _botao_baixar_novo_video()
+with botao_baixar_novo_video.container():
+    botao_baixar_resultado("converter_video.resultado")
@@ -1,15 +1,190 @@
+import csv
 import datetime
-from html import escape as html_escape
+import io
+import time
 
 import streamlit as st
+from loguru import logger
 from streamlit_tags import st_tags
-from weasyprint import HTML
+
+from utils.cache import hash_conteudo, obter_cache_conversao
+from utils.compactacao import ZipEmDisco
+from utils.curriculo import (
+    CSS_CURRICULO,
+    NOMES_LAYOUTS_CURRICULO,
+    gerar_html,
+    gerar_modelo_csv,
+    ler_curriculos_em_lote,
+    nome_arquivo_curriculo,
+    validar_curriculo,
+)
+from utils.curriculo import gerar_pdf as gerar_pdf_bytes
+from utils.processos import mapear_em_pool
+from utils.resultados import (
+    botao_baixar_resultado,
+    guardar_resultado,
+    obter_armazem_resultados,
+    registrar_resultado,
+)
+from utils.sessao import id_sessao
+from utils.tarefas import Tarefa, obter_gerenciador_tarefas
 
 
 # Informação da página
 st.title("Gerar currículo")
 st.write("Crie seu currículo profissional de forma fácil e rápida.")
 
+
+# Geração em lote
+def gerar_curriculos() -> None:
+    try:
+        botao_baixar_lote.empty()
+        inicio = time.perf_counter()
+
+        formato = arquivo_lote.name.rsplit(".", 1)[-1].lower()
+        try:
+            curriculos = ler_curriculos_em_lote(arquivo_lote.getvalue(), formato)
+        except ValueError as ex:
+            logger.error(ex)
+            st.toast("Não foi possível ler o arquivo. Confira o formato.", icon="❌")
+            return None
+
+        cache = obter_cache_conversao()
+        situacoes = []
+        for indice, curriculo in enumerate(curriculos):
+            # O nome é só para o relatório, e a linha pode ser inválida
+            dados = curriculo.get("dados_basicos") if isinstance(curriculo, dict) else None
+            situacoes.append({
+                "Linha": indice + 1,
+                "Nome": dados.get("Nome Completo") if isinstance(dados, dict) else None,
+                "Situação": "Na fila",
+                "Tempo (s)": None,
+            })
+        gerados = 0
+
+        def atualizar_situacao(indice: int, situacao: str, tempo: float | None = None) -> None:
+            situacoes[indice]["Situação"] = situacao
+            situacoes[indice]["Tempo (s)"] = round(tempo, 2) if tempo is not None else None
+            tabela_situacao.dataframe(situacoes, use_container_width=True, hide_index=True)
+            finalizados = sum(linha["Situação"] not in ("Na fila", "Gerando") for linha in situacoes)
+            botao_gerar_lote.status(
+                f"Gerando currículos... {finalizados}/{len(curriculos)} "
+                f"({time.perf_counter() - inicio:.0f}s)"
+            )
+
+        with ZipEmDisco() as arquivo_zip:
+            # Linhas inválidas são relatadas sem interromper o lote, e currículos
+            # iguais a um já gerado saem direto do cache
+            pendentes = []
+            for indice, curriculo in enumerate(curriculos):
+                try:
+                    argumentos = validar_curriculo(curriculo)
+                except ValueError as ex:
+                    atualizar_situacao(indice, f"Inválido: {ex}")
+                    continue
+                html = gerar_html(**argumentos, layout=layout_lote)
+                nome_arquivo = nome_arquivo_curriculo(
+                    indice + 1, argumentos["dados_basicos"]["Nome Completo"]
+                )
+                chave = cache.gerar_chave(hash_conteudo((html + CSS_CURRICULO).encode()), "pdf")
+                if (pdf := cache.obter(chave)) is not None:
+                    arquivo_zip.adicionar(nome_arquivo, pdf)
+                    gerados += 1
+                    atualizar_situacao(indice, "Concluído (cache)", 0)
+                else:
+                    pendentes.append((indice, chave, nome_arquivo, html))
+
+            enviados_em = {}
+
+            def enviar_pendentes():
+                for indice, _, _, html in pendentes:
+                    enviados_em[indice] = time.perf_counter()
+                    atualizar_situacao(indice, "Gerando")
+                    yield (html,)
+
+            # Cada processo do pool tem a sua configuração de fontes, reaproveitada entre currículos
+            for posicao, futuro in mapear_em_pool(gerar_pdf_bytes, enviar_pendentes()):
+                indice, chave, nome_arquivo, _ = pendentes[posicao]
+                tempo = time.perf_counter() - enviados_em[indice]
+                try:
+                    pdf = futuro.result()
+                    cache.salvar(chave, pdf)
+                    arquivo_zip.adicionar(nome_arquivo, pdf)
+                    gerados += 1
+                    atualizar_situacao(indice, "Concluído", tempo)
+                except Exception as ex:
+                    logger.error(f"Linha {indice + 1}: {ex}")
+                    atualizar_situacao(indice, f"Erro: {ex}", tempo)
+
+            erros = [linha for linha in situacoes if not linha["Situação"].startswith("Concluído")]
+            if erros:
+                relatorio = io.StringIO()
+                escritor = csv.DictWriter(relatorio, fieldnames=list(situacoes[0]))
+                escritor.writeheader()
+                escritor.writerows(erros)
+                arquivo_zip.adicionar("erros.csv", relatorio.getvalue().encode("utf-8-sig"))
+
+        duracao = time.perf_counter() - inicio
+        st.session_state["gerar_curriculo.situacao_lote"] = {
+            "linhas": situacoes,
+            "gerados": gerados,
+            "duracao": duracao,
+        }
+        if gerados:
+            guardar_resultado(
+                "gerar_curriculo.resultado_lote",
+                arquivo_zip.arquivo,
+                nome_arquivo="curriculos.zip",
+                mime="application/zip",
+                rotulo=f"Baixar {gerados} currículos em PDF (ZIP)",
+            )
+        arquivo_zip.descartar()
+        st.toast(
+            f"{gerados} de {len(curriculos)} currículos gerados em {duracao:.1f}s.",
+            icon="✅" if gerados == len(curriculos) else "⚠️",
+        )
+    except Exception as ex:
+        logger.error(ex)
+        st.toast("Ocorreu um erro ao gerar os currículos. Tente novamente.", icon="❌")
+
+
+em_lote = st.toggle(
+    "Gerar vários currículos",
+    help="Gera um PDF para cada currículo de uma planilha (CSV) ou JSON e baixa tudo em um arquivo ZIP.",
+)
+if em_lote:
+    st.download_button(
+        "Baixar modelo de planilha",
+        gerar_modelo_csv(),
+        file_name="modelo_curriculos.csv",
+        mime="text/csv",
+        help="Uma linha por currículo. Datas no formato dd/mm/aaaa e habilidades separadas por vírgula.",
+    )
+    arquivo_lote = st.file_uploader("Escolha a planilha ou o JSON", type=["csv", "json"])
+    layout_lote = st.selectbox(
+        "Layout",
+        options=list(NOMES_LAYOUTS_CURRICULO),
+        format_func=NOMES_LAYOUTS_CURRICULO.get,
+        disabled=not arquivo_lote,
+    )
+    botao_gerar_lote = st.empty()
+    botao_gerar_lote.button(
+        "Gerar currículos", on_click=gerar_curriculos, disabled=not arquivo_lote
+    )
+    tabela_situacao = st.empty()
+    if situacao_lote := st.session_state.get("gerar_curriculo.situacao_lote"):
+        tabela_situacao.dataframe(situacao_lote["linhas"], use_container_width=True, hide_index=True)
+        duracao = situacao_lote["duracao"]
+        st.caption(
+            f"{situacao_lote['gerados']} de {len(situacao_lote['linhas'])} currículos "
+            f"gerados em {duracao:.1f}s"
+            + (f" ({situacao_lote['gerados'] / duracao:.1f} currículos/s)." if duracao else ".")
+        )
+    botao_baixar_lote = st.empty()
+    with botao_baixar_lote.container():
+        botao_baixar_resultado("gerar_curriculo.resultado_lote")
+    st.stop()
+
 # Variáveis para armazenar dados
 dados_basicos = (
     st.session_state.get("gerar_curriculo.dados_basicos")
@@ -251,74 +426,63 @@ with st.expander("Habilidades", expanded=True):
     st.session_state["gerar_curriculo.habilidades"] = habilidades
 
 
-# Função para gerar HTML
-def gerar_html() -> str:
-    experiencias_html = "" if experiencias else "<p>Em busca do primeiro emprego</p>"
-    for exp in experiencias:
-        experiencias_html += f"""
-            <ul>
-                <li><b>Empresa:</b> {html_escape(exp.get('Empresa'))}</li>
-                <li><b>Cargo:</b> {html_escape(exp.get('Cargo'))}</li>
-                <li><b>Período:</b> {exp.get('Admissão').strftime('%d/%m/%Y')} - {exp.get('Demissão').strftime('%d/%m/%Y') if exp.get('Demissão') else 'Atual'}</li>
-                <li><b>Descrição:</b> {html_escape(exp.get('Descrição'))}</li>
-            </ul>
-        """
-
-    formacoes_html = ""
-    for formacao in formacoes:
-        formacoes_html += f"""
-            <ul>
-                <li><b>Instituição:</b> {html_escape(formacao.get('Instituição'))}</li>
-                <li><b>Curso:</b> {html_escape(formacao.get('Curso'))}</li>
-                <li><b>Nível:</b> {html_escape(formacao.get('Nível'))}</li>
-                <li><b>Ano de Início:</b> {formacao.get('Ano de Início')}</li>
-                <li><b>Ano de Término:</b> {formacao.get('Ano de Término')}</li>
-                <li><b>Situação:</b> {html_escape(formacao.get('Situação'))}</li>
-            </ul>
-        """
-
-    habilidades_html = f"""
-        <hr>
-        <h2>Habilidades</h2>
-        <ul>{
-            ''.join([f"<li>{html_escape(habilidade.title())}</li>" for habilidade in habilidades])
-        }</ul>
-    """
+# Função para gerar PDF
+def gerar_pdf() -> None:
+    botao_baixar_pdf.empty()
 
-    dados_html = f"""
-        <center>
-            <h1><b>{html_escape(dados_basicos.get('Nome Completo'))}</b></h1>
-        </center>
-        <p><b>Data de Nascimento:</b> {html_escape(dados_basicos.get('Data de Nascimento').strftime('%d/%m/%Y'))}</p>
-        <p><b>Celular:</b> {html_escape(dados_basicos.get('Celular'))}</p>
-        <p><b>Email:</b> {html_escape(dados_basicos.get('Email'))}</p>
-        <p><b>Cargo Desejado:</b> {html_escape(dados_basicos.get('Cargo Desejado'))}</p>
-        <hr>
-        <h2>Experiência Profissional</h2>
-        {experiencias_html}
-        <hr>
-        <h2>Formação Académica</h2>
-        {formacoes_html}
-        {habilidades_html if habilidades else ''}
-    """
+    try:
+        html = gerar_html(dados_basicos, experiencias, formacoes, habilidades, layout)
+        # O PDF depende só do HTML e do estilo, então currículos iguais reaproveitam o PDF
+        chave = obter_cache_conversao().gerar_chave(
+            hash_conteudo((html + CSS_CURRICULO).encode()), "pdf"
+        )
+        nome_arquivo = f"{dados_basicos.get('Nome Completo')}.pdf"
+        rotulo = "Baixar Currículo em PDF"
+        if (pdf := obter_cache_conversao().obter(chave)) is not None:
+            guardar_resultado(
+                "gerar_curriculo.resultado",
+                pdf,
+                nome_arquivo=nome_arquivo,
+                mime="application/pdf",
+                rotulo=rotulo,
+            )
+            return None
 
-    return dados_html
+        sessao = id_sessao()
 
+        def executar(tarefa: Tarefa) -> str:
+            pdf = gerar_pdf_bytes(html, ao_progredir=tarefa.progredir)
+            obter_cache_conversao().salvar(chave, pdf)
+            return obter_armazem_resultados().guardar_bytes(
+                sessao, pdf, nome_arquivo, "application/pdf", rotulo
+            )
 
-# Função para gerar PDF
-def gerar_pdf() -> None:
-    botao_gerar_pdf.status("Gerando PDF...")
-    botao_baixar_pdf.empty()
+        st.session_state["gerar_curriculo.tarefa"] = obter_gerenciador_tarefas().submeter(
+            sessao, f"Gerar currículo de {dados_basicos.get('Nome Completo')}", executar
+        )
+    except Exception as ex:
+        logger.error(ex)
+        st.toast("Ocorreu um erro ao gerar o PDF. Tente novamente.", icon="❌")
 
-    pdf = HTML(string=gerar_html()).write_pdf()
 
-    nome_arquivo = f"{dados_basicos.get('Nome Completo')}.pdf"
-    st.session_state["gerar_curriculo.botao_baixar_pdf"] = lambda: st.download_button(
-        "Baixar Currículo em PDF",
-        data=pdf,
-        file_name=nome_arquivo,
-        mime="application/pdf",
-    )
+@st.fragment(run_every=1)
+def acompanhar_geracao() -> None:
+    """
+    Mostra o andamento da geração do PDF e, quando ela termina, registra o
+    resultado e recarrega a página para exibir o download.
+    """
+    tarefa = obter_gerenciador_tarefas().obter(st.session_state["gerar_curriculo.tarefa"])
+    if tarefa and not tarefa.encerrada:
+        texto = "Na fila..." if tarefa.situacao == "na_fila" else "Gerando PDF..."
+        st.progress(tarefa.progresso, text=f"{texto} {tarefa.mensagem}")
+        return None
+
+    st.session_state.pop("gerar_curriculo.tarefa", None)
+    if tarefa and tarefa.situacao == "concluida":
+        registrar_resultado("gerar_curriculo.resultado", tarefa.resultado)
+    elif tarefa:
+        st.toast("Ocorreu um erro ao gerar o PDF. Tente novamente.", icon="❌")
+    st.rerun()
 
 
 # Progresso de preenchimento
@@ -339,11 +503,20 @@ if habilidades:
     prog = prog.progress(valor_prog, text=texto_prog)
 
 
+# Layout do currículo, usado na pré-visualização e no PDF
+layout = st.selectbox(
+    "Layout",
+    options=list(NOMES_LAYOUTS_CURRICULO),
+    format_func=NOMES_LAYOUTS_CURRICULO.get,
+    key="gerar_curriculo.layout",
+)
+
+
 # Pré-visualização
 @st.dialog("Pre-Visualização")
 def pre_visualizacao():
     with st.container(border=True):
-        st.html(gerar_html())
+        st.html(gerar_html(dados_basicos, experiencias, formacoes, habilidades, layout))
 
 
 botao_pre_visualizacao = st.button(
@@ -353,14 +526,18 @@ botao_pre_visualizacao = st.button(
 )
 
 # Botão para gerar o currículo completo em PDF
+em_andamento = "gerar_curriculo.tarefa" in st.session_state
 botao_gerar_pdf = st.empty()
 botao_gerar_pdf.button(
-    "Gerar PDF", on_click=gerar_pdf, disabled=not (dados_basicos and formacoes)
+    "Gerar PDF",
+    on_click=gerar_pdf,
+    disabled=not (dados_basicos and formacoes) or em_andamento,
 )
+if em_andamento:
+    # A renderização roda fora da thread do script, sem travar a página
+    acompanhar_geracao()
 
 #  Botão para baixar o currículo em PDF
 botao_baixar_pdf = st.empty()
-if _botao_baixar_pdf := st.session_state.get("gerar_curriculo.botao_baixar_pdf"):
-    with botao_baixar_pdf.container():
-        _botao_baixar_pdf()
-        st.session_state.pop("gerar_curriculo.botao_baixar_pdf", None)
+with botao_baixar_pdf.container():
+    botao_baixar_resultado("gerar_curriculo.resultado", exibir_uma_vez=True)
@@ -1,26 +1,203 @@
+import time
+import zipfile
+from contextlib import ExitStack
+from functools import partial
 from io import BytesIO
+from typing import BinaryIO
+
 import streamlit as st
-import exifread
+from loguru import logger
+
+from utils.cache import hash_conteudo
+from utils.exportacao import EscritorTabela
+from utils.imagem import ImagemGrandeDemais, gerar_miniatura
+from utils.metadados import extrair_metadados, extrair_metadados_em_lote
+from utils.resultados import botao_baixar_resultado, guardar_resultado
 
 
 # Informação da página
 st.header("Inspecionar imagem")
 st.write("Inspecione os metadados da imagem.")
 
+# Início de cada imagem comprimida no ZIP que é descomprimido para ler os metadados
+LIMITE_LEITURA_ZIP = 1024 * 1024
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def obter_miniatura(hash_imagem: str, _dados: memoryview) -> bytes:
+    return gerar_miniatura(_dados)
+
+
+def abrir_inicio_zip(arquivo_zip: zipfile.ZipFile, info: zipfile.ZipInfo) -> BinaryIO:
+    """
+    Descomprime só o início de uma imagem do ZIP, onde ficam os cabeçalhos.
+
+    Voltar no fluxo de um item comprimido recomeça a descompressão, e a leitura
+    dos metadados volta ao início do arquivo, então os bytes lidos vão para a
+    memória uma única vez.
+
+    Params:
+        arquivo_zip (zipfile.ZipFile): ZIP aberto.
+        info (zipfile.ZipInfo): Item do ZIP.
+
+    Returns:
+        BinaryIO: Até LIMITE_LEITURA_ZIP bytes do início do item.
+    """
+    with arquivo_zip.open(info) as item:
+        return BytesIO(item.read(LIMITE_LEITURA_ZIP))
+
+
+def listar_fontes(pilha: ExitStack):
+    """
+    Lista as imagens enviadas, incluindo as que estão dentro de arquivos ZIP.
+
+    Params:
+        pilha (ExitStack): Fecha os arquivos ZIP quando o lote terminar.
+
+    Returns:
+        Iterator[tuple[str, Callable]]: Nome de cada imagem e uma função que a abre.
+    """
+    for arquivo in arquivos:
+        if arquivo.name.lower().endswith(".zip"):
+            arquivo_zip = pilha.enter_context(zipfile.ZipFile(arquivo))
+            for info in arquivo_zip.infolist():
+                if not info.is_dir() and info.filename.lower().endswith(tuple(extensoes)):
+                    # Itens sem compressão são lidos direto, com seek sem custo
+                    abrir = (
+                        partial(arquivo_zip.open, info)
+                        if info.compress_type == zipfile.ZIP_STORED
+                        else partial(abrir_inicio_zip, arquivo_zip, info)
+                    )
+                    yield f"{arquivo.name}/{info.filename}", abrir
+        else:
+            # getvalue() compartilha o buffer do upload, sem copiar os bytes
+            yield arquivo.name, partial(BytesIO, arquivo.getvalue())
+
+
+def exportar_metadados() -> None:
+    try:
+        botao_baixar_tabela.empty()
+        progresso = botao_exportar.progress(0.0, text="Lendo metadados...")
+        inicio = time.perf_counter()
+
+        # Os ZIPs ficam abertos até o fim do lote e são fechados mesmo com erro
+        with ExitStack() as pilha:
+            # Só os nomes são listados aqui, os arquivos são abertos dentro das threads
+            fontes = list(listar_fontes(pilha))
+            quantidade = erros = 0
+            tabela = EscritorTabela(["arquivo", "grupo", "chave", "valor", "tipo"], formato_tabela)
+            with tabela:
+                for nome, resultado in extrair_metadados_em_lote(fontes, detalhes=detalhes):
+                    quantidade += 1
+                    if isinstance(resultado, Exception):
+                        logger.error(f"{nome}: {resultado}")
+                        erros += 1
+                        tabela.escrever({"arquivo": nome, "grupo": "Erro", "valor": str(resultado)})
+                    else:
+                        for metadado in resultado.metadados:
+                            tabela.escrever({"arquivo": nome, **metadado.model_dump()})
+                    progresso.progress(
+                        quantidade / len(fontes),
+                        text=f"Lendo metadados... {quantidade}/{len(fontes)}",
+                    )
+
+        duracao = time.perf_counter() - inicio
+        st.session_state["inspecionar_imagem.resumo_lote"] = {
+            "arquivos": quantidade,
+            "erros": erros,
+            "arquivos_por_segundo": quantidade / duracao if duracao else 0,
+        }
+        guardar_resultado(
+            "inspecionar_imagem.resultado",
+            tabela.arquivo,
+            nome_arquivo=f"metadados.{formato_tabela}",
+            mime=tabela.mime,
+            rotulo=f"Baixar tabela {formato_tabela.upper()} ({tabela.quantidade} linhas)",
+        )
+        tabela.arquivo.close()
+        st.toast(f"Metadados de {quantidade} arquivos lidos.", icon="✅")
+    except Exception as ex:
+        logger.error(ex)
+        st.toast(
+            "Ocorreu um erro ao ler os metadados. Tente novamente.",
+            icon="❌",
+        )
+
+
+extensoes = ["png", "jpeg", "jpg", "webp"]
+
 # Página
-imagem = st.file_uploader("Escolha uma imagem", type=["png", "jpeg", "jpg"])
-if imagem:
-    imagem_bytes = BytesIO(imagem.read())
+em_lote = st.toggle(
+    "Inspecionar várias imagens",
+    help="Lê os metadados de várias imagens ou de um arquivo ZIP e exporta uma tabela.",
+)
+detalhes = st.checkbox(
+    "Incluir MakerNotes e miniatura EXIF",
+    help="Lê também os dados específicos do fabricante da câmera, que são mais lentos de interpretar.",
+)
+if em_lote:
+    arquivos = st.file_uploader(
+        "Escolha as imagens ou um arquivo ZIP",
+        type=[*extensoes, "zip"],
+        accept_multiple_files=True,
+    )
+    formato_tabela = st.selectbox(
+        "Exportar como", options=["csv", "parquet"], format_func=str.upper
+    )
+    botao_exportar = st.empty()
+    botao_exportar.button(
+        "Exportar metadados", on_click=exportar_metadados, disabled=not arquivos
+    )
+    if resumo := st.session_state.get("inspecionar_imagem.resumo_lote"):
+        col_arquivos, col_erros, col_vazao = st.columns(3)
+        col_arquivos.metric("Arquivos", resumo["arquivos"])
+        col_erros.metric("Erros", resumo["erros"])
+        col_vazao.metric(
+            "Arquivos/s",
+            f"{resumo['arquivos_por_segundo']:.1f}",
+            help=(
+                "Das imagens comprimidas dentro de ZIP só o primeiro "
+                f"{LIMITE_LEITURA_ZIP // 1024 ** 2} MB é lido. Metadados gravados depois dos "
+                "dados da imagem (comum no EXIF de WebP) podem ficar de fora."
+            ),
+        )
+    botao_baixar_tabela = st.empty()
+    with botao_baixar_tabela.container():
+        botao_baixar_resultado("inspecionar_imagem.resultado")
+    st.stop()
 
-    # Exibir a imagem carregada
-    st.image(imagem_bytes)
+imagem = st.file_uploader("Escolha uma imagem", type=extensoes)
+if imagem:
+    # Exibir uma miniatura da imagem carregada
+    try:
+        st.image(obter_miniatura(hash_conteudo(imagem.getbuffer()), imagem.getbuffer()))
+    except ImagemGrandeDemais as ex:
+        st.warning(ex)
 
-    # Ler os metadados EXIF
-    exif = exifread.process_file(imagem_bytes)
+    # Ler os metadados direto do arquivo enviado, apenas os cabeçalhos
+    try:
+        resultado = extrair_metadados(imagem, detalhes=detalhes, miniatura=detalhes)
+    except Exception as ex:
+        logger.error(ex)
+        st.error("Não foi possível ler os metadados da imagem.")
+        st.stop()
 
-    # Mostrar os metadados EXIF na interface
-    if exif:
-        st.subheader("Metadados EXIF")
-        st.write(exif)
+    # Mostrar os metadados na interface
+    if resultado.metadados:
+        st.subheader(f"Metadados ({resultado.formato})")
+        st.dataframe(
+            resultado.como_tabela(),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "grupo": "Grupo",
+                "chave": "Chave",
+                "valor": "Valor",
+                "tipo": "Tipo",
+            },
+        )
+        if resultado.miniatura:
+            st.caption("Miniatura EXIF")
+            st.image(resultado.miniatura)
     else:
-        st.write("Nenhum dado EXIF encontrado.")
+        st.write("Nenhum metadado encontrado.")
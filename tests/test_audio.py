@@ -0,0 +1,45 @@
+import pytest
+
+from utils.audio import TOLERANCIA_CORTE, planejar_segmentos
+
+
+def _cortes(segmentos: list[tuple[float, float]]) -> list[float]:
+    return [inicio for inicio, _ in segmentos[1:]]
+
+
+def _cobre(segmentos: list[tuple[float, float]], duracao: float) -> bool:
+    fim = 0.0
+    for inicio, duracao_segmento in segmentos:
+        if inicio != pytest.approx(fim) or duracao_segmento <= 0:
+            return False
+        fim = inicio + duracao_segmento
+    return fim == pytest.approx(duracao)
+
+
+def test_sem_silencios_divide_em_partes_iguais():
+    segmentos = planejar_segmentos(120.0, 4)
+    assert _cortes(segmentos) == [30.0, 60.0, 90.0]
+    assert _cobre(segmentos, 120.0)
+
+
+def test_corta_no_meio_do_silencio_mais_proximo():
+    silencios = [(25.0, 27.0), (33.0, 34.0), (100.0, 101.0)]
+    segmentos = planejar_segmentos(120.0, 2, silencios)
+    # Ideal em 60s: o silêncio mais próximo está longe demais, então o corte fica no ideal
+    assert _cortes(segmentos) == [60.0]
+    segmentos = planejar_segmentos(120.0, 4, silencios)
+    assert _cortes(segmentos) == [33.5, 60.0, 90.0]
+    assert _cobre(segmentos, 120.0)
+
+
+def test_ignora_silencio_fora_da_tolerancia():
+    silencio = 60.0 + TOLERANCIA_CORTE + 1
+    segmentos = planejar_segmentos(120.0, 2, [(silencio - 0.5, silencio + 0.5)])
+    assert _cortes(segmentos) == [60.0]
+
+
+def test_nao_repete_corte_no_mesmo_silencio():
+    # Os três pontos ideais estão na tolerância do mesmo silêncio
+    segmentos = planejar_segmentos(40.0, 4, [(19.0, 21.0)])
+    assert _cortes(segmentos) == [20.0]
+    assert _cobre(segmentos, 40.0)
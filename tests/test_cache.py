@@ -0,0 +1,54 @@
+from utils.cache import CacheConversao
+
+
+def test_chave_depende_do_formato_e_dos_parametros():
+    chave = CacheConversao.gerar_chave("hash", "png", {"qualidade": 80})
+    assert chave == CacheConversao.gerar_chave("hash", "png", {"qualidade": 80})
+    assert chave != CacheConversao.gerar_chave("hash", "jpeg", {"qualidade": 80})
+    assert chave != CacheConversao.gerar_chave("hash", "png", {"qualidade": 70})
+
+
+def test_salvar_e_obter(tmp_path):
+    cache = CacheConversao(str(tmp_path), limite_bytes=100)
+    cache.salvar("a", b"conteudo")
+    assert cache.obter("a") == b"conteudo"
+    assert cache.obter("b") is None
+    assert cache.estatisticas()["acertos"] == 1
+    assert cache.estatisticas()["falhas"] == 1
+
+
+def test_despeja_as_entradas_usadas_ha_mais_tempo_pelo_tamanho(tmp_path):
+    cache = CacheConversao(str(tmp_path), limite_bytes=25)
+    cache.salvar("a", b"a" * 10)
+    cache.salvar("b", b"b" * 10)
+    cache.obter("a")  # "b" passa a ser a usada há mais tempo
+    cache.salvar("c", b"c" * 10)
+    assert cache.obter("b") is None
+    assert cache.obter("a") == b"a" * 10
+    assert cache.obter("c") == b"c" * 10
+    assert cache.estatisticas()["bytes"] == 20
+
+
+def test_ignora_resultado_maior_que_o_limite(tmp_path):
+    cache = CacheConversao(str(tmp_path), limite_bytes=5)
+    cache.salvar("a", b"a" * 10)
+    assert cache.obter("a") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_salvar_arquivo_mantem_o_original(tmp_path):
+    original = tmp_path / "saida.bin"
+    original.write_bytes(b"convertido")
+    cache = CacheConversao(str(tmp_path / "cache"), limite_bytes=100)
+    cache.salvar_arquivo("a", str(original))
+    assert original.read_bytes() == b"convertido"
+    assert cache.obter("a") == b"convertido"
+
+
+def test_recupera_entradas_e_remove_gravacoes_interrompidas(tmp_path):
+    cache = CacheConversao(str(tmp_path), limite_bytes=100)
+    cache.salvar("a", b"conteudo")
+    (tmp_path / "b.tmp").write_bytes(b"pela metade")
+    cache = CacheConversao(str(tmp_path), limite_bytes=100)
+    assert cache.obter("a") == b"conteudo"
+    assert not (tmp_path / "b.tmp").exists()
@@ -0,0 +1,49 @@
+import io
+import zipfile
+
+from utils.compactacao import ZipEmDisco
+
+
+def _nomes(arquivo_zip: ZipEmDisco) -> list[str]:
+    arquivo_zip.fechar()
+    with zipfile.ZipFile(io.BytesIO(arquivo_zip.ler())) as lido:
+        return lido.namelist()
+
+
+def test_nomes_repetidos_recebem_sufixo():
+    with ZipEmDisco() as arquivo_zip:
+        nomes = [arquivo_zip.adicionar("foto.jpeg", b"1") for _ in range(3)]
+    assert nomes == ["foto.jpeg", "foto (1).jpeg", "foto (2).jpeg"]
+    assert _nomes(arquivo_zip) == nomes
+
+
+def test_sufixo_nao_colide_com_nome_ja_usado():
+    with ZipEmDisco() as arquivo_zip:
+        arquivo_zip.adicionar("foto (1).jpeg", b"1")
+        arquivo_zip.adicionar("foto.jpeg", b"2")
+        assert arquivo_zip.adicionar("foto.jpeg", b"3") == "foto (2).jpeg"
+
+
+def test_nomes_sem_extensao_e_iniciados_com_ponto():
+    with ZipEmDisco() as arquivo_zip:
+        arquivo_zip.adicionar("LEIAME", b"1")
+        assert arquivo_zip.adicionar("LEIAME", b"2") == "LEIAME (1)"
+        arquivo_zip.adicionar(".env", b"1")
+        assert arquivo_zip.adicionar(".env", b"2") == ".env (1)"
+        assert arquivo_zip.adicionar("arquivo.tar.gz", b"1") == "arquivo.tar.gz"
+        assert arquivo_zip.adicionar("arquivo.tar.gz", b"2") == "arquivo.tar (1).gz"
+
+
+def test_conteudo_de_bytes_fluxos_e_arquivos(tmp_path):
+    caminho = tmp_path / "video.mp4"
+    caminho.write_bytes(b"em disco")
+    with ZipEmDisco() as arquivo_zip:
+        arquivo_zip.adicionar("a.txt", b"bytes")
+        arquivo_zip.adicionar_fluxo("a.txt", io.BytesIO(b"fluxo"))
+        arquivo_zip.adicionar_arquivo("video.mp4", str(caminho))
+    assert arquivo_zip.quantidade == 3
+    with zipfile.ZipFile(io.BytesIO(arquivo_zip.ler())) as lido:
+        assert lido.read("a.txt") == b"bytes"
+        assert lido.read("a (1).txt") == b"fluxo"
+        assert lido.read("video.mp4") == b"em disco"
+    arquivo_zip.descartar()
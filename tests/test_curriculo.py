@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+
+import pytest
+
+from utils.curriculo import (
+    gerar_modelo_csv,
+    ler_curriculos_em_lote,
+    nome_arquivo_curriculo,
+    validar_curriculo,
+)
+
+
+def _csv(linhas: list[list[str]], delimitador: str = ",") -> str:
+    cabecalho = next(csv.reader(io.StringIO(gerar_modelo_csv())))
+    texto = io.StringIO()
+    escritor = csv.writer(texto, delimiter=delimitador)
+    escritor.writerow(cabecalho)
+    escritor.writerows(linha + [""] * (len(cabecalho) - len(linha)) for linha in linhas)
+    return texto.getvalue()
+
+
+LINHA_CURRICULO = [
+    "José Conceição", "15/03/1990", "(11) 99999-0000", "jose@exemplo.com", "Analista",
+    "Empresa A", "Dev", "01/02/2015", "", "Desenvolvimento",
+    "", "", "", "", "",
+    "Universidade X", "Computação", "Graduação", "2010", "2014", "Concluído",
+]
+
+
+def test_csv_com_virgula():
+    curriculos = ler_curriculos_em_lote(_csv([LINHA_CURRICULO]).encode(), "csv")
+    assert len(curriculos) == 1
+    assert curriculos[0]["dados_basicos"]["Nome Completo"] == "José Conceição"
+    # A segunda experiência está vazia e a segunda formação nem foi preenchida
+    assert len(curriculos[0]["experiencias"]) == 1
+    assert len(curriculos[0]["formacoes"]) == 1
+
+
+def test_csv_do_excel_em_cp1252_com_ponto_e_virgula():
+    # A formação 2 fica vazia e a última coluna é a das habilidades
+    linha = [*LINHA_CURRICULO, *[""] * 6, "Python; SQL, Excel"]
+    dados = _csv([linha], delimitador=";").encode("cp1252")
+    curriculo = ler_curriculos_em_lote(dados, "csv")[0]
+    assert curriculo["dados_basicos"]["Nome Completo"] == "José Conceição"
+    assert curriculo["formacoes"][0]["Situação"] == "Concluído"
+    assert curriculo["habilidades"] == ["Python", "SQL", "Excel"]
+
+
+def test_csv_com_bom_utf8():
+    dados = "﻿".encode() + _csv([LINHA_CURRICULO]).encode()
+    assert ler_curriculos_em_lote(dados, "csv")[0]["dados_basicos"]["Nome Completo"] == "José Conceição"
+
+
+def test_json_precisa_ser_uma_lista():
+    with pytest.raises(ValueError):
+        ler_curriculos_em_lote(json.dumps({"dados_basicos": {}}).encode(), "json")
+
+
+def test_validar_curriculo_aceita_datas_brasileiras():
+    curriculo = validar_curriculo(ler_curriculos_em_lote(_csv([LINHA_CURRICULO]).encode(), "csv")[0])
+    assert str(curriculo["dados_basicos"]["Data de Nascimento"]) == "1990-03-15"
+    assert curriculo["experiencias"][0]["Demissão"] is None
+
+
+def test_validar_curriculo_descreve_os_campos_invalidos():
+    linha = list(LINHA_CURRICULO)
+    linha[3] = "sem-arroba"
+    linha[8] = "01/01/2014"  # Demissão antes da admissão
+    curriculo = ler_curriculos_em_lote(_csv([linha]).encode(), "csv")[0]
+    with pytest.raises(ValueError) as erro:
+        validar_curriculo(curriculo)
+    assert "dados_basicos.Email" in str(erro.value)
+    assert "a demissão é anterior à admissão" in str(erro.value)
+
+
+@pytest.mark.parametrize(
+    "nome, esperado",
+    [
+        ("Maria Silva", "007 - Maria Silva.pdf"),
+        ("../../etc/passwd", "007 - _.._etc_passwd.pdf"),
+        ('a\\b:c*d?"e<f>g|h', "007 - a_b_c_d__e_f_g_h.pdf"),
+        ("  ..  ", "007 - curriculo.pdf"),
+        ("x" * 150, f"007 - {'x' * 100}.pdf"),
+    ],
+)
+def test_nome_arquivo_curriculo(nome, esperado):
+    assert nome_arquivo_curriculo(7, nome) == esperado
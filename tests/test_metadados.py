@@ -0,0 +1,92 @@
+import struct
+import zlib
+from io import BytesIO
+
+from PIL import Image
+
+from utils.metadados import extrair_metadados
+
+
+def _jpeg_com_exif() -> BytesIO:
+    exif = Image.Exif()
+    exif[0x010F] = "Fabricante de Teste"  # Make
+    exif[0x0110] = "Modelo de Teste"  # Model
+    fluxo = BytesIO()
+    Image.new("RGB", (32, 32), "red").save(fluxo, format="JPEG", exif=exif.tobytes())
+    fluxo.seek(0)
+    return fluxo
+
+
+def test_jpeg_com_exif():
+    resultado = extrair_metadados(_jpeg_com_exif())
+    valores = {metadado.chave: metadado.valor for metadado in resultado.metadados}
+    assert resultado.formato == "JPEG"
+    assert valores["Make"] == "Fabricante de Teste"
+    assert valores["Model"] == "Modelo de Teste"
+
+
+def test_jpeg_com_exif_detalhes_e_miniatura():
+    resultado = extrair_metadados(_jpeg_com_exif(), detalhes=True, miniatura=True)
+    assert any(metadado.chave == "Make" for metadado in resultado.metadados)
+
+
+def _png_com_chunk(tipo: bytes, dados: bytes) -> BytesIO:
+    fluxo = BytesIO()
+    Image.new("RGB", (16, 8)).save(fluxo, format="PNG")
+    png = fluxo.getvalue()
+    chunk = struct.pack(">I4s", len(dados), tipo) + dados
+    chunk += struct.pack(">I", zlib.crc32(chunk[4:]))
+    # O chunk extra entra logo após o IHDR (assinatura de 8 bytes + IHDR de 25)
+    return BytesIO(png[:33] + chunk + png[33:])
+
+
+def _valores(resultado) -> dict:
+    return {metadado.chave: metadado.valor for metadado in resultado.metadados}
+
+
+def test_jpeg_truncado_no_cabecalho_de_segmento():
+    jpeg = _jpeg_com_exif().getvalue()
+    # Corta no meio do tamanho do primeiro segmento, logo após o marcador
+    resultado = extrair_metadados(BytesIO(jpeg[:5]))
+    assert resultado.formato == "JPEG"
+    assert resultado.metadados == []
+
+
+def test_jpeg_truncado_dentro_do_exif():
+    jpeg = _jpeg_com_exif().getvalue()
+    resultado = extrair_metadados(BytesIO(jpeg[:30]))
+    assert resultado.formato == "JPEG"
+
+
+def test_png_itxt_sem_nada_apos_a_chave():
+    resultado = extrair_metadados(_png_com_chunk(b"iTXt", b"Comment\x00"))
+    valores = _valores(resultado)
+    assert resultado.formato == "PNG"
+    assert valores["Largura"] == "16"
+    assert "Comment" not in valores
+
+
+def test_png_itxt():
+    dados = b"Comment\x00\x00\x00pt\x00Comentario\x00ol\xc3\xa1"
+    assert _valores(extrair_metadados(_png_com_chunk(b"iTXt", dados)))["Comment"] == "olá"
+
+
+def test_png_ztxt_corrompido():
+    resultado = extrair_metadados(_png_com_chunk(b"zTXt", b"Comment\x00\x00nao e zlib"))
+    assert "Comment" not in _valores(resultado)
+
+
+def test_png_truncado_dentro_de_chunk():
+    png = _png_com_chunk(b"tEXt", b"Comment\x00texto").getvalue()
+    resultado = extrair_metadados(BytesIO(png[:40]))
+    assert _valores(resultado)["Largura"] == "16"
+
+
+def test_webp_com_perda_e_sem_perda():
+    for opcoes in ({"lossless": False}, {"lossless": True}):
+        fluxo = BytesIO()
+        Image.new("RGB", (37, 21)).save(fluxo, format="WEBP", **opcoes)
+        resultado = extrair_metadados(fluxo)
+        assert resultado.formato == "WEBP"
+        assert _valores(resultado)["Largura"] == "37"
+        assert _valores(resultado)["Altura"] == "21"
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from utils.resultados import ArmazemResultados
+
+
+def _armazem(diretorio, **opcoes) -> ArmazemResultados:
+    opcoes = {"ttl_segundos": 60, "cota_sessao_bytes": 100, "cota_global_bytes": 100, **opcoes}
+    return ArmazemResultados(str(diretorio), **opcoes)
+
+
+def _guardar(armazem: ArmazemResultados, sessao: str, tamanho: int) -> str:
+    return armazem.guardar_bytes(sessao, b"x" * tamanho, "saida.bin", "application/octet-stream", "Baixar")
+
+
+def test_guardar_e_ler(tmp_path):
+    armazem = _armazem(tmp_path)
+    id = armazem.guardar_bytes("s1", b"conteudo", "saida.txt", "text/plain", "Baixar")
+    assert armazem.ler(id) == b"conteudo"
+    assert armazem.obter(id).nome_arquivo == "saida.txt"
+    armazem.remover(id)
+    assert armazem.ler(id) is None
+
+
+def test_cota_da_sessao_descarta_os_usados_ha_mais_tempo(tmp_path):
+    armazem = _armazem(tmp_path, cota_sessao_bytes=25)
+    antigo = _guardar(armazem, "s1", 10)
+    recente = _guardar(armazem, "s1", 10)
+    armazem.obter(antigo)  # "recente" passa a ser o usado há mais tempo
+    novo = _guardar(armazem, "s1", 10)
+    assert armazem.obter(recente) is None
+    assert armazem.obter(antigo) and armazem.obter(novo)
+
+
+def test_cota_da_sessao_nao_afeta_outras_sessoes(tmp_path):
+    armazem = _armazem(tmp_path, cota_sessao_bytes=15)
+    outra = _guardar(armazem, "s2", 10)
+    _guardar(armazem, "s1", 10)
+    _guardar(armazem, "s1", 10)
+    assert armazem.obter(outra)
+    assert armazem.estatisticas() == {"resultados": 2, "sessoes": 2, "bytes": 20}
+
+
+def test_cota_global_descarta_de_qualquer_sessao(tmp_path):
+    armazem = _armazem(tmp_path, cota_global_bytes=25)
+    primeiro = _guardar(armazem, "s1", 10)
+    _guardar(armazem, "s2", 10)
+    _guardar(armazem, "s3", 10)
+    assert armazem.obter(primeiro) is None
+    assert armazem.estatisticas()["bytes"] == 20
+
+
+def test_recusa_arquivo_maior_que_a_cota(tmp_path):
+    armazem = _armazem(tmp_path, cota_sessao_bytes=5)
+    with pytest.raises(ValueError):
+        _guardar(armazem, "s1", 10)
+    assert armazem.estatisticas()["resultados"] == 0
+
+
+def test_varredura_remove_expirados_e_sessoes_encerradas(tmp_path):
+    encerradas = {"s2"}
+    armazem = _armazem(tmp_path, sessao_ativa=lambda sessao: sessao not in encerradas)
+    expirado = _guardar(armazem, "s1", 10)
+    armazem.obter(expirado).acessado_em = time.monotonic() - 120
+    valido = _guardar(armazem, "s1", 10)
+    de_sessao_encerrada = _guardar(armazem, "s2", 10)
+    armazem.varrer()
+    assert armazem.obter(expirado) is None
+    assert armazem.obter(de_sessao_encerrada) is None
+    assert armazem.ler(valido) == b"x" * 10
+
@@ -0,0 +1,112 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from utils.temporarios import EspacoInsuficiente, GerenciadorTemporarios, criar_diretorio_processo
+
+
+def _gerenciador(diretorio, limite_bytes: int = 100) -> GerenciadorTemporarios:
+    return GerenciadorTemporarios(str(diretorio), limite_bytes=limite_bytes, margem_disco_bytes=0)
+
+
+def test_reserva_cria_e_apaga_o_diretorio(tmp_path):
+    gerenciador = _gerenciador(tmp_path)
+    with gerenciador.reservar(10) as diretorio:
+        assert os.path.isdir(diretorio)
+        assert gerenciador.estatisticas() == {"reservas": 1, "bytes": 10}
+    assert not os.path.exists(diretorio)
+    assert gerenciador.estatisticas() == {"reservas": 0, "bytes": 0}
+
+
+def test_libera_a_reserva_quando_a_conversao_falha(tmp_path):
+    gerenciador = _gerenciador(tmp_path)
+    with pytest.raises(RuntimeError):
+        with gerenciador.reservar(10) as diretorio:
+            raise RuntimeError("falha na conversão")
+    assert not os.path.exists(diretorio)
+    assert gerenciador.estatisticas()["bytes"] == 0
+
+
+def test_recusa_o_que_nunca_caberia(tmp_path):
+    with pytest.raises(EspacoInsuficiente):
+        with _gerenciador(tmp_path).reservar(200, espera_maxima=10):
+            pass
+
+
+def test_recusa_sem_espera_quando_nao_ha_espaco(tmp_path):
+    gerenciador = _gerenciador(tmp_path)
+    with gerenciador.reservar(60):
+        with pytest.raises(EspacoInsuficiente):
+            with gerenciador.reservar(60, espera_maxima=0.2):
+                pass
+
+
+def test_espera_na_fila_ate_liberar_espaco(tmp_path):
+    gerenciador = _gerenciador(tmp_path)
+    liberar = threading.Event()
+
+    def ocupar() -> None:
+        with gerenciador.reservar(60):
+            liberar.wait()
+
+    ocupante = threading.Thread(target=ocupar)
+    ocupante.start()
+    while gerenciador.estatisticas()["reservas"] == 0:
+        time.sleep(0.01)
+    threading.Timer(0.2, liberar.set).start()
+    with gerenciador.reservar(60, espera_maxima=5):
+        assert gerenciador.estatisticas() == {"reservas": 1, "bytes": 60}
+    ocupante.join()
+
+
+def test_desistencia_durante_a_espera_nao_reserva(tmp_path):
+    gerenciador = _gerenciador(tmp_path)
+
+    def desistir() -> None:
+        raise InterruptedError
+
+    with gerenciador.reservar(60):
+        with pytest.raises(InterruptedError):
+            with gerenciador.reservar(60, espera_maxima=5, ao_aguardar=desistir):
+                pass
+        assert gerenciador.estatisticas()["reservas"] == 1
+
+
+def _processo_com_diretorio(raiz) -> tuple[subprocess.Popen, str]:
+    codigo = (
+        "import sys\n"
+        "from utils.temporarios import criar_diretorio_processo\n"
+        "print(criar_diretorio_processo(sys.argv[1]), flush=True)\n"
+        "sys.stdin.read()\n"
+    )
+    processo = subprocess.Popen(
+        [sys.executable, "-c", codigo, str(raiz)],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    return processo, processo.stdout.readline().decode().strip()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="A trava entre processos usa fcntl")
+def test_varredura_mantem_processos_vivos_e_remove_encerrados(tmp_path):
+    (tmp_path / "sobra-de-versao-anterior").mkdir()
+    vivo, diretorio_vivo = _processo_com_diretorio(tmp_path)
+    encerrado, diretorio_encerrado = _processo_com_diretorio(tmp_path)
+    encerrado.communicate()
+    try:
+        proprio = criar_diretorio_processo(str(tmp_path))
+        assert os.path.isdir(diretorio_vivo)
+        assert not os.path.exists(diretorio_encerrado)
+        assert not (tmp_path / "sobra-de-versao-anterior").exists()
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            os.path.basename(caminho) + sufixo
+            for caminho in (diretorio_vivo, proprio)
+            for sufixo in ("", ".lock")
+        )
+    finally:
+        vivo.communicate()
@@ -0,0 +1,42 @@
+import pytest
+
+from utils.video import planejar_segmentos_video
+
+
+def _cortes(segmentos: list[tuple[float, float]]) -> list[float]:
+    return [inicio for inicio, _ in segmentos[1:]]
+
+
+def _cobre(segmentos: list[tuple[float, float]], duracao: float) -> bool:
+    fim = 0.0
+    for inicio, duracao_segmento in segmentos:
+        if inicio != pytest.approx(fim) or duracao_segmento <= 0:
+            return False
+        fim = inicio + duracao_segmento
+    return fim == pytest.approx(duracao)
+
+
+def test_corta_no_quadro_chave_mais_proximo():
+    quadros_chave = [0.0, 9.0, 19.0, 31.0, 42.0]
+    segmentos = planejar_segmentos_video(48.0, 4, quadros_chave)
+    assert _cortes(segmentos) == [9.0, 19.0, 31.0]
+    assert _cobre(segmentos, 48.0)
+
+
+def test_com_poucos_quadros_chave_gera_menos_segmentos():
+    segmentos = planejar_segmentos_video(60.0, 4, [0.0, 28.0])
+    assert _cortes(segmentos) == [28.0]
+    assert _cobre(segmentos, 60.0)
+
+
+def test_desconta_o_instante_inicial_do_conteiner():
+    # Instantes absolutos de um arquivo que começa em 1.4s (ex.: MPEG-TS)
+    quadros_chave = [1.4, 11.4, 21.4, 31.4]
+    segmentos = planejar_segmentos_video(40.0, 4, quadros_chave, inicio=1.4)
+    assert _cortes(segmentos) == pytest.approx([10.0, 20.0, 30.0])
+    assert _cobre(segmentos, 40.0)
+
+
+def test_ignora_quadro_chave_no_fim():
+    segmentos = planejar_segmentos_video(20.0, 2, [0.0, 20.0])
+    assert segmentos == [(0.0, 20.0)]
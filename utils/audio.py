@@ -0,0 +1,552 @@
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from io import BytesIO
+from typing import BinaryIO, Literal
+
+import numpy as np
+
+from utils.ffmpeg import caminho_ffmpeg, duracao_midia, sondar_midia
+from utils.processos import MAX_PROCESSOS, mapear_em_pool
+
+
+FORMATOS_AUDIO = [
+    "ac3",
+    "aiff",
+    "flac",
+    "mp3",
+    "ogg",
+    "opus",
+    "wav",
+]
+
+# Muxer e codec do ffmpeg para cada formato
+PARAMETROS_FFMPEG = {
+    "ac3": ["-f", "ac3", "-c:a", "ac3"],
+    "aiff": ["-f", "aiff"],
+    "flac": ["-f", "flac", "-c:a", "flac"],
+    "mp3": ["-f", "mp3", "-c:a", "libmp3lame"],
+    "ogg": ["-f", "ogg", "-c:a", "libvorbis"],
+    "opus": ["-f", "opus", "-c:a", "libopus"],
+    "wav": ["-f", "wav"],
+}
+TAMANHO_BLOCO = 256 * 1024
+
+# Conversão paralela: cada segmento tem pelo menos esta duração, e o corte procura
+# um silêncio até esta distância do ponto ideal
+DURACAO_MINIMA_SEGMENTO = 30.0
+TOLERANCIA_CORTE = 10.0
+LIMIAR_SILENCIO_DB = -40
+DURACAO_MINIMA_SILENCIO = 0.2
+
+TipoCorte = Literal["silencio", "fixo"]
+
+# Extensão e muxer para guardar cada codec de áudio sem recodificar (nomes do ffprobe)
+CONTEINERES_AUDIO = {
+    "aac": ("m4a", "ipod"),
+    "alac": ("m4a", "ipod"),
+    "mp3": ("mp3", "mp3"),
+    "opus": ("opus", "opus"),
+    "vorbis": ("ogg", "ogg"),
+    "flac": ("flac", "flac"),
+    "ac3": ("ac3", "ac3"),
+    "eac3": ("eac3", "eac3"),
+    "pcm_s16le": ("wav", "wav"),
+    "pcm_s24le": ("wav", "wav"),
+}
+
+# Formatos sem compressão com perda, cuja saída pode ser ~10x maior que um mp3
+FORMATOS_AUDIO_SEM_PERDA = ["aiff", "flac", "wav"]
+# Formatos em que a conversão em segmentos paralelos compensa. wav e aiff ficam de
+# fora porque gravá-los quase não custa nada, então dividir só soma trabalho. Os
+# com perda também: cada segmento traz o atraso e o preenchimento do codificador,
+# que viram falhas audíveis em cada emenda, e uni-los sem isso exigiria aparar
+# segmentos sobrepostos pelo atraso de cada codificador, o que não é feito aqui
+FORMATOS_AUDIO_PARALELO = ["flac"]
+
+# Teto da taxa de bits (bits/s) dos formatos com perda, para estimar o tamanho do
+# áudio extraído de um vídeo. Os sem perda são estimados pelas amostras, em 24 bits
+TAXA_BITS_MAXIMA_FORMATO = {
+    "ac3": 640_000,
+    "mp3": 320_000,
+    "ogg": 500_000,
+    "opus": 512_000,
+}
+BITS_POR_AMOSTRA_SEM_PERDA = 24
+
+# Forma de onda: o áudio é decodificado em mono com taxa reduzida, e os picos são
+# calculados em blocos fixos enquanto o ffmpeg ainda está decodificando
+TAXA_FORMA_ONDA = 8000
+AMOSTRAS_POR_BLOCO_ONDA = 256
+PONTOS_FORMA_ONDA = 1000
+
+
+def estimar_espaco_audio(tamanho_entrada: int, formato: str, paralelo: bool = False) -> int:
+    """
+    Estima o espaço temporário em disco de uma conversão de áudio.
+
+    Params:
+        tamanho_entrada (int): Tamanho do áudio original em bytes.
+        formato (str): Formato de destino (ver FORMATOS_AUDIO).
+        paralelo (bool, optional): Se a conversão é em segmentos, que existem junto
+            com a saída final. Defaults to False.
+
+    Returns:
+        int: Bytes estimados, contando a entrada gravada em disco.
+    """
+    fator_saida = 12 if formato in FORMATOS_AUDIO_SEM_PERDA else 2
+    return tamanho_entrada * (1 + fator_saida * (2 if paralelo else 1))
+
+
+def estimar_espaco_extracao(
+    tamanho_video: int,
+    duracao: float | None,
+    formato: str | None,
+    fluxo_audio: dict | None = None,
+) -> int:
+    """
+    Estima o espaço temporário em disco da extração do áudio de um vídeo.
+
+    Params:
+        tamanho_video (int): Tamanho do vídeo em bytes, gravado em disco como entrada.
+        duracao (float | None): Duração do vídeo em segundos.
+        formato (str | None): Formato de destino ou None para copiar o áudio.
+        fluxo_audio (dict, optional): Fluxo de áudio do vídeo (ver FluxoMidia), com a
+            taxa de amostragem, os canais e a taxa de bits. Defaults to None.
+
+    Returns:
+        int: Bytes estimados, contando o vídeo gravado em disco.
+    """
+    fluxo_audio = fluxo_audio or {}
+    if formato is None:
+        taxa_bits = fluxo_audio.get("taxa_bits") or max(TAXA_BITS_MAXIMA_FORMATO.values())
+    elif formato in FORMATOS_AUDIO_SEM_PERDA:
+        taxa_bits = (
+            (fluxo_audio.get("taxa_amostragem") or 48000)
+            * (fluxo_audio.get("canais") or 2)
+            * BITS_POR_AMOSTRA_SEM_PERDA
+        )
+    else:
+        taxa_bits = TAXA_BITS_MAXIMA_FORMATO.get(formato, max(TAXA_BITS_MAXIMA_FORMATO.values()))
+    if not duracao:
+        # Sem a duração, o áudio não passa do tamanho do próprio vídeo na maioria dos casos
+        return 2 * tamanho_video
+    return tamanho_video + int(duracao * taxa_bits / 8 * 1.1)
+
+
+def _alimentar_em_thread(processo: subprocess.Popen, entrada: BinaryIO) -> threading.Thread:
+    """
+    Envia o arquivo ao stdin do processo em blocos, em uma thread separada, para que
+    quem chamou possa ler o stdout/stderr ao mesmo tempo sem travar.
+    """
+
+    def alimentar() -> None:
+        try:
+            entrada.seek(0)
+            while bloco := entrada.read(TAMANHO_BLOCO):
+                processo.stdin.write(bloco)
+        except (BrokenPipeError, ValueError):
+            # O ffmpeg parou de ler (erro na entrada); o motivo vem pelo stderr
+            pass
+        finally:
+            try:
+                processo.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    alimentador = threading.Thread(target=alimentar, daemon=True)
+    alimentador.start()
+    return alimentador
+
+
+def _drenar_em_thread(fluxo: BinaryIO) -> tuple[threading.Thread, list[bytes]]:
+    """
+    Lê um fluxo de saída do processo (ex.: stderr) em uma thread separada, para que
+    o processo não trave com o pipe cheio enquanto quem chamou lê o outro fluxo.
+
+    Returns:
+        tuple[threading.Thread, list[bytes]]: Thread de leitura e os blocos lidos,
+            completos depois de join().
+    """
+    blocos: list[bytes] = []
+
+    def drenar() -> None:
+        while bloco := fluxo.read(TAMANHO_BLOCO):
+            blocos.append(bloco)
+
+    leitor = threading.Thread(target=drenar, daemon=True)
+    leitor.start()
+    return leitor, blocos
+
+
+def transcodificar_audio(entrada: BinaryIO | str, caminho_saida: str, formato: str) -> None:
+    """
+    Converte um áudio com o ffmpeg sem decodificá-lo inteiro na memória.
+
+    A entrada é enviada ao stdin do ffmpeg em blocos e a saída é gravada direto em
+    disco pelo próprio ffmpeg, então o uso de memória não depende da duração.
+
+    Params:
+        entrada (BinaryIO | str): Arquivo aberto (enviado pelo stdin) ou caminho em disco.
+        caminho_saida (str): Caminho onde o áudio convertido será gravado.
+        formato (str): Formato de destino (ver FORMATOS_AUDIO).
+
+    Raises:
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    por_caminho = isinstance(entrada, str)
+    comando = [
+        caminho_ffmpeg(),
+        "-hide_banner",
+        "-loglevel", "error",
+        *(["-nostdin"] if por_caminho else []),
+        "-y",
+        "-i", entrada if por_caminho else "pipe:0",
+        "-vn",
+        *PARAMETROS_FFMPEG[formato],
+        caminho_saida,
+    ]
+    processo = subprocess.Popen(
+        comando,
+        stdin=subprocess.DEVNULL if por_caminho else subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+    alimentador = None if por_caminho else _alimentar_em_thread(processo, entrada)
+    erros = processo.stderr.read()
+    processo.wait()
+    if alimentador:
+        alimentador.join()
+    if processo.returncode != 0:
+        raise RuntimeError(erros.decode(errors="replace").strip() or "Falha no ffmpeg")
+
+
+def converter_audio(audio: bytes | BinaryIO, formato: str) -> bytes:
+    """
+    Converte um áudio para outro formato.
+
+    Params:
+        audio (bytes | BinaryIO): Conteúdo ou arquivo aberto do áudio original.
+        formato (str): Formato de destino (ver FORMATOS_AUDIO).
+
+    Returns:
+        bytes: Conteúdo do áudio convertido.
+    """
+    if isinstance(audio, bytes):
+        audio = BytesIO(audio)
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho_saida = os.path.join(diretorio, f"saida.{formato}")
+        transcodificar_audio(audio, caminho_saida, formato)
+        with open(caminho_saida, "rb") as arquivo:
+            return arquivo.read()
+
+
+def detectar_silencios(caminho: str) -> list[tuple[float, float]]:
+    """
+    Encontra os trechos de silêncio de um áudio com o filtro silencedetect do ffmpeg.
+
+    Params:
+        caminho (str): Caminho do áudio.
+
+    Returns:
+        list[tuple[float, float]]: Início e fim de cada silêncio, em segundos.
+    """
+    processo = subprocess.run(
+        [
+            caminho_ffmpeg(),
+            "-hide_banner",
+            "-nostats",
+            "-nostdin",
+            "-i", caminho,
+            "-vn",
+            "-af", f"silencedetect=noise={LIMIAR_SILENCIO_DB}dB:d={DURACAO_MINIMA_SILENCIO}",
+            "-f", "null",
+            "-",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    saida = processo.stderr.decode(errors="replace")
+    inicios = [float(valor) for valor in re.findall(r"silence_start: (-?[\d.]+)", saida)]
+    fins = [float(valor) for valor in re.findall(r"silence_end: ([\d.]+)", saida)]
+    return list(zip(inicios, fins))
+
+
+def planejar_segmentos(
+    duracao: float, quantidade: int, silencios: list[tuple[float, float]] | None = None
+) -> list[tuple[float, float]]:
+    """
+    Divide a duração em segmentos de tamanho parecido.
+
+    Com silêncios, cada corte vai para o meio do silêncio mais próximo do ponto
+    ideal (dentro de TOLERANCIA_CORTE), para que a emenda caia onde não se ouve.
+
+    Params:
+        duracao (float): Duração total em segundos.
+        quantidade (int): Quantidade desejada de segmentos.
+        silencios (list[tuple[float, float]], optional): Silêncios detectados. Defaults to None.
+
+    Returns:
+        list[tuple[float, float]]: Início e duração de cada segmento.
+    """
+    cortes = [0.0]
+    for n in range(1, quantidade):
+        ideal = duracao * n / quantidade
+        candidatos = [
+            (inicio + fim) / 2
+            for inicio, fim in silencios or []
+            if abs((inicio + fim) / 2 - ideal) <= TOLERANCIA_CORTE
+        ]
+        corte = min(candidatos, key=lambda meio: abs(meio - ideal)) if candidatos else ideal
+        if corte > cortes[-1]:
+            cortes.append(corte)
+    cortes.append(duracao)
+    return [(inicio, fim - inicio) for inicio, fim in zip(cortes, cortes[1:])]
+
+
+def transcodificar_segmento(
+    caminho_entrada: str, caminho_saida: str, formato: str, inicio: float, duracao: float
+) -> str:
+    """
+    Converte um trecho do áudio. Roda nos processos do pool.
+
+    Params:
+        caminho_entrada (str): Caminho do áudio original.
+        caminho_saida (str): Caminho do segmento convertido.
+        formato (str): Formato de destino (ver FORMATOS_AUDIO).
+        inicio (float): Início do trecho em segundos.
+        duracao (float): Duração do trecho em segundos.
+
+    Returns:
+        str: Caminho do segmento convertido.
+
+    Raises:
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    # -ss antes de -i busca direto no ponto de início, com precisão de amostra
+    processo = subprocess.run(
+        [
+            caminho_ffmpeg(),
+            "-hide_banner",
+            "-loglevel", "error",
+            "-nostdin",
+            "-y",
+            "-ss", f"{inicio:.6f}",
+            "-t", f"{duracao:.6f}",
+            "-i", caminho_entrada,
+            "-vn",
+            *PARAMETROS_FFMPEG[formato],
+            caminho_saida,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.decode(errors="replace").strip() or "Falha no ffmpeg")
+    return caminho_saida
+
+
+def _juntar_segmentos(caminhos: list[str], caminho_saida: str, formato: str) -> None:
+    lista = os.path.join(os.path.dirname(caminhos[0]), "segmentos.txt")
+    with open(lista, "w") as arquivo:
+        for caminho in caminhos:
+            arquivo.write(f"file '{caminho}'\n")
+    # Os segmentos já estão no formato final, só os pacotes são copiados
+    processo = subprocess.run(
+        [
+            caminho_ffmpeg(),
+            "-hide_banner",
+            "-loglevel", "error",
+            "-nostdin",
+            "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", lista,
+            "-c", "copy",
+            "-f", PARAMETROS_FFMPEG[formato][1],
+            caminho_saida,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.decode(errors="replace").strip() or "Falha no ffmpeg")
+
+
+def transcodificar_audio_paralelo(
+    caminho_entrada: str,
+    caminho_saida: str,
+    formato: str,
+    corte: TipoCorte = "fixo",
+    diretorio_temporario: str | None = None,
+) -> int:
+    """
+    Converte um áudio longo dividindo-o em segmentos convertidos em paralelo.
+
+    Os segmentos são convertidos no pool de processos e depois unidos sem
+    recodificar, com emenda exata. Só vale para FORMATOS_AUDIO_PARALELO; os demais
+    formatos, e áudios curtos demais para dividir, são convertidos de uma vez.
+
+    Params:
+        caminho_entrada (str): Caminho do áudio original.
+        caminho_saida (str): Caminho onde o áudio convertido será gravado.
+        formato (str): Formato de destino (ver FORMATOS_AUDIO).
+        corte (TipoCorte, optional): Cortar em pontos fixos ou em silêncios. Como a emenda
+            dos formatos sem perda é exata, cortar em silêncios só adiciona uma leitura
+            completa do áudio antes da conversão. Defaults to "fixo".
+        diretorio_temporario (str, optional): Onde gravar os segmentos. Defaults to None (temporário do sistema).
+
+    Returns:
+        int: Quantidade de segmentos usados.
+
+    Raises:
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    if formato not in FORMATOS_AUDIO_PARALELO:
+        transcodificar_audio(caminho_entrada, caminho_saida, formato)
+        return 1
+
+    duracao = duracao_midia(caminho_entrada)
+    quantidade = min(MAX_PROCESSOS, int(duracao // DURACAO_MINIMA_SEGMENTO))
+    if quantidade < 2:
+        transcodificar_audio(caminho_entrada, caminho_saida, formato)
+        return 1
+
+    silencios = detectar_silencios(caminho_entrada) if corte == "silencio" else None
+    segmentos = planejar_segmentos(duracao, quantidade, silencios)
+    with tempfile.TemporaryDirectory(dir=diretorio_temporario) as diretorio:
+        caminhos = [
+            os.path.join(diretorio, f"segmento_{n:03d}.{formato}") for n in range(len(segmentos))
+        ]
+        argumentos = (
+            (caminho_entrada, caminho, formato, inicio, duracao_segmento)
+            for caminho, (inicio, duracao_segmento) in zip(caminhos, segmentos)
+        )
+        for _, futuro in mapear_em_pool(transcodificar_segmento, argumentos):
+            futuro.result()
+        _juntar_segmentos(caminhos, caminho_saida, formato)
+    return len(segmentos)
+
+
+def calcular_forma_de_onda(
+    audio: bytes | BinaryIO, pontos: int = PONTOS_FORMA_ONDA
+) -> tuple[np.ndarray, float]:
+    """
+    Calcula os picos (mínimo e máximo) do áudio para desenhar a forma de onda.
+
+    O ffmpeg decodifica o áudio em mono a TAXA_FORMA_ONDA e as amostras são lidas em
+    blocos, reduzidos a um par mínimo/máximo por vez. Assim só os picos ficam na
+    memória, e não o áudio decodificado inteiro.
+
+    Params:
+        audio (bytes | BinaryIO): Conteúdo ou arquivo aberto do áudio.
+        pontos (int, optional): Quantidade máxima de pontos. Defaults to PONTOS_FORMA_ONDA.
+
+    Returns:
+        tuple[np.ndarray, float]: Picos com forma (pontos, 2), entre -1 e 1, e a duração em segundos.
+
+    Raises:
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    if isinstance(audio, bytes):
+        audio = BytesIO(audio)
+    processo = subprocess.Popen(
+        [
+            caminho_ffmpeg(),
+            "-hide_banner",
+            "-loglevel", "error",
+            "-i", "pipe:0",
+            "-vn",
+            "-ac", "1",
+            "-ar", str(TAXA_FORMA_ONDA),
+            "-f", "s16le",
+            "-c:a", "pcm_s16le",
+            "pipe:1",
+        ],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    alimentador = _alimentar_em_thread(processo, audio)
+    # Com stdout e stderr em pipes, um áudio corrompido que gere muitas mensagens de
+    # erro encheria o stderr e travaria o ffmpeg enquanto o stdout é lido
+    leitor_erros, erros = _drenar_em_thread(processo.stderr)
+
+    minimos, maximos = [], []
+    total_amostras = 0
+    # Múltiplo do tamanho do bloco, para que nenhum bloco fique dividido entre leituras
+    tamanho_leitura = AMOSTRAS_POR_BLOCO_ONDA * 2 * 512
+    while dados := processo.stdout.read(tamanho_leitura):
+        amostras = np.frombuffer(dados[: len(dados) // 2 * 2], dtype="<i2")
+        total_amostras += amostras.size
+        if resto := amostras.size % AMOSTRAS_POR_BLOCO_ONDA:
+            # Só a última leitura pode vir incompleta; repetir a última amostra não altera os picos
+            amostras = np.pad(amostras, (0, AMOSTRAS_POR_BLOCO_ONDA - resto), mode="edge")
+        blocos = amostras.reshape(-1, AMOSTRAS_POR_BLOCO_ONDA)
+        minimos.append(blocos.min(axis=1))
+        maximos.append(blocos.max(axis=1))
+    processo.wait()
+    alimentador.join()
+    leitor_erros.join()
+    if processo.returncode != 0:
+        raise RuntimeError(b"".join(erros).decode(errors="replace").strip() or "Falha no ffmpeg")
+
+    if not minimos:
+        return np.zeros((0, 2), dtype=np.float32), 0.0
+    minimos = np.concatenate(minimos)
+    maximos = np.concatenate(maximos)
+    if minimos.size > pontos:
+        inicios = np.linspace(0, minimos.size, pontos, endpoint=False).astype(np.intp)
+        minimos = np.minimum.reduceat(minimos, inicios)
+        maximos = np.maximum.reduceat(maximos, inicios)
+    picos = np.stack([minimos, maximos], axis=1).astype(np.float32) / 32768
+    return picos, total_amostras / TAXA_FORMA_ONDA
+
+
+def extrair_audio(caminho_video: str, caminho_saida: str, formato: str | None = None) -> None:
+    """
+    Extrai a trilha de áudio de um vídeo sem decodificar os quadros.
+
+    Sem formato, o fluxo de áudio é copiado como está (ver CONTEINERES_AUDIO para a
+    extensão de cada codec). Com formato, só o áudio é recodificado. Nos dois casos
+    o vídeo é descartado pelo demuxer, antes de qualquer decodificação.
+
+    Params:
+        caminho_video (str): Caminho do vídeo.
+        caminho_saida (str): Caminho onde o áudio será gravado.
+        formato (str, optional): Formato de destino (ver FORMATOS_AUDIO), ou None para
+            copiar o áudio original. Defaults to None.
+
+    Raises:
+        ValueError: Se o codec do áudio não tiver um contêiner para a cópia.
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    if formato:
+        transcodificar_audio(caminho_video, caminho_saida, formato)
+        return None
+    if not (audios := sondar_midia(caminho_video).fluxos_do_tipo("audio")):
+        raise ValueError("O vídeo não tem áudio.")
+    if audios[0].codec not in CONTEINERES_AUDIO:
+        raise ValueError(f"Não é possível copiar áudio {audios[0].codec}; escolha um formato.")
+    processo = subprocess.run(
+        [
+            caminho_ffmpeg(),
+            "-hide_banner",
+            "-loglevel", "error",
+            "-nostdin",
+            "-y",
+            "-i", caminho_video,
+            "-map", "0:a:0",
+            "-vn",
+            "-c:a", "copy",
+            "-f", CONTEINERES_AUDIO[audios[0].codec][1],
+            caminho_saida,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.decode(errors="replace").strip() or "Falha no ffmpeg")
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import cache
+from typing import BinaryIO
+
+from loguru import logger
+
+
+DIRETORIO_CACHE = os.environ.get(
+    "DETUDO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "detudo-cache")
+)
+LIMITE_CACHE_BYTES = int(os.environ.get("DETUDO_CACHE_LIMITE_MB", 2048)) * 1024 * 1024
+
+# Altere quando a lógica de conversão mudar, para invalidar resultados antigos
+VERSAO_CACHE = 1
+
+
+def hash_conteudo(dados: bytes | memoryview) -> str:
+    """
+    Calcula o hash SHA-256 do conteúdo de um arquivo.
+
+    Params:
+        dados (bytes | memoryview): Conteúdo do arquivo.
+
+    Returns:
+        str: Hash em hexadecimal.
+    """
+    return hashlib.sha256(dados).hexdigest()
+
+
+class CacheConversao:
+    """
+    Cache em disco dos resultados de conversão, endereçado pelo conteúdo da entrada.
+
+    A chave combina o hash da entrada, o formato de destino e os parâmetros do
+    codificador. Quando o tamanho total passa do limite, as entradas usadas há
+    mais tempo são removidas (LRU).
+    """
+
+    def __init__(self, diretorio: str = DIRETORIO_CACHE, limite_bytes: int = LIMITE_CACHE_BYTES) -> None:
+        self.diretorio = diretorio
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+        self._entradas: OrderedDict[str, int] = OrderedDict()
+        self._tamanho_total = 0
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        # Recupera as entradas de execuções anteriores, da menos para a mais recente
+        arquivos = []
+        for entrada in os.scandir(self.diretorio):
+            if not entrada.is_file():
+                continue
+            if entrada.name.endswith(".tmp"):
+                # Gravação interrompida por uma execução anterior
+                os.remove(entrada.path)
+                continue
+            info = entrada.stat()
+            arquivos.append((info.st_mtime, entrada.name, info.st_size))
+        for _, chave, tamanho in sorted(arquivos):
+            self._entradas[chave] = tamanho
+            self._tamanho_total += tamanho
+        with self._lock:
+            self._despejar()
+
+    @staticmethod
+    def gerar_chave(hash_entrada: str, formato: str, parametros: dict | None = None) -> str:
+        """
+        Gera a chave de uma conversão.
+
+        Params:
+            hash_entrada (str): Hash do conteúdo de entrada (ver hash_conteudo).
+            formato (str): Formato de destino.
+            parametros (dict, optional): Parâmetros do codificador. Defaults to None.
+
+        Returns:
+            str: Chave da conversão.
+        """
+        descricao = json.dumps(
+            [VERSAO_CACHE, hash_entrada, formato, parametros or {}],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(descricao.encode()).hexdigest()
+
+    def _caminho(self, chave: str) -> str:
+        return os.path.join(self.diretorio, chave)
+
+    def abrir(self, chave: str) -> BinaryIO | None:
+        """
+        Abre o resultado em cache, se existir.
+
+        O arquivo continua legível mesmo que a entrada seja despejada depois.
+
+        Params:
+            chave (str): Chave da conversão.
+
+        Returns:
+            BinaryIO | None: Arquivo aberto para leitura ou None se não estiver em cache.
+        """
+        with self._lock:
+            if chave in self._entradas:
+                try:
+                    arquivo = open(self._caminho(chave), "rb")
+                except FileNotFoundError:
+                    self._remover(chave)
+                else:
+                    self._entradas.move_to_end(chave)
+                    os.utime(self._caminho(chave))
+                    self.acertos += 1
+                    return arquivo
+            self.falhas += 1
+            return None
+
+    def obter(self, chave: str) -> bytes | None:
+        """
+        Lê o resultado em cache, se existir.
+
+        Params:
+            chave (str): Chave da conversão.
+
+        Returns:
+            bytes | None: Conteúdo convertido ou None se não estiver em cache.
+        """
+        if arquivo := self.abrir(chave):
+            with arquivo:
+                return arquivo.read()
+        return None
+
+    def salvar(self, chave: str, dados: bytes) -> None:
+        """
+        Guarda um resultado em cache.
+
+        Params:
+            chave (str): Chave da conversão.
+            dados (bytes): Conteúdo convertido.
+        """
+        with tempfile.NamedTemporaryFile(dir=self.diretorio, suffix=".tmp", delete=False) as temp_file:
+            temp_file.write(dados)
+        self._registrar(chave, temp_file.name)
+
+    def salvar_arquivo(self, chave: str, caminho: str) -> None:
+        """
+        Guarda em cache um resultado que já está em disco, sem lê-lo para a memória.
+
+        Usa um hard link quando possível e uma cópia caso contrário.
+
+        Params:
+            chave (str): Chave da conversão.
+            caminho (str): Caminho do arquivo convertido.
+        """
+        temp_path = os.path.join(self.diretorio, f"{chave}.{threading.get_ident()}.tmp")
+        try:
+            os.link(caminho, temp_path)
+        except OSError:
+            shutil.copyfile(caminho, temp_path)
+        self._registrar(chave, temp_path)
+
+    def _registrar(self, chave: str, temp_path: str) -> None:
+        tamanho = os.path.getsize(temp_path)
+        if tamanho > self.limite_bytes:
+            os.remove(temp_path)
+            return None
+        with self._lock:
+            os.replace(temp_path, self._caminho(chave))
+            self._tamanho_total += tamanho - self._entradas.pop(chave, 0)
+            self._entradas[chave] = tamanho
+            self._despejar()
+
+    def _remover(self, chave: str) -> None:
+        self._tamanho_total -= self._entradas.pop(chave, 0)
+        try:
+            os.remove(self._caminho(chave))
+        except FileNotFoundError:
+            pass
+
+    def _despejar(self) -> None:
+        while self._tamanho_total > self.limite_bytes and self._entradas:
+            chave = next(iter(self._entradas))
+            logger.debug(f"Removendo do cache: {chave}")
+            self._remover(chave)
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna os contadores do cache.
+
+        Returns:
+            dict: Acertos, falhas, quantidade de entradas e tamanho total em bytes.
+        """
+        with self._lock:
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "entradas": len(self._entradas),
+                "bytes": self._tamanho_total,
+            }
+
+
+_lock_cache = threading.Lock()
+
+
+@cache
+def _criar_cache_conversao() -> CacheConversao:
+    return CacheConversao()
+
+
+def obter_cache_conversao() -> CacheConversao:
+    """
+    Retorna o cache de conversões compartilhado por todas as sessões.
+
+    Returns:
+        CacheConversao: Instância única do cache.
+    """
+    # O cache não serializa a primeira chamada: sem a trava, duas sessões poderiam
+    # criar cada uma a sua instância, com contas de tamanho separadas
+    with _lock_cache:
+        return _criar_cache_conversao()
@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+import zipfile
+from typing import BinaryIO
+
+
+# Acima desse tamanho o ZIP deixa a memória e passa a ser gravado em disco
+LIMITE_MEMORIA_ZIP = 8 * 1024 * 1024
+TAMANHO_BLOCO = 1024 * 1024
+
+
+class ZipEmDisco:
+    """
+    Arquivo ZIP gravado de forma incremental em um arquivo temporário.
+
+    Cada item é escrito assim que fica pronto e pode ser descartado em seguida,
+    então o consumo de memória não cresce com a quantidade de arquivos do lote.
+    Os itens são armazenados sem compressão, pois mídias já são comprimidas.
+    """
+
+    def __init__(self) -> None:
+        self.arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_ZIP)
+        self._zip = zipfile.ZipFile(self.arquivo, "w", compression=zipfile.ZIP_STORED)
+        self._nomes: set[str] = set()
+        self.quantidade = 0
+
+    def __enter__(self) -> "ZipEmDisco":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.fechar()
+
+    def _nome_unico(self, nome: str) -> str:
+        """
+        Evita nomes repetidos dentro do ZIP acrescentando um sufixo numérico.
+
+        Params:
+            nome (str): Nome desejado para o item.
+
+        Returns:
+            str: Nome ainda não utilizado no ZIP.
+        """
+        base, _, extensao = nome.rpartition(".")
+        if not base:
+            # Sem extensão, ou um nome que só começa com ponto (ex.: ".env")
+            base, extensao = nome, ""
+        novo_nome, sufixo = nome, 1
+        while novo_nome in self._nomes:
+            novo_nome = f"{base} ({sufixo})" + (f".{extensao}" if extensao else "")
+            sufixo += 1
+        self._nomes.add(novo_nome)
+        return novo_nome
+
+    def adicionar(self, nome: str, dados: bytes) -> str:
+        """
+        Adiciona um item a partir de bytes.
+
+        Params:
+            nome (str): Nome do item dentro do ZIP.
+            dados (bytes): Conteúdo do item.
+
+        Returns:
+            str: Nome efetivamente utilizado no ZIP.
+        """
+        nome = self._nome_unico(nome)
+        self._zip.writestr(nome, dados)
+        self.quantidade += 1
+        return nome
+
+    def adicionar_fluxo(self, nome: str, fluxo: BinaryIO) -> str:
+        """
+        Adiciona um item copiando um arquivo aberto em blocos.
+
+        Params:
+            nome (str): Nome do item dentro do ZIP.
+            fluxo (BinaryIO): Arquivo aberto para leitura binária.
+
+        Returns:
+            str: Nome efetivamente utilizado no ZIP.
+        """
+        nome = self._nome_unico(nome)
+        with self._zip.open(nome, "w", force_zip64=True) as destino:
+            shutil.copyfileobj(fluxo, destino, TAMANHO_BLOCO)
+        self.quantidade += 1
+        return nome
+
+    def adicionar_arquivo(self, nome: str, caminho: str) -> str:
+        """
+        Adiciona um item a partir de um arquivo em disco, sem carregá-lo na memória.
+
+        Params:
+            nome (str): Nome do item dentro do ZIP.
+            caminho (str): Caminho do arquivo.
+
+        Returns:
+            str: Nome efetivamente utilizado no ZIP.
+        """
+        with open(caminho, "rb") as fluxo:
+            return self.adicionar_fluxo(nome, fluxo)
+
+    def fechar(self) -> None:
+        """
+        Finaliza o diretório central do ZIP e volta o ponteiro para o início.
+        """
+        if self._zip.fp is not None:
+            self._zip.close()
+        self.arquivo.seek(0)
+
+    def ler(self) -> bytes:
+        """
+        Lê o conteúdo do ZIP finalizado.
+
+        Returns:
+            bytes: Conteúdo do arquivo ZIP.
+        """
+        self.arquivo.seek(0)
+        return self.arquivo.read()
+
+    def descartar(self) -> None:
+        """
+        Remove o arquivo temporário.
+        """
+        self.arquivo.close()
@@ -0,0 +1,515 @@
+import csv
+import datetime
+import io
+import json
+import re
+import textwrap
+import threading
+from collections.abc import Callable
+from functools import lru_cache
+from html import escape as html_escape
+from string import Template
+from typing import Annotated, Any, Literal
+
+from pydantic import BaseModel, BeforeValidator, Field, ValidationError, field_validator, model_validator
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+
+# Estilo aplicado a todos os currículos. Altere junto com o HTML: os dois entram na
+# chave do cache de PDFs
+CSS_CURRICULO = """
+    @page { size: A4; margin: 2cm; }
+    body { font-family: sans-serif; font-size: 11pt; line-height: 1.4; }
+    h1 { font-size: 20pt; margin-bottom: 0.5em; }
+    h2 { font-size: 14pt; margin: 0.8em 0 0.4em; }
+    ul { margin: 0 0 0.8em; }
+"""
+
+# A descoberta de fontes e a leitura do CSS são feitas uma vez por thread e
+# reaproveitadas nas renderizações seguintes
+_estilo_por_thread = threading.local()
+
+
+def _compilar(layout: dict[str, str]) -> dict[str, Template]:
+    return {secao: Template(textwrap.dedent(texto)) for secao, texto in layout.items()}
+
+
+# Templates de cada layout, compilados uma vez ao importar o módulo. Os valores são
+# escapados antes da substituição, então os templates podem conter HTML à vontade
+TEMPLATES_CURRICULO = {
+    nome: _compilar(layout)
+    for nome, layout in {
+        "classico": {
+            "pagina": """
+                <div class="curriculo-classico">
+                $dados_basicos
+                <hr>
+                <h2>Experiência Profissional</h2>
+                $experiencias
+                <hr>
+                <h2>Formação Académica</h2>
+                $formacoes
+                $habilidades
+                </div>
+            """,
+            "dados_basicos": """
+                <center>
+                    <h1><b>$nome</b></h1>
+                </center>
+                <p><b>Data de Nascimento:</b> $nascimento</p>
+                <p><b>Celular:</b> $celular</p>
+                <p><b>Email:</b> $email</p>
+                <p><b>Cargo Desejado:</b> $cargo</p>
+            """,
+            "experiencia": """
+                <ul>
+                    <li><b>Empresa:</b> $empresa</li>
+                    <li><b>Cargo:</b> $cargo</li>
+                    <li><b>Período:</b> $admissao - $demissao</li>
+                    <li><b>Descrição:</b> $descricao</li>
+                </ul>
+            """,
+            "sem_experiencia": "<p>Em busca do primeiro emprego</p>",
+            "formacao": """
+                <ul>
+                    <li><b>Instituição:</b> $instituicao</li>
+                    <li><b>Curso:</b> $curso</li>
+                    <li><b>Nível:</b> $nivel</li>
+                    <li><b>Ano de Início:</b> $inicio</li>
+                    <li><b>Ano de Término:</b> $termino</li>
+                    <li><b>Situação:</b> $situacao</li>
+                </ul>
+            """,
+            "habilidades": """
+                <hr>
+                <h2>Habilidades</h2>
+                <ul>$itens</ul>
+            """,
+            "habilidade": "<li>$habilidade</li>",
+        },
+        "moderno": {
+            "pagina": """
+                <style>
+                    .curriculo-moderno h1 { color: #1f4e79; margin-bottom: 0; }
+                    .curriculo-moderno h2 { color: #1f4e79; border-bottom: 2px solid #1f4e79; }
+                    .curriculo-moderno h3 { margin-bottom: 0; }
+                    .curriculo-moderno .subtitulo { color: #555555; margin-top: 0; }
+                    .curriculo-moderno .habilidade { display: inline-block; background: #dde8f3; padding: 2px 8px; margin: 2px; border-radius: 4px; }
+                </style>
+                <div class="curriculo-moderno">
+                $dados_basicos
+                <h2>Experiência Profissional</h2>
+                $experiencias
+                <h2>Formação Académica</h2>
+                $formacoes
+                $habilidades
+                </div>
+            """,
+            "dados_basicos": """
+                <h1>$nome</h1>
+                <p class="subtitulo">$cargo</p>
+                <p>$email &middot; $celular &middot; Nascimento: $nascimento</p>
+            """,
+            "experiencia": """
+                <h3>$cargo &mdash; $empresa</h3>
+                <p class="subtitulo">$admissao - $demissao</p>
+                <p>$descricao</p>
+            """,
+            "sem_experiencia": "<p>Em busca do primeiro emprego</p>",
+            "formacao": """
+                <h3>$curso &mdash; $instituicao</h3>
+                <p class="subtitulo">$nivel, $inicio - $termino ($situacao)</p>
+            """,
+            "habilidades": """
+                <h2>Habilidades</h2>
+                <p>$itens</p>
+            """,
+            "habilidade": '<span class="habilidade">$habilidade</span>',
+        },
+        "compacto": {
+            "pagina": """
+                <style>
+                    .curriculo-compacto { font-size: 0.9em; }
+                    .curriculo-compacto h1 { font-size: 1.6em; margin: 0; }
+                    .curriculo-compacto h2 { font-size: 1.1em; margin: 0.8em 0 0.2em; text-transform: uppercase; }
+                    .curriculo-compacto p { margin: 0.1em 0; }
+                    .curriculo-compacto .habilidade + .habilidade::before { content: "; "; }
+                </style>
+                <div class="curriculo-compacto">
+                $dados_basicos
+                <h2>Experiência Profissional</h2>
+                $experiencias
+                <h2>Formação Académica</h2>
+                $formacoes
+                $habilidades
+                </div>
+            """,
+            "dados_basicos": """
+                <h1>$nome</h1>
+                <p>$cargo | $email | $celular | $nascimento</p>
+            """,
+            "experiencia": "<p><b>$admissao - $demissao:</b> $cargo, $empresa. $descricao</p>",
+            "sem_experiencia": "<p>Em busca do primeiro emprego</p>",
+            "formacao": "<p><b>$inicio - $termino:</b> $curso, $instituicao ($nivel, $situacao)</p>",
+            "habilidades": """
+                <h2>Habilidades</h2>
+                <p>$itens</p>
+            """,
+            "habilidade": '<span class="habilidade">$habilidade</span>',
+        },
+    }.items()
+}
+NOMES_LAYOUTS_CURRICULO = {
+    "classico": "Clássico",
+    "moderno": "Moderno",
+    "compacto": "Compacto",
+}
+
+
+# Cada seção é memoizada pelos próprios valores: ao editar uma experiência, só o
+# trecho dela é renderizado de novo, e as demais seções vêm do cache
+@lru_cache(maxsize=1024)
+def _renderizar_dados_basicos(
+    layout: str, nome: str, nascimento: datetime.date, celular: str, email: str, cargo: str
+) -> str:
+    return TEMPLATES_CURRICULO[layout]["dados_basicos"].substitute(
+        nome=html_escape(nome),
+        nascimento=nascimento.strftime("%d/%m/%Y"),
+        celular=html_escape(celular),
+        email=html_escape(email),
+        cargo=html_escape(cargo),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _renderizar_experiencia(
+    layout: str,
+    empresa: str,
+    cargo: str,
+    admissao: datetime.date,
+    demissao: datetime.date | None,
+    descricao: str,
+) -> str:
+    return TEMPLATES_CURRICULO[layout]["experiencia"].substitute(
+        empresa=html_escape(empresa),
+        cargo=html_escape(cargo),
+        admissao=admissao.strftime("%d/%m/%Y"),
+        demissao=demissao.strftime("%d/%m/%Y") if demissao else "Atual",
+        descricao=html_escape(descricao),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _renderizar_formacao(
+    layout: str, instituicao: str, curso: str, nivel: str, inicio: int, termino: int, situacao: str
+) -> str:
+    return TEMPLATES_CURRICULO[layout]["formacao"].substitute(
+        instituicao=html_escape(instituicao),
+        curso=html_escape(curso),
+        nivel=html_escape(nivel),
+        inicio=inicio,
+        termino=termino,
+        situacao=html_escape(situacao),
+    )
+
+
+@lru_cache(maxsize=256)
+def _renderizar_habilidades(layout: str, habilidades: tuple[str, ...]) -> str:
+    if not habilidades:
+        return ""
+    templates = TEMPLATES_CURRICULO[layout]
+    itens = "".join(
+        templates["habilidade"].substitute(habilidade=html_escape(habilidade.title()))
+        for habilidade in habilidades
+    )
+    return templates["habilidades"].substitute(itens=itens)
+
+
+def gerar_html(
+    dados_basicos: dict,
+    experiencias: list[dict],
+    formacoes: list[dict],
+    habilidades: list[str],
+    layout: str = "classico",
+) -> str:
+    """
+    Gera o HTML do currículo.
+
+    Params:
+        dados_basicos (dict): Nome Completo, Data de Nascimento, Celular, Email e Cargo Desejado.
+        experiencias (list[dict]): Experiências profissionais.
+        formacoes (list[dict]): Formações acadêmicas.
+        habilidades (list[str]): Habilidades.
+        layout (str, optional): Layout do currículo (ver TEMPLATES_CURRICULO). Defaults to "classico".
+
+    Returns:
+        str: HTML do currículo.
+    """
+    templates = TEMPLATES_CURRICULO[layout]
+    experiencias_html = "".join(
+        _renderizar_experiencia(
+            layout,
+            exp.get("Empresa"),
+            exp.get("Cargo"),
+            exp.get("Admissão"),
+            exp.get("Demissão"),
+            exp.get("Descrição"),
+        )
+        for exp in experiencias
+    )
+    formacoes_html = "".join(
+        _renderizar_formacao(
+            layout,
+            formacao.get("Instituição"),
+            formacao.get("Curso"),
+            formacao.get("Nível"),
+            formacao.get("Ano de Início"),
+            formacao.get("Ano de Término"),
+            formacao.get("Situação"),
+        )
+        for formacao in formacoes
+    )
+    return templates["pagina"].substitute(
+        dados_basicos=_renderizar_dados_basicos(
+            layout,
+            dados_basicos.get("Nome Completo"),
+            dados_basicos.get("Data de Nascimento"),
+            dados_basicos.get("Celular"),
+            dados_basicos.get("Email"),
+            dados_basicos.get("Cargo Desejado"),
+        ),
+        experiencias=experiencias_html or templates["sem_experiencia"].template,
+        formacoes=formacoes_html,
+        habilidades=_renderizar_habilidades(layout, tuple(habilidades)),
+    )
+
+
+def _obter_estilo() -> tuple[FontConfiguration, CSS]:
+    """
+    Retorna a configuração de fontes e a folha de estilo da thread atual.
+
+    O FontConfiguration guarda estado do fontconfig e não deve ser usado por duas
+    renderizações ao mesmo tempo, por isso cada thread (ou processo) tem o seu.
+    """
+    if not hasattr(_estilo_por_thread, "fontes"):
+        _estilo_por_thread.fontes = FontConfiguration()
+        _estilo_por_thread.css = CSS(string=CSS_CURRICULO, font_config=_estilo_por_thread.fontes)
+    return _estilo_por_thread.fontes, _estilo_por_thread.css
+
+
+def gerar_pdf(html: str, ao_progredir: Callable[[float, str], None] | None = None) -> bytes:
+    """
+    Gera o PDF do currículo a partir do HTML.
+
+    Params:
+        html (str): HTML do currículo (ver gerar_html).
+        ao_progredir (Callable[[float, str], None], optional): Recebe a fração
+            concluída e a etapa atual. Defaults to None.
+
+    Returns:
+        bytes: Conteúdo do PDF.
+    """
+    if ao_progredir:
+        ao_progredir(0.1, "Montando o layout")
+    fontes, css = _obter_estilo()
+    documento = HTML(string=html).render(stylesheets=[css], font_config=fontes)
+    if ao_progredir:
+        ao_progredir(0.7, f"Gravando {len(documento.pages)} página(s)")
+    return documento.write_pdf()
+
+
+# Geração em lote a partir de planilhas (CSV) ou JSON
+CAMPOS_DADOS_BASICOS = ["Nome Completo", "Data de Nascimento", "Celular", "Email", "Cargo Desejado"]
+CAMPOS_EXPERIENCIA = ["Empresa", "Cargo", "Admissão", "Demissão", "Descrição"]
+CAMPOS_FORMACAO = ["Instituição", "Curso", "Nível", "Ano de Início", "Ano de Término", "Situação"]
+# No CSV, cada experiência e formação ocupa colunas numeradas (ex.: "Experiência 1 - Empresa")
+COLUNA_NUMERADA = re.compile(r"^(Experiência|Formação) (\d+) - (.+)$")
+
+
+def _ler_data(valor: Any) -> Any:
+    """
+    Aceita datas no formato brasileiro (dd/mm/aaaa), além do ISO, e trata vazio como ausente.
+    """
+    if isinstance(valor, str):
+        valor = valor.strip()
+        if not valor:
+            return None
+        if re.fullmatch(r"\d{1,2}/\d{1,2}/\d{4}", valor):
+            return datetime.datetime.strptime(valor, "%d/%m/%Y").date()
+    return valor
+
+
+Data = Annotated[datetime.date, BeforeValidator(_ler_data)]
+DataOpcional = Annotated[datetime.date | None, BeforeValidator(_ler_data)]
+
+
+class DadosBasicosCurriculo(BaseModel):
+    nome_completo: str = Field(alias="Nome Completo", min_length=1)
+    data_nascimento: Data = Field(alias="Data de Nascimento")
+    celular: str = Field(alias="Celular", min_length=1)
+    email: str = Field(alias="Email")
+    cargo_desejado: str = Field(alias="Cargo Desejado", min_length=1)
+
+    @field_validator("email")
+    @classmethod
+    def validar_email(cls, email: str) -> str:
+        if not re.fullmatch(r"[^@\s]+@[^@\s]+\.[^@\s]+", email.strip()):
+            raise ValueError("e-mail inválido")
+        return email.strip()
+
+
+class ExperienciaCurriculo(BaseModel):
+    empresa: str = Field(alias="Empresa", min_length=1)
+    cargo: str = Field(alias="Cargo", min_length=1)
+    admissao: Data = Field(alias="Admissão")
+    demissao: DataOpcional = Field(None, alias="Demissão")
+    descricao: str = Field(alias="Descrição", min_length=1)
+
+    @model_validator(mode="after")
+    def validar_periodo(self) -> "ExperienciaCurriculo":
+        if self.demissao and self.demissao < self.admissao:
+            raise ValueError("a demissão é anterior à admissão")
+        return self
+
+
+class FormacaoCurriculo(BaseModel):
+    instituicao: str = Field(alias="Instituição", min_length=1)
+    curso: str = Field(alias="Curso", min_length=1)
+    nivel: str = Field(alias="Nível", min_length=1)
+    ano_inicio: int = Field(alias="Ano de Início", ge=1900)
+    ano_termino: int = Field(alias="Ano de Término", ge=1900)
+    situacao: str = Field(alias="Situação", min_length=1)
+
+
+class Curriculo(BaseModel):
+    dados_basicos: DadosBasicosCurriculo
+    experiencias: list[ExperienciaCurriculo] = []
+    formacoes: list[FormacaoCurriculo] = Field(min_length=1)
+    habilidades: list[str] = []
+
+
+def gerar_modelo_csv() -> str:
+    """
+    Gera um CSV vazio com as colunas aceitas pela geração em lote.
+
+    Returns:
+        str: Cabeçalho do CSV, com duas experiências e duas formações.
+    """
+    colunas = [
+        *CAMPOS_DADOS_BASICOS,
+        *(f"Experiência {n} - {campo}" for n in (1, 2) for campo in CAMPOS_EXPERIENCIA),
+        *(f"Formação {n} - {campo}" for n in (1, 2) for campo in CAMPOS_FORMACAO),
+        "Habilidades",
+    ]
+    texto = io.StringIO()
+    csv.writer(texto).writerow(colunas)
+    return texto.getvalue()
+
+
+def _linha_csv_para_curriculo(linha: dict[str, str]) -> dict:
+    """
+    Converte uma linha do CSV para a mesma estrutura do JSON (ver ler_curriculos_em_lote).
+    """
+    grupos: dict[str, dict[int, dict]] = {"Experiência": {}, "Formação": {}}
+    for coluna, valor in linha.items():
+        if coluna and (encontrado := COLUNA_NUMERADA.match(coluna.strip())):
+            secao, numero, campo = encontrado.groups()
+            grupos[secao].setdefault(int(numero), {})[campo] = valor
+    # Grupos com todas as colunas vazias não foram preenchidos
+    return {
+        "dados_basicos": {campo: linha.get(campo) for campo in CAMPOS_DADOS_BASICOS},
+        "experiencias": [
+            campos for _, campos in sorted(grupos["Experiência"].items())
+            if any((valor or "").strip() for valor in campos.values())
+        ],
+        "formacoes": [
+            campos for _, campos in sorted(grupos["Formação"].items())
+            if any((valor or "").strip() for valor in campos.values())
+        ],
+        "habilidades": [
+            habilidade.strip()
+            for habilidade in re.split(r"[;,]", linha.get("Habilidades") or "")
+            if habilidade.strip()
+        ],
+    }
+
+
+def ler_curriculos_em_lote(dados: bytes, formato: Literal["csv", "json"]) -> list[dict]:
+    """
+    Lê os currículos de um arquivo CSV ou JSON (UTF-8 ou cp1252), sem validá-los.
+
+    O JSON é uma lista de objetos com as chaves dados_basicos, experiencias,
+    formacoes e habilidades. O CSV tem um currículo por linha, com as colunas de
+    gerar_modelo_csv, separadas por vírgula ou ponto e vírgula.
+
+    Params:
+        dados (bytes): Conteúdo do arquivo.
+        formato (Literal["csv", "json"]): Formato do arquivo.
+
+    Returns:
+        list[dict]: Um item por currículo, na ordem do arquivo.
+
+    Raises:
+        ValueError: Se o arquivo não puder ser lido.
+    """
+    try:
+        texto = dados.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # O Excel exporta CSV em cp1252 ("CSV separado por ponto e vírgula")
+        texto = dados.decode("cp1252", errors="replace")
+    if formato == "json":
+        curriculos = json.loads(texto)
+        if not isinstance(curriculos, list):
+            raise ValueError("O JSON deve conter uma lista de currículos.")
+        return curriculos
+
+    # Planilhas exportadas em português costumam usar ponto e vírgula
+    primeira_linha = texto.split("\n", 1)[0]
+    delimitador = ";" if primeira_linha.count(";") > primeira_linha.count(",") else ","
+    return [
+        _linha_csv_para_curriculo(linha)
+        for linha in csv.DictReader(io.StringIO(texto), delimiter=delimitador)
+    ]
+
+
+def nome_arquivo_curriculo(linha: int, nome: str) -> str:
+    """
+    Monta o nome do PDF de um currículo gerado em lote.
+
+    O nome vem da planilha, então separadores de diretório e caracteres inválidos
+    em nomes de arquivo são trocados, para que o item não saia do ZIP (ex.: "../").
+
+    Params:
+        linha (int): Número da linha do currículo no arquivo.
+        nome (str): Nome completo da pessoa.
+
+    Returns:
+        str: Nome do arquivo PDF.
+    """
+    nome = re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", nome).strip(" .")[:100]
+    return f"{linha:03d} - {nome or 'curriculo'}.pdf"
+
+
+def validar_curriculo(curriculo: dict) -> dict:
+    """
+    Valida um currículo lido em lote.
+
+    Params:
+        curriculo (dict): Item retornado por ler_curriculos_em_lote.
+
+    Returns:
+        dict: Argumentos de gerar_html (dados_basicos, experiencias, formacoes e habilidades).
+
+    Raises:
+        ValueError: Com a descrição de cada campo inválido.
+    """
+    try:
+        return Curriculo.model_validate(curriculo).model_dump(by_alias=True)
+    except ValidationError as ex:
+        raise ValueError(
+            "; ".join(
+                f"{'.'.join(str(parte) for parte in erro['loc'])}: {erro['msg']}"
+                for erro in ex.errors()
+            )
+        ) from None
@@ -0,0 +1,95 @@
+import csv
+import io
+import tempfile
+from typing import Literal
+
+
+LIMITE_MEMORIA_TABELA = 8 * 1024 * 1024
+TAMANHO_LOTE_PARQUET = 1000
+
+FormatoTabela = Literal["csv", "parquet"]
+
+
+class EscritorTabela:
+    """
+    Grava linhas de uma tabela aos poucos em um arquivo temporário CSV ou Parquet.
+
+    As linhas não ficam acumuladas na memória: o CSV é escrito linha a linha e o
+    Parquet em grupos de TAMANHO_LOTE_PARQUET linhas.
+    """
+
+    def __init__(self, colunas: list[str], formato: FormatoTabela = "csv") -> None:
+        self.colunas = colunas
+        self.formato = formato
+        self.quantidade = 0
+        self.arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_MEMORIA_TABELA)
+        self._lote: list[dict] = []
+        if formato == "csv":
+            self._texto = io.TextIOWrapper(self.arquivo, encoding="utf-8", newline="")
+            self._csv = csv.DictWriter(self._texto, fieldnames=colunas)
+            self._csv.writeheader()
+        else:
+            # Importado só quando necessário, pois a maioria das exportações é CSV
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._esquema = pa.schema([(coluna, pa.string()) for coluna in colunas])
+            self._parquet = pq.ParquetWriter(self.arquivo, self._esquema)
+
+    @property
+    def mime(self) -> str:
+        return "text/csv" if self.formato == "csv" else "application/vnd.apache.parquet"
+
+    def __enter__(self) -> "EscritorTabela":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.fechar()
+
+    def escrever(self, linha: dict) -> None:
+        """
+        Grava uma linha. Colunas ausentes ficam vazias.
+
+        Params:
+            linha (dict): Valores da linha, indexados pelo nome da coluna.
+        """
+        self.quantidade += 1
+        if self.formato == "csv":
+            self._csv.writerow(linha)
+            return None
+        self._lote.append(linha)
+        if len(self._lote) >= TAMANHO_LOTE_PARQUET:
+            self._gravar_lote()
+
+    def _gravar_lote(self) -> None:
+        import pyarrow as pa
+
+        colunas = {
+            coluna: [None if (valor := linha.get(coluna)) is None else str(valor) for linha in self._lote]
+            for coluna in self.colunas
+        }
+        self._parquet.write_table(pa.table(colunas, schema=self._esquema))
+        self._lote.clear()
+
+    def fechar(self) -> None:
+        """
+        Finaliza o arquivo e volta o ponteiro para o início.
+        """
+        if self.formato == "csv":
+            self._texto.flush()
+            self._texto.detach()
+        else:
+            if self._lote:
+                self._gravar_lote()
+            self._parquet.close()
+        self.arquivo.seek(0)
+
+    def ler(self) -> bytes:
+        """
+        Lê o conteúdo do arquivo finalizado.
+
+        Returns:
+            bytes: Conteúdo do arquivo.
+        """
+        self.arquivo.seek(0)
+        return self.arquivo.read()
@@ -0,0 +1,199 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+from functools import cache
+
+from pydantic import BaseModel
+
+
+@cache
+def caminho_ffmpeg() -> str:
+    """
+    Retorna o executável do ffmpeg.
+
+    Usa o ffmpeg do sistema (o mesmo do pydub) e, se não houver, o que acompanha o
+    imageio-ffmpeg, dependência do moviepy.
+
+    Returns:
+        str: Caminho do executável.
+    """
+    if caminho := shutil.which("ffmpeg"):
+        return caminho
+    from imageio_ffmpeg import get_ffmpeg_exe
+
+    return get_ffmpeg_exe()
+
+
+@cache
+def caminho_ffprobe() -> str | None:
+    """
+    Retorna o executável do ffprobe, que acompanha o ffmpeg do sistema.
+
+    Returns:
+        str | None: Caminho do executável ou None se não estiver instalado.
+    """
+    if caminho := shutil.which("ffprobe"):
+        return caminho
+    vizinho = os.path.join(os.path.dirname(caminho_ffmpeg()), "ffprobe")
+    return vizinho if os.path.exists(vizinho) else None
+
+
+class FluxoMidia(BaseModel):
+    indice: int
+    tipo: str
+    codec: str
+    largura: int | None = None
+    altura: int | None = None
+    quadros_por_segundo: float | None = None
+    taxa_amostragem: int | None = None
+    canais: int | None = None
+    taxa_bits: int | None = None
+
+
+class InfoMidia(BaseModel):
+    formato: str
+    duracao: float | None
+    taxa_bits: int | None
+    fluxos: list[FluxoMidia]
+    # Instante do primeiro pacote (não zero em TS e em MP4 com edit list). O -ss do
+    # ffmpeg é relativo a ele, e os instantes dos pacotes não
+    inicio: float = 0.0
+
+    def fluxos_do_tipo(self, tipo: str) -> list[FluxoMidia]:
+        return [fluxo for fluxo in self.fluxos if fluxo.tipo == tipo]
+
+
+def _numero(valor: str | None, tipo: type = float) -> int | float | None:
+    try:
+        return tipo(valor) if valor not in (None, "N/A") else None
+    except ValueError:
+        return None
+
+
+def _fracao(valor: str | None) -> float | None:
+    numerador, _, denominador = (valor or "").partition("/")
+    numerador, denominador = _numero(numerador), _numero(denominador or "1")
+    return numerador / denominador if numerador and denominador else None
+
+
+def sondar_midia(caminho: str) -> InfoMidia:
+    """
+    Lê o contêiner e os fluxos de um arquivo de mídia com o ffprobe, só pelos cabeçalhos.
+
+    Params:
+        caminho (str): Caminho do arquivo.
+
+    Returns:
+        InfoMidia: Formato, duração, taxa de bits, instante inicial e fluxos do arquivo.
+
+    Raises:
+        RuntimeError: Se o ffprobe não estiver instalado ou não reconhecer o arquivo.
+    """
+    if not (ffprobe := caminho_ffprobe()):
+        raise RuntimeError("O ffprobe não está instalado.")
+    processo = subprocess.run(
+        [
+            ffprobe,
+            "-v", "error",
+            "-print_format", "json",
+            "-show_format",
+            "-show_streams",
+            caminho,
+        ],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.decode(errors="replace").strip() or "Falha no ffprobe")
+    dados = json.loads(processo.stdout)
+    formato = dados.get("format", {})
+    return InfoMidia(
+        formato=formato.get("format_name", ""),
+        duracao=_numero(formato.get("duration")),
+        taxa_bits=_numero(formato.get("bit_rate"), int),
+        inicio=_numero(formato.get("start_time")) or 0.0,
+        fluxos=[
+            FluxoMidia(
+                indice=fluxo["index"],
+                tipo=fluxo.get("codec_type", ""),
+                codec=fluxo.get("codec_name", ""),
+                largura=fluxo.get("width"),
+                altura=fluxo.get("height"),
+                quadros_por_segundo=_fracao(fluxo.get("avg_frame_rate")),
+                taxa_amostragem=_numero(fluxo.get("sample_rate"), int),
+                canais=fluxo.get("channels"),
+                taxa_bits=_numero(fluxo.get("bit_rate"), int),
+            )
+            for fluxo in dados.get("streams", [])
+        ],
+    )
+
+
+def duracao_midia(caminho: str) -> float:
+    """
+    Lê a duração de um arquivo de mídia a partir do cabeçalho, sem decodificá-lo.
+
+    Params:
+        caminho (str): Caminho do arquivo.
+
+    Returns:
+        float: Duração em segundos.
+
+    Raises:
+        ValueError: Se o ffmpeg não informar a duração.
+    """
+    # Sem arquivo de saída o ffmpeg só lê o cabeçalho e termina com erro, o que é esperado
+    processo = subprocess.run(
+        [caminho_ffmpeg(), "-hide_banner", "-nostdin", "-i", caminho],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    saida = processo.stderr.decode(errors="replace")
+    if not (encontrado := re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", saida)):
+        raise ValueError("Não foi possível ler a duração da mídia.")
+    horas, minutos, segundos = encontrado.groups()
+    return int(horas) * 3600 + int(minutos) * 60 + float(segundos)
+
+
+def listar_quadros_chave(caminho: str, ate: float | None = None) -> list[float]:
+    """
+    Lista os instantes dos quadros-chave do primeiro fluxo de vídeo.
+
+    Lê apenas os pacotes do contêiner (a flag de quadro-chave), sem decodificar
+    os quadros, mas ainda percorre o arquivo; use `ate` para limitar a leitura.
+
+    Params:
+        caminho (str): Caminho do vídeo.
+        ate (float, optional): Lê só os primeiros segundos do vídeo. Defaults to None (todo o vídeo).
+
+    Returns:
+        list[float]: Instantes dos quadros-chave em segundos, em ordem.
+
+    Raises:
+        RuntimeError: Se o ffprobe não estiver instalado ou não reconhecer o arquivo.
+    """
+    if not (ffprobe := caminho_ffprobe()):
+        raise RuntimeError("O ffprobe não está instalado.")
+    processo = subprocess.run(
+        [
+            ffprobe,
+            "-v", "error",
+            "-select_streams", "v:0",
+            *(["-read_intervals", f"%+{ate}"] if ate else []),
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=p=0",
+            caminho,
+        ],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.decode(errors="replace").strip() or "Falha no ffprobe")
+    instantes = set()
+    for linha in processo.stdout.decode().splitlines():
+        instante, _, flags = linha.partition(",")
+        if "K" in flags and (valor := _numero(instante)) is not None:
+            instantes.add(valor)
+    return sorted(instantes)
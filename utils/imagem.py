@@ -0,0 +1,240 @@
+import math
+import os
+import time
+from io import BytesIO
+from typing import Literal
+
+from PIL import Image, ImageOps
+
+
+FORMATOS_IMAGEM = ["jpeg", "png", "bmp", "webp"]
+TAMANHO_MINIATURA = 800
+
+# Acima desse limite a imagem é recusada antes de ser decodificada, em
+# calcular_fator_reducao. O Image.MAX_IMAGE_PIXELS global do Pillow não é alterado,
+# para não afetar outros usos do Pillow no mesmo processo
+MAX_PIXELS_IMAGEM = int(os.environ.get("DETUDO_IMAGEM_MAX_MEGAPIXELS", 100)) * 1_000_000
+# Memória máxima estimada para decodificar e converter uma imagem
+LIMITE_MEMORIA_IMAGEM = int(os.environ.get("DETUDO_IMAGEM_LIMITE_MEMORIA_MB", 512)) * 1024 * 1024
+
+PoliticaImagemGrande = Literal["recusar", "reduzir"]
+
+# Parâmetros do codificador do Pillow para cada formato. BMP não tem opções.
+PREDEFINICOES = {
+    "padrao": {},
+    "rapido": {
+        "jpeg": {"quality": 85},
+        "png": {"compress_level": 1},
+        "webp": {"quality": 80, "method": 0},
+    },
+    "equilibrado": {
+        "jpeg": {"quality": 85, "optimize": True},
+        "png": {"compress_level": 6},
+        "webp": {"quality": 80, "method": 4},
+    },
+    "menor": {
+        "jpeg": {"quality": 75, "optimize": True, "progressive": True},
+        "png": {"compress_level": 9, "optimize": True},
+        "webp": {"quality": 70, "method": 6},
+    },
+}
+NOMES_PREDEFINICOES = {
+    "padrao": "Padrão",
+    "rapido": "Rápido",
+    "equilibrado": "Equilibrado",
+    "menor": "Menor arquivo",
+}
+
+
+class ImagemGrandeDemais(ValueError):
+    pass
+
+
+def _bytes_por_pixel(modo: str) -> int:
+    # O Pillow guarda imagens de várias bandas com 32 bits por pixel
+    if modo in ("1", "L", "P"):
+        return 1
+    if modo.startswith("I;16"):
+        return 2
+    return 4
+
+
+def abrir_imagem(dados: bytes | memoryview) -> Image.Image:
+    """
+    Abre uma imagem lendo apenas o cabeçalho, sem decodificar os pixels.
+
+    Params:
+        dados (bytes | memoryview): Conteúdo da imagem.
+
+    Returns:
+        Image.Image: Imagem aberta.
+
+    Raises:
+        ImagemGrandeDemais: Se o Pillow identificar uma "bomba de descompressão".
+    """
+    try:
+        return Image.open(BytesIO(dados))
+    except Image.DecompressionBombError as ex:
+        raise ImagemGrandeDemais(str(ex)) from ex
+
+
+def calcular_fator_reducao(i: Image.Image, politica: PoliticaImagemGrande = "recusar", copias: int = 1) -> int:
+    """
+    Verifica o tamanho de uma imagem aberta (só o cabeçalho foi lido) contra os limites.
+
+    Params:
+        i (Image.Image): Imagem aberta com Image.open, ainda não decodificada.
+        politica (PoliticaImagemGrande, optional): O que fazer quando passar do limite de memória. Defaults to "recusar".
+        copias (int, optional): Quantidade de cópias da imagem em memória durante a conversão. Defaults to 1.
+
+    Returns:
+        int: Fator inteiro de redução necessário (1 quando cabe no limite).
+
+    Raises:
+        ImagemGrandeDemais: Se a imagem passar do limite de pixels, ou do limite de memória com a política "recusar".
+    """
+    largura, altura = i.size
+    if largura * altura > MAX_PIXELS_IMAGEM:
+        raise ImagemGrandeDemais(
+            f"A imagem tem {largura}x{altura} pixels, acima do limite de "
+            f"{MAX_PIXELS_IMAGEM / 1_000_000:.0f} megapixels."
+        )
+    memoria = largura * altura * _bytes_por_pixel(i.mode) * copias
+    if memoria <= LIMITE_MEMORIA_IMAGEM:
+        return 1
+    if politica == "recusar":
+        raise ImagemGrandeDemais(
+            f"A imagem precisa de cerca de {memoria / 1024 ** 2:.0f} MB para ser convertida, "
+            f"acima do limite de {LIMITE_MEMORIA_IMAGEM / 1024 ** 2:.0f} MB."
+        )
+    return math.ceil(math.sqrt(memoria / LIMITE_MEMORIA_IMAGEM))
+
+
+def abrir_imagem_limitada(
+    i: Image.Image, politica: PoliticaImagemGrande = "recusar", copias: int = 1
+) -> Image.Image:
+    """
+    Decodifica uma imagem respeitando os limites de pixels e de memória.
+
+    Quando é preciso reduzir, o JPEG já é decodificado em escala menor com draft(),
+    sem passar pela resolução total. Os demais formatos só podem ser decodificados
+    inteiros, então são recusados mesmo com a política "reduzir".
+
+    Params:
+        i (Image.Image): Imagem aberta com Image.open, ainda não decodificada.
+        politica (PoliticaImagemGrande, optional): O que fazer quando passar do limite de memória. Defaults to "recusar".
+        copias (int, optional): Quantidade de cópias da imagem em memória durante a conversão. Defaults to 1.
+
+    Returns:
+        Image.Image: Imagem decodificada, reduzida se necessário.
+
+    Raises:
+        ImagemGrandeDemais: Se a imagem passar dos limites e não puder ser reduzida durante a leitura.
+    """
+    fator = calcular_fator_reducao(i, politica, copias)
+    if fator > 1:
+        # O draft() só reduz JPEG, e apenas a 1/2, 1/4 ou 1/8: pede a menor dessas
+        # escalas que já caiba no limite, para nunca decodificar a resolução total
+        escala = next((escala for escala in (2, 4, 8) if escala >= fator), 8)
+        largura_original, altura_original = i.size
+        i.draft(None, (largura_original // escala, altura_original // escala))
+        if largura_original // i.width < fator:
+            raise ImagemGrandeDemais(
+                f"A imagem tem {largura_original}x{altura_original} pixels e precisaria ser reduzida "
+                f"{fator}x para caber no limite de {LIMITE_MEMORIA_IMAGEM / 1024 ** 2:.0f} MB, "
+                f"o que não é possível durante a leitura de {i.format or 'imagens desse formato'}."
+            )
+    i.load()
+    return i
+
+
+def _decodificar(dados: bytes, formato: str, politica: PoliticaImagemGrande) -> Image.Image:
+    with abrir_imagem(dados) as i:
+        # Remover o canal alfa para JPEG cria uma segunda cópia da imagem
+        remover_alfa = formato == "jpeg" and i.mode == "RGBA"
+        i = abrir_imagem_limitada(i, politica, copias=2 if remover_alfa else 1)
+
+        # Se a imagem tiver um canal alfa, converta para RGB antes de salvar em JPEG
+        if remover_alfa:
+            i = i.convert("RGB")
+        return i
+
+
+def converter_imagem(
+    dados: bytes,
+    formato: str,
+    politica: PoliticaImagemGrande = "recusar",
+    predefinicao: str = "padrao",
+) -> bytes:
+    """
+    Converte uma imagem para outro formato.
+
+    Params:
+        dados (bytes): Conteúdo da imagem original.
+        formato (str): Formato de destino (ex.: "jpeg", "png", "bmp", "webp").
+        politica (PoliticaImagemGrande, optional): O que fazer com imagens acima do limite de memória. Defaults to "recusar".
+        predefinicao (str, optional): Predefinição do codificador (ver PREDEFINICOES). Defaults to "padrao".
+
+    Returns:
+        bytes: Conteúdo da imagem convertida.
+    """
+    i = _decodificar(dados, formato, politica)
+    nova_imagem_bytes = BytesIO()
+    i.save(nova_imagem_bytes, format=formato, **PREDEFINICOES[predefinicao].get(formato, {}))
+    return nova_imagem_bytes.getvalue()
+
+
+def medir_predefinicao(
+    dados: bytes, formato: str, politica: PoliticaImagemGrande, predefinicao: str
+) -> dict:
+    """
+    Codifica uma imagem com uma predefinição e mede o tamanho e o tempo de codificação.
+
+    Params:
+        dados (bytes): Conteúdo da imagem original.
+        formato (str): Formato de destino.
+        politica (PoliticaImagemGrande): O que fazer com imagens acima do limite de memória.
+        predefinicao (str): Predefinição do codificador (ver PREDEFINICOES).
+
+    Returns:
+        dict: Predefinição, tamanho em bytes e tempo de codificação em segundos.
+    """
+    i = _decodificar(dados, formato, politica)
+    nova_imagem_bytes = BytesIO()
+    inicio = time.perf_counter()
+    i.save(nova_imagem_bytes, format=formato, **PREDEFINICOES[predefinicao].get(formato, {}))
+    return {
+        "predefinicao": predefinicao,
+        "tamanho": nova_imagem_bytes.tell(),
+        "tempo_s": time.perf_counter() - inicio,
+    }
+
+
+def gerar_miniatura(dados: bytes | memoryview, tamanho: int = TAMANHO_MINIATURA) -> bytes:
+    """
+    Gera uma miniatura leve para pré-visualização.
+
+    Em JPEG, o draft() decodifica a imagem já reduzida (escala 1/2, 1/4 ou 1/8) e o
+    thumbnail() usa reduce() antes do redimensionamento final, evitando decodificar
+    e reamostrar a imagem em resolução total.
+
+    Params:
+        dados (bytes | memoryview): Conteúdo da imagem original.
+        tamanho (int, optional): Maior lado da miniatura em pixels. Defaults to TAMANHO_MINIATURA.
+
+    Returns:
+        bytes: Miniatura em JPEG, ou PNG se a imagem tiver transparência.
+    """
+    with abrir_imagem(dados) as i:
+        # Só o limite de pixels se aplica, a miniatura não guarda a resolução total
+        calcular_fator_reducao(i, "reduzir")
+        i.draft(None, (2 * tamanho, 2 * tamanho))
+        i.thumbnail((tamanho, tamanho), reducing_gap=2.0)
+        i = ImageOps.exif_transpose(i)
+
+        miniatura_bytes = BytesIO()
+        if i.mode in ("RGBA", "LA", "PA") or "transparency" in i.info:
+            i.save(miniatura_bytes, format="png")
+        else:
+            i.convert("RGB").save(miniatura_bytes, format="jpeg", quality=85)
+        return miniatura_bytes.getvalue()
@@ -0,0 +1,377 @@
+import struct
+import zlib
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from io import BytesIO
+from typing import BinaryIO, Literal
+from xml.etree import ElementTree
+
+import exifread
+from pydantic import BaseModel
+
+
+TipoMetadado = Literal["texto", "inteiro", "decimal", "data", "bytes"]
+
+# Tipos de campo do TIFF/EXIF usados pelo exifread
+TIPOS_CAMPO_INTEIRO = {1, 3, 4, 6, 8, 9}
+TIPOS_CAMPO_DECIMAL = {5, 10, 11, 12}
+
+ASSINATURA_XMP_JPEG = b"http://ns.adobe.com/xap/1.0/\x00"
+ASSINATURA_PNG = b"\x89PNG\r\n\x1a\n"
+
+# A leitura dos cabeçalhos é limitada por E/S, então threads bastam
+MAX_THREADS_METADADOS = 8
+
+
+class Metadado(BaseModel):
+    grupo: str
+    chave: str
+    valor: str
+    tipo: TipoMetadado = "texto"
+
+
+class ResultadoMetadados(BaseModel):
+    formato: str | None = None
+    metadados: list[Metadado] = []
+    miniatura: bytes | None = None
+
+    def adicionar(self, grupo: str, chave: str, valor, tipo: TipoMetadado = "texto") -> None:
+        """
+        Adiciona um metadado ao resultado.
+
+        Params:
+            grupo (str): Grupo do metadado (ex.: "Imagem", "EXIF", "GPS", "PNG", "XMP").
+            chave (str): Nome do metadado.
+            valor: Valor do metadado, convertido para texto.
+            tipo (TipoMetadado, optional): Tipo do valor. Defaults to "texto".
+        """
+        self.metadados.append(Metadado(grupo=grupo, chave=chave, valor=str(valor), tipo=tipo))
+
+    def como_tabela(self) -> list[dict]:
+        """
+        Retorna os metadados como uma lista de linhas.
+
+        Returns:
+            list[dict]: Uma linha por metadado, com as colunas grupo, chave, valor e tipo.
+        """
+        return [metadado.model_dump() for metadado in self.metadados]
+
+
+def _adicionar_tags(tags: dict, resultado: ResultadoMetadados) -> None:
+    """
+    Converte as tags do exifread em metadados tipados.
+
+    Params:
+        tags (dict): Tags retornadas pelo exifread.process_file.
+        resultado (ResultadoMetadados): Resultado onde os metadados são adicionados.
+    """
+    for nome, tag in tags.items():
+        if nome == "JPEGThumbnail":
+            resultado.miniatura = tag
+            continue
+        if not hasattr(tag, "field_type"):
+            continue
+        grupo, _, chave = nome.partition(" ")
+        tipo: TipoMetadado = "texto"
+        valor = tag.printable
+        valores = tag.values if isinstance(tag.values, list) else []
+        if len(valores) == 1 and tag.field_type in TIPOS_CAMPO_INTEIRO:
+            # Valores enumerados (ex.: Orientation) mantêm a descrição legível
+            if tag.printable == str(valores[0]):
+                tipo, valor = "inteiro", valores[0]
+        elif len(valores) == 1 and tag.field_type in TIPOS_CAMPO_DECIMAL:
+            tipo, valor = "decimal", float(valores[0])
+        elif tag.field_type == 2 and "DateTime" in chave:
+            tipo = "data"
+        elif tag.field_type == 7 and len(valores) > 32:
+            tipo = "bytes"
+        resultado.adicionar(grupo, chave, valor, tipo)
+
+    # Coordenadas GPS em graus decimais, mais fáceis de usar que graus/min/seg
+    for eixo, negativo in (("Latitude", "S"), ("Longitude", "W")):
+        coordenada = tags.get(f"GPS GPS{eixo}")
+        referencia = tags.get(f"GPS GPS{eixo}Ref")
+        if coordenada and len(coordenada.values) == 3:
+            graus, minutos, segundos = (float(v) for v in coordenada.values)
+            decimal = graus + minutos / 60 + segundos / 3600
+            if referencia and referencia.printable.strip().upper() == negativo:
+                decimal = -decimal
+            resultado.adicionar("GPS", f"{eixo} (decimal)", round(decimal, 7), "decimal")
+
+
+def _ler_exif(tiff: bytes, resultado: ResultadoMetadados, detalhes: bool, miniatura: bool) -> None:
+    """
+    Interpreta um bloco EXIF (cabeçalho TIFF) com o exifread.
+
+    Params:
+        tiff (bytes): Bloco EXIF a partir do cabeçalho TIFF.
+        resultado (ResultadoMetadados): Resultado onde os metadados são adicionados.
+        detalhes (bool): Se True, também interpreta as MakerNotes.
+        miniatura (bool): Se True, extrai a miniatura embutida.
+    """
+    if tiff.startswith(b"Exif\x00\x00"):
+        tiff = tiff[6:]
+    # O exifread 3.0.0 só extrai a miniatura junto com os detalhes (MakerNotes)
+    tags = exifread.process_file(BytesIO(tiff), details=detalhes or miniatura)
+    _adicionar_tags(tags, resultado)
+
+
+def _ler_xmp(xmp: bytes, resultado: ResultadoMetadados) -> None:
+    """
+    Achata um pacote XMP em pares chave/valor.
+
+    Params:
+        xmp (bytes): Pacote XMP (XML).
+        resultado (ResultadoMetadados): Resultado onde os metadados são adicionados.
+    """
+    try:
+        raiz = ElementTree.fromstring(xmp.strip(b"\x00 \r\n\t"))
+    except ElementTree.ParseError:
+        resultado.adicionar("XMP", "Erro", "Pacote XMP inválido")
+        return None
+
+    def nome_local(nome: str) -> str:
+        return nome.rsplit("}", 1)[-1]
+
+    for elemento in raiz.iter():
+        if nome_local(elemento.tag) == "Description":
+            for atributo, valor in elemento.attrib.items():
+                if nome_local(atributo) != "about":
+                    resultado.adicionar("XMP", nome_local(atributo), valor)
+        elif len(elemento) == 0 and elemento.text and elemento.text.strip():
+            resultado.adicionar("XMP", nome_local(elemento.tag), elemento.text.strip())
+
+
+def _ler_exato(fluxo: BinaryIO, tamanho: int) -> bytes | None:
+    """
+    Lê exatamente `tamanho` bytes, ou retorna None se o arquivo terminar antes.
+    """
+    dados = fluxo.read(tamanho)
+    return dados if len(dados) == tamanho else None
+
+
+def _ler_jpeg(fluxo: BinaryIO, resultado: ResultadoMetadados, detalhes: bool, miniatura: bool) -> None:
+    """
+    Percorre os segmentos do JPEG até o início dos dados da imagem (SOS). Um
+    arquivo truncado ou um segmento malformado encerra a leitura sem erro.
+    """
+    fluxo.seek(2)
+    while marcador := fluxo.read(2):
+        if len(marcador) < 2 or marcador[0] != 0xFF:
+            break
+        tipo = marcador[1]
+        if tipo == 0xFF:  # Preenchimento
+            fluxo.seek(-1, 1)
+            continue
+        if tipo == 0xDA or tipo == 0xD9:  # SOS ou EOI: fim dos cabeçalhos
+            break
+        if (cabecalho := _ler_exato(fluxo, 2)) is None:
+            break
+        (tamanho,) = struct.unpack(">H", cabecalho)
+        if tamanho < 2:
+            break
+        if tipo == 0xE1:  # APP1: EXIF ou XMP
+            if (dados := _ler_exato(fluxo, tamanho - 2)) is None:
+                break
+            if dados.startswith(b"Exif\x00\x00"):
+                _ler_exif(dados, resultado, detalhes, miniatura)
+            elif dados.startswith(ASSINATURA_XMP_JPEG):
+                _ler_xmp(dados[len(ASSINATURA_XMP_JPEG):], resultado)
+        elif 0xC0 <= tipo <= 0xCF and tipo not in (0xC4, 0xC8, 0xCC):  # SOFn
+            if tamanho < 8 or (dados := _ler_exato(fluxo, 6)) is None:
+                break
+            precisao, altura, largura, componentes = struct.unpack(">BHHB", dados)
+            resultado.adicionar("Imagem", "Largura", largura, "inteiro")
+            resultado.adicionar("Imagem", "Altura", altura, "inteiro")
+            resultado.adicionar("Imagem", "Componentes", componentes, "inteiro")
+            resultado.adicionar("Imagem", "Bits por amostra", precisao, "inteiro")
+            fluxo.seek(tamanho - 8, 1)
+        else:
+            fluxo.seek(tamanho - 2, 1)
+
+
+def _ler_texto_png(tipo: bytes, dados: bytes, resultado: ResultadoMetadados) -> None:
+    chave, _, resto = dados.partition(b"\x00")
+    if tipo == b"tEXt":
+        resultado.adicionar("PNG", chave.decode("latin-1"), resto.decode("latin-1"))
+    elif tipo == b"zTXt":
+        texto = zlib.decompress(resto[1:])  # Primeiro byte: método de compressão
+        resultado.adicionar("PNG", chave.decode("latin-1"), texto.decode("latin-1"))
+    elif len(resto) >= 2:  # iTXt: indicador e método de compressão
+        comprimido, resto = resto[0], resto[2:]
+        _idioma, _, resto = resto.partition(b"\x00")
+        _chave_traduzida, _, texto = resto.partition(b"\x00")
+        if comprimido:
+            texto = zlib.decompress(texto)
+        if chave == b"XML:com.adobe.xmp":
+            _ler_xmp(texto, resultado)
+        else:
+            resultado.adicionar("PNG", chave.decode("latin-1"), texto.decode("utf-8", errors="replace"))
+
+
+def _ler_png(fluxo: BinaryIO, resultado: ResultadoMetadados, detalhes: bool, miniatura: bool) -> None:
+    """
+    Percorre os chunks do PNG até o primeiro IDAT, sem ler os dados da imagem. Um
+    arquivo truncado encerra a leitura sem erro, e um chunk de texto malformado é
+    ignorado.
+    """
+    fluxo.seek(len(ASSINATURA_PNG))
+    while cabecalho := fluxo.read(8):
+        if len(cabecalho) < 8:
+            break
+        tamanho, tipo = struct.unpack(">I4s", cabecalho)
+        if tipo in (b"IDAT", b"IEND"):
+            break
+        if tipo not in (b"IHDR", b"tEXt", b"zTXt", b"iTXt", b"eXIf"):
+            fluxo.seek(tamanho + 4, 1)  # Dados + CRC
+            continue
+        if (dados := _ler_exato(fluxo, tamanho)) is None:
+            break
+        fluxo.seek(4, 1)  # CRC
+        if tipo == b"IHDR":
+            if len(dados) < 10:
+                break
+            largura, altura, profundidade, tipo_cor = struct.unpack(">IIBB", dados[:10])
+            resultado.adicionar("Imagem", "Largura", largura, "inteiro")
+            resultado.adicionar("Imagem", "Altura", altura, "inteiro")
+            resultado.adicionar("Imagem", "Bits por amostra", profundidade, "inteiro")
+            resultado.adicionar("Imagem", "Tipo de cor", tipo_cor, "inteiro")
+        elif tipo == b"eXIf":
+            _ler_exif(dados, resultado, detalhes, miniatura)
+        else:
+            try:
+                _ler_texto_png(tipo, dados, resultado)
+            except zlib.error:
+                continue
+
+
+def _dimensoes_webp(tipo: bytes, dados: bytes) -> tuple[int, int] | None:
+    if tipo == b"VP8X" and len(dados) >= 10:
+        return int.from_bytes(dados[4:7], "little") + 1, int.from_bytes(dados[7:10], "little") + 1
+    if tipo == b"VP8 " and len(dados) >= 10 and dados[3:6] == b"\x9d\x01\x2a":
+        # Quadro-chave do VP8: 14 bits de largura e de altura após o código de início
+        largura, altura = struct.unpack("<HH", dados[6:10])
+        return largura & 0x3FFF, altura & 0x3FFF
+    if tipo == b"VP8L" and len(dados) >= 5 and dados[0] == 0x2F:
+        # VP8L: largura - 1 e altura - 1 em 14 bits cada, após a assinatura
+        bits = int.from_bytes(dados[1:5], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    return None
+
+
+def _ler_webp(fluxo: BinaryIO, resultado: ResultadoMetadados, detalhes: bool, miniatura: bool) -> None:
+    """
+    Percorre os chunks RIFF do WebP, pulando os dados de imagem. As dimensões vêm
+    do VP8X ou, no WebP simples, do cabeçalho do quadro VP8/VP8L.
+    """
+    fluxo.seek(12)
+    dimensoes = None
+    while cabecalho := fluxo.read(8):
+        if len(cabecalho) < 8:
+            break
+        tipo, tamanho = struct.unpack("<4sI", cabecalho)
+        preenchimento = tamanho % 2
+        if tipo in (b"VP8X", b"VP8 ", b"VP8L"):
+            # Só o início do chunk tem as dimensões; o restante são os dados da imagem
+            inicio = fluxo.read(min(tamanho, 10))
+            if dimensoes is None and (dimensoes := _dimensoes_webp(tipo, inicio)):
+                resultado.adicionar("Imagem", "Largura", dimensoes[0], "inteiro")
+                resultado.adicionar("Imagem", "Altura", dimensoes[1], "inteiro")
+            fluxo.seek(tamanho - len(inicio), 1)
+        elif tipo in (b"EXIF", b"XMP "):
+            if (dados := _ler_exato(fluxo, tamanho)) is None:
+                break
+            if tipo == b"EXIF":
+                _ler_exif(dados, resultado, detalhes, miniatura)
+            else:
+                _ler_xmp(dados, resultado)
+        else:
+            fluxo.seek(tamanho, 1)
+        fluxo.seek(preenchimento, 1)
+
+
+def extrair_metadados(
+    fluxo: BinaryIO, detalhes: bool = False, miniatura: bool = False
+) -> ResultadoMetadados:
+    """
+    Extrai os metadados de uma imagem lendo apenas os cabeçalhos.
+
+    Suporta EXIF e XMP em JPEG, PNG (chunks de texto e eXIf) e WebP. Outros formatos,
+    como TIFF, são repassados ao exifread.
+
+    Params:
+        fluxo (BinaryIO): Arquivo aberto para leitura binária, com suporte a seek.
+        detalhes (bool, optional): Se True, também interpreta as MakerNotes. Defaults to False.
+        miniatura (bool, optional): Se True, extrai a miniatura embutida. Defaults to False.
+
+    Returns:
+        ResultadoMetadados: Metadados encontrados em formato de tabela.
+    """
+    resultado = ResultadoMetadados()
+    fluxo.seek(0)
+    assinatura = fluxo.read(12)
+    if assinatura.startswith(b"\xff\xd8"):
+        resultado.formato = "JPEG"
+        _ler_jpeg(fluxo, resultado, detalhes, miniatura)
+    elif assinatura.startswith(ASSINATURA_PNG):
+        resultado.formato = "PNG"
+        _ler_png(fluxo, resultado, detalhes, miniatura)
+    elif assinatura.startswith(b"RIFF") and assinatura[8:12] == b"WEBP":
+        resultado.formato = "WEBP"
+        _ler_webp(fluxo, resultado, detalhes, miniatura)
+    else:
+        fluxo.seek(0)
+        tags = exifread.process_file(fluxo, details=detalhes or miniatura)
+        _adicionar_tags(tags, resultado)
+    fluxo.seek(0)
+    return resultado
+
+
+def _extrair_de_fonte(abrir: Callable[[], BinaryIO], detalhes: bool) -> ResultadoMetadados:
+    with abrir() as fluxo:
+        return extrair_metadados(fluxo, detalhes=detalhes)
+
+
+def extrair_metadados_em_lote(
+    fontes: Iterable[tuple[str, Callable[[], BinaryIO]]],
+    detalhes: bool = False,
+    max_threads: int = MAX_THREADS_METADADOS,
+) -> Iterator[tuple[str, ResultadoMetadados | Exception]]:
+    """
+    Extrai os metadados de várias imagens em paralelo com um pool de threads.
+
+    As fontes são consumidas aos poucos, mantendo no máximo 2 * max_threads
+    arquivos abertos ao mesmo tempo.
+
+    Params:
+        fontes (Iterable[tuple[str, Callable[[], BinaryIO]]]): Nome de cada arquivo e uma função que o abre.
+        detalhes (bool, optional): Se True, também interpreta as MakerNotes. Defaults to False.
+        max_threads (int, optional): Quantidade de threads. Defaults to MAX_THREADS_METADADOS.
+
+    Returns:
+        Iterator[tuple[str, ResultadoMetadados | Exception]]: Nome e resultado (ou erro) de cada arquivo, na ordem de conclusão.
+    """
+    fontes = iter(fontes)
+    pendentes: dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=max_threads) as pool:
+
+        def enviar_proximo() -> bool:
+            try:
+                nome, abrir = next(fontes)
+            except StopIteration:
+                return False
+            pendentes[pool.submit(_extrair_de_fonte, abrir, detalhes)] = nome
+            return True
+
+        while len(pendentes) < 2 * max_threads and enviar_proximo():
+            pass
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                nome = pendentes.pop(futuro)
+                enviar_proximo()
+                try:
+                    resultado = futuro.result()
+                except Exception as ex:
+                    resultado = ex
+                yield nome, resultado
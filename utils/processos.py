@@ -0,0 +1,141 @@
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import cache
+from typing import Any
+
+from loguru import logger
+
+
+# Limite de processos compartilhado por todas as sessões do servidor
+MAX_PROCESSOS = max(1, (os.cpu_count() or 2) - 1)
+
+_lock_pool = threading.Lock()
+
+
+@cache
+def _criar_pool_processos() -> ProcessPoolExecutor:
+    # O contexto "spawn" evita herdar as threads do servidor do Streamlit no fork
+    logger.debug(f"Iniciando pool com {MAX_PROCESSOS} processos")
+    return ProcessPoolExecutor(
+        max_workers=MAX_PROCESSOS,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def obter_pool_processos() -> ProcessPoolExecutor:
+    """
+    Retorna o pool de processos compartilhado por todas as sessões.
+
+    Returns:
+        ProcessPoolExecutor: Pool de processos limitado a MAX_PROCESSOS.
+    """
+    # O cache não serializa a primeira chamada: sem a trava, duas sessões poderiam
+    # criar cada uma o seu pool, e o segundo ficaria esquecido com os seus processos
+    with _lock_pool:
+        return _criar_pool_processos()
+
+
+def reiniciar_pool_processos(pool_quebrado: ProcessPoolExecutor | None = None) -> None:
+    """
+    Descarta o pool de processos atual. Um novo pool é criado no próximo uso.
+
+    Params:
+        pool_quebrado (ProcessPoolExecutor, optional): Pool que falhou. Se outra sessão
+            já o tiver substituído, o pool novo é mantido. Defaults to None.
+    """
+    with _lock_pool:
+        pool = _criar_pool_processos()
+        if pool_quebrado is not None and pool is not pool_quebrado:
+            return None
+        _criar_pool_processos.cache_clear()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def executar_em_pool(funcao: Callable, *args) -> Any:
+    """
+    Executa a função no pool de processos e espera o resultado.
+
+    Se o pool estiver quebrado (ex.: um processo morto por falta de memória), ele é
+    reiniciado e a chamada é repetida uma vez.
+
+    Params:
+        funcao (Callable): Função de nível de módulo (precisa ser serializável).
+        *args: Argumentos da função.
+
+    Returns:
+        Any: Retorno da função.
+    """
+    for tentativa in range(2):
+        pool = obter_pool_processos()
+        try:
+            return pool.submit(funcao, *args).result()
+        except BrokenProcessPool:
+            logger.error("Pool de processos quebrado, reiniciando")
+            reiniciar_pool_processos(pool)
+            if tentativa:
+                raise
+
+
+def mapear_em_pool(
+    funcao: Callable, argumentos: Iterable[tuple], janela: int | None = None
+) -> Iterator[tuple[int, Future]]:
+    """
+    Executa a função no pool de processos para cada tupla de argumentos.
+
+    Os argumentos são consumidos aos poucos, mantendo no máximo `janela` tarefas
+    em andamento, para que um lote grande não seja carregado todo na memória.
+
+    Params:
+        funcao (Callable): Função de nível de módulo (precisa ser serializável).
+        argumentos (Iterable[tuple]): Argumentos de cada chamada.
+        janela (int, optional): Máximo de tarefas em andamento. Defaults to 2 * MAX_PROCESSOS.
+
+    Returns:
+        Iterator[tuple[int, Future]]: Índice do item e o futuro concluído, na ordem de conclusão.
+    """
+    janela = janela or 2 * MAX_PROCESSOS
+    argumentos = enumerate(argumentos)
+    pendentes: dict[Future, int] = {}
+    # Pool de cada futuro, para reiniciar só o pool que quebrou
+    pools: dict[Future, ProcessPoolExecutor] = {}
+
+    def enviar_proximo() -> bool:
+        try:
+            indice, args = next(argumentos)
+        except StopIteration:
+            return False
+        pool = obter_pool_processos()
+        try:
+            futuro = pool.submit(funcao, *args)
+        except BrokenProcessPool:
+            # O pool quebrou antes de algum futuro concluído acusar a falha
+            logger.error("Pool de processos quebrado, reiniciando")
+            reiniciar_pool_processos(pool)
+            pool = obter_pool_processos()
+            futuro = pool.submit(funcao, *args)
+        pendentes[futuro] = indice
+        pools[futuro] = pool
+        return True
+
+    try:
+        while len(pendentes) < janela and enviar_proximo():
+            pass
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            # Um processo morto (ex.: falta de memória) quebra o pool inteiro
+            for futuro in concluidos:
+                if not futuro.cancelled() and isinstance(futuro.exception(), BrokenProcessPool):
+                    logger.error("Pool de processos quebrado, reiniciando")
+                    reiniciar_pool_processos(pools[futuro])
+            for futuro in concluidos:
+                indice = pendentes.pop(futuro)
+                del pools[futuro]
+                enviar_proximo()
+                yield indice, futuro
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
@@ -0,0 +1,369 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import cache
+from typing import BinaryIO
+
+import streamlit as st
+from loguru import logger
+from pydantic import BaseModel
+
+from utils.sessao import id_sessao, sessao_ativa
+from utils.temporarios import criar_diretorio_processo
+
+
+DIRETORIO_RESULTADOS = os.environ.get(
+    "DETUDO_RESULTADOS_DIR", os.path.join(tempfile.gettempdir(), "detudo-resultados")
+)
+TTL_RESULTADOS_SEGUNDOS = int(os.environ.get("DETUDO_RESULTADOS_TTL", 30 * 60))
+COTA_SESSAO_BYTES = int(os.environ.get("DETUDO_RESULTADOS_COTA_SESSAO_MB", 512)) * 1024 * 1024
+COTA_GLOBAL_BYTES = int(os.environ.get("DETUDO_RESULTADOS_COTA_GLOBAL_MB", 4096)) * 1024 * 1024
+INTERVALO_VARREDURA_SEGUNDOS = 60
+# Acima deste tamanho o arquivo só é lido do disco quando a pessoa pede o download
+LIMITE_DOWNLOAD_IMEDIATO_BYTES = int(os.environ.get("DETUDO_RESULTADOS_DOWNLOAD_IMEDIATO_MB", 32)) * 1024 * 1024
+
+
+class Resultado(BaseModel):
+    id: str
+    sessao: str
+    caminho: str
+    nome_arquivo: str
+    mime: str
+    rotulo: str
+    tamanho: int
+    acessado_em: float
+
+
+class ArmazemResultados:
+    """
+    Guarda em disco os arquivos gerados para download, em vez de mantê-los na sessão.
+
+    Cada resultado pertence a uma sessão e é acessado por um identificador. Os
+    resultados expiram após o TTL sem uso, e as cotas por sessão e global são
+    respeitadas descartando os resultados usados há mais tempo (LRU). Quando a
+    sessão termina, os resultados dela são removidos na próxima varredura.
+    """
+
+    def __init__(
+        self,
+        diretorio: str = DIRETORIO_RESULTADOS,
+        ttl_segundos: int = TTL_RESULTADOS_SEGUNDOS,
+        cota_sessao_bytes: int = COTA_SESSAO_BYTES,
+        cota_global_bytes: int = COTA_GLOBAL_BYTES,
+        sessao_ativa: Callable[[str], bool] = lambda sessao: True,
+    ) -> None:
+        # Os resultados de processos encerrados não pertencem a nenhuma sessão viva; os
+        # de outros processos vivos ficam com eles
+        self.diretorio = criar_diretorio_processo(diretorio)
+        self.ttl_segundos = ttl_segundos
+        self.cota_sessao_bytes = cota_sessao_bytes
+        self.cota_global_bytes = cota_global_bytes
+        self.sessao_ativa = sessao_ativa
+        self._lock = threading.Lock()
+        self._resultados: OrderedDict[str, Resultado] = OrderedDict()
+
+    def _uso(self, sessao: str | None = None) -> int:
+        return sum(
+            resultado.tamanho
+            for resultado in self._resultados.values()
+            if sessao is None or resultado.sessao == sessao
+        )
+
+    def _remover(self, id: str) -> None:
+        if resultado := self._resultados.pop(id, None):
+            logger.debug(f"Removendo resultado: {resultado.nome_arquivo} ({resultado.sessao})")
+            try:
+                os.remove(resultado.caminho)
+            except FileNotFoundError:
+                pass
+
+    def _liberar_espaco(self, sessao: str, tamanho: int) -> None:
+        for id in [id for id, r in self._resultados.items() if r.sessao == sessao]:
+            if self._uso(sessao) + tamanho <= self.cota_sessao_bytes:
+                break
+            self._remover(id)
+        for id in list(self._resultados):
+            if self._uso() + tamanho <= self.cota_global_bytes:
+                break
+            self._remover(id)
+
+    def _registrar(self, sessao: str, temp_path: str, nome_arquivo: str, mime: str, rotulo: str) -> str:
+        tamanho = os.path.getsize(temp_path)
+        if tamanho > min(self.cota_sessao_bytes, self.cota_global_bytes):
+            os.remove(temp_path)
+            raise ValueError(f"O arquivo {nome_arquivo} excede a cota de armazenamento.")
+        resultado = Resultado(
+            id=uuid.uuid4().hex,
+            sessao=sessao,
+            caminho=temp_path,
+            nome_arquivo=nome_arquivo,
+            mime=mime,
+            rotulo=rotulo,
+            tamanho=tamanho,
+            acessado_em=time.monotonic(),
+        )
+        with self._lock:
+            self._liberar_espaco(sessao, tamanho)
+            self._resultados[resultado.id] = resultado
+        return resultado.id
+
+    def _novo_arquivo(self) -> BinaryIO:
+        return tempfile.NamedTemporaryFile(dir=self.diretorio, delete=False)
+
+    def guardar_bytes(self, sessao: str, dados: bytes, nome_arquivo: str, mime: str, rotulo: str) -> str:
+        """
+        Guarda um resultado a partir de bytes.
+
+        Params:
+            sessao (str): Sessão dona do resultado.
+            dados (bytes): Conteúdo do arquivo.
+            nome_arquivo (str): Nome sugerido para o download.
+            mime (str): Tipo MIME do arquivo.
+            rotulo (str): Texto do botão de download.
+
+        Returns:
+            str: Identificador do resultado.
+        """
+        with self._novo_arquivo() as arquivo:
+            arquivo.write(dados)
+        return self._registrar(sessao, arquivo.name, nome_arquivo, mime, rotulo)
+
+    def guardar_fluxo(self, sessao: str, fluxo: BinaryIO, nome_arquivo: str, mime: str, rotulo: str) -> str:
+        """
+        Guarda um resultado a partir de um arquivo aberto.
+
+        Se o arquivo tiver um caminho em disco (ex.: um resultado do cache), usa um
+        hard link; caso contrário, copia o conteúdo em blocos.
+
+        Params:
+            sessao (str): Sessão dona do resultado.
+            fluxo (BinaryIO): Arquivo aberto para leitura binária.
+            nome_arquivo (str): Nome sugerido para o download.
+            mime (str): Tipo MIME do arquivo.
+            rotulo (str): Texto do botão de download.
+
+        Returns:
+            str: Identificador do resultado.
+        """
+        caminho = getattr(fluxo, "name", None)
+        if isinstance(caminho, str) and os.path.isfile(caminho):
+            temp_path = os.path.join(self.diretorio, uuid.uuid4().hex)
+            try:
+                os.link(caminho, temp_path)
+                return self._registrar(sessao, temp_path, nome_arquivo, mime, rotulo)
+            except OSError:
+                pass
+        with self._novo_arquivo() as arquivo:
+            fluxo.seek(0)
+            shutil.copyfileobj(fluxo, arquivo, 1024 * 1024)
+        return self._registrar(sessao, arquivo.name, nome_arquivo, mime, rotulo)
+
+    def guardar_arquivo(self, sessao: str, caminho: str, nome_arquivo: str, mime: str, rotulo: str) -> str:
+        """
+        Guarda um resultado que já está em disco, usando um hard link quando possível.
+
+        Params:
+            sessao (str): Sessão dona do resultado.
+            caminho (str): Caminho do arquivo. Continua pertencendo a quem chamou.
+            nome_arquivo (str): Nome sugerido para o download.
+            mime (str): Tipo MIME do arquivo.
+            rotulo (str): Texto do botão de download.
+
+        Returns:
+            str: Identificador do resultado.
+        """
+        temp_path = os.path.join(self.diretorio, uuid.uuid4().hex)
+        try:
+            os.link(caminho, temp_path)
+        except OSError:
+            shutil.copyfile(caminho, temp_path)
+        return self._registrar(sessao, temp_path, nome_arquivo, mime, rotulo)
+
+    def obter(self, id: str) -> Resultado | None:
+        """
+        Retorna um resultado e renova o seu prazo de expiração.
+
+        Params:
+            id (str): Identificador do resultado.
+
+        Returns:
+            Resultado | None: Resultado ou None se tiver expirado.
+        """
+        with self._lock:
+            if resultado := self._resultados.get(id):
+                resultado.acessado_em = time.monotonic()
+                self._resultados.move_to_end(id)
+            return resultado
+
+    def ler(self, id: str) -> bytes | None:
+        """
+        Lê o conteúdo de um resultado.
+
+        Params:
+            id (str): Identificador do resultado.
+
+        Returns:
+            bytes | None: Conteúdo do arquivo ou None se tiver expirado.
+        """
+        if resultado := self.obter(id):
+            try:
+                with open(resultado.caminho, "rb") as arquivo:
+                    return arquivo.read()
+            except FileNotFoundError:
+                return None
+        return None
+
+    def remover(self, id: str) -> None:
+        """
+        Remove um resultado.
+
+        Params:
+            id (str): Identificador do resultado.
+        """
+        with self._lock:
+            self._remover(id)
+
+    def varrer(self) -> None:
+        """
+        Remove os resultados expirados e os de sessões encerradas.
+        """
+        limite = time.monotonic() - self.ttl_segundos
+        with self._lock:
+            sessoes = {resultado.sessao for resultado in self._resultados.values()}
+            encerradas = {sessao for sessao in sessoes if not self.sessao_ativa(sessao)}
+            for id, resultado in list(self._resultados.items()):
+                if resultado.acessado_em < limite or resultado.sessao in encerradas:
+                    self._remover(id)
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna o uso atual do armazenamento.
+
+        Returns:
+            dict: Quantidade de resultados, sessões e bytes ocupados.
+        """
+        with self._lock:
+            return {
+                "resultados": len(self._resultados),
+                "sessoes": len({r.sessao for r in self._resultados.values()}),
+                "bytes": self._uso(),
+            }
+
+
+_lock_armazem = threading.Lock()
+
+
+@cache
+def _criar_armazem_resultados() -> ArmazemResultados:
+    armazem = ArmazemResultados(sessao_ativa=sessao_ativa)
+
+    def varrer_periodicamente() -> None:
+        while True:
+            time.sleep(INTERVALO_VARREDURA_SEGUNDOS)
+            try:
+                armazem.varrer()
+            except Exception as ex:
+                logger.error(ex)
+
+    threading.Thread(target=varrer_periodicamente, daemon=True).start()
+    return armazem
+
+
+def obter_armazem_resultados() -> ArmazemResultados:
+    """
+    Retorna o armazenamento de resultados compartilhado por todas as sessões.
+
+    Também inicia uma thread que faz a varredura periódica dos resultados.
+
+    Returns:
+        ArmazemResultados: Instância única do armazenamento.
+    """
+    # O cache não serializa a primeira chamada: sem a trava, duas sessões poderiam
+    # criar cada uma o seu armazenamento, com cotas separadas
+    with _lock_armazem:
+        return _criar_armazem_resultados()
+
+
+def registrar_resultado(chave_estado: str, id: str) -> None:
+    """
+    Registra no session_state um resultado já guardado no armazenamento (ex.: por
+    uma tarefa em segundo plano), descartando o anterior da mesma chave.
+
+    Params:
+        chave_estado (str): Chave do session_state que guarda o identificador.
+        id (str): Identificador do resultado.
+    """
+    if (id_anterior := st.session_state.pop(chave_estado, None)) and id_anterior != id:
+        obter_armazem_resultados().remover(id_anterior)
+    st.session_state[chave_estado] = id
+
+
+def guardar_resultado(chave_estado: str, dados: bytes | BinaryIO | str, nome_arquivo: str, mime: str, rotulo: str) -> None:
+    """
+    Guarda um resultado da sessão atual e registra o identificador no session_state.
+
+    O resultado anterior guardado na mesma chave é descartado.
+
+    Params:
+        chave_estado (str): Chave do session_state que guarda o identificador.
+        dados (bytes | BinaryIO | str): Conteúdo, arquivo aberto ou caminho em disco.
+        nome_arquivo (str): Nome sugerido para o download.
+        mime (str): Tipo MIME do arquivo.
+        rotulo (str): Texto do botão de download.
+    """
+    armazem = obter_armazem_resultados()
+    if isinstance(dados, bytes):
+        guardar = armazem.guardar_bytes
+    elif isinstance(dados, str):
+        guardar = armazem.guardar_arquivo
+    else:
+        guardar = armazem.guardar_fluxo
+    registrar_resultado(chave_estado, guardar(id_sessao(), dados, nome_arquivo, mime, rotulo))
+
+
+def botao_baixar_resultado(chave_estado: str, exibir_uma_vez: bool = False) -> None:
+    """
+    Exibe o botão de download do resultado registrado no session_state.
+
+    Params:
+        chave_estado (str): Chave do session_state que guarda o identificador.
+        exibir_uma_vez (bool, optional): Se True, descarta o resultado depois de exibir o botão. Defaults to False.
+    """
+    if not (id := st.session_state.get(chave_estado)):
+        return None
+    armazem = obter_armazem_resultados()
+    resultado = armazem.obter(id)
+
+    # O download_button precisa do conteúdo na memória a cada execução do script,
+    # então arquivos grandes só são lidos depois que a pessoa pede
+    chave_preparado = f"{chave_estado}.preparado"
+    if (
+        resultado
+        and resultado.tamanho > LIMITE_DOWNLOAD_IMEDIATO_BYTES
+        and st.session_state.get(chave_preparado) != id
+    ):
+        st.button(
+            f"Preparar download ({resultado.tamanho / 1024 ** 2:.0f} MB)",
+            key=f"{chave_estado}.preparar",
+            on_click=lambda: st.session_state.update({chave_preparado: id}),
+        )
+        return None
+
+    dados = armazem.ler(id) if resultado else None
+    if dados is None:
+        st.session_state.pop(chave_estado, None)
+        st.caption("O arquivo expirou. Converta novamente para baixar.")
+        return None
+    st.download_button(
+        resultado.rotulo,
+        data=dados,
+        file_name=resultado.nome_arquivo,
+        mime=resultado.mime,
+    )
+    if exibir_uma_vez:
+        armazem.remover(st.session_state.pop(chave_estado))
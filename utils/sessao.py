@@ -0,0 +1,28 @@
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+
+def id_sessao() -> str:
+    """
+    Retorna o identificador da sessão do Streamlit em execução.
+
+    Returns:
+        str: Identificador da sessão, ou "local" fora de uma sessão.
+    """
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+
+def sessao_ativa(sessao: str) -> bool:
+    """
+    Verifica se uma sessão do Streamlit ainda está conectada.
+
+    Params:
+        sessao (str): Identificador da sessão.
+
+    Returns:
+        bool: True se a sessão ainda existir.
+    """
+    if not Runtime.exists():
+        return True
+    return Runtime.instance().is_active_session(sessao)
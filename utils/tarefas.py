@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import Any, Literal
+
+from loguru import logger
+from pydantic import BaseModel, PrivateAttr
+
+from utils.sessao import sessao_ativa
+
+
+# Tarefas longas (ex.: conversão de vídeo) executadas ao mesmo tempo no servidor
+MAX_TAREFAS = int(os.environ.get("DETUDO_TAREFAS_MAX", 2))
+# Tempo que uma tarefa encerrada continua disponível para a sessão consultar
+TTL_TAREFAS_SEGUNDOS = 60 * 60
+
+SituacaoTarefa = Literal["na_fila", "executando", "concluida", "erro", "cancelada"]
+
+
+class TarefaCancelada(Exception):
+    """
+    Interrompe uma tarefa cujo cancelamento foi pedido.
+    """
+
+
+class Tarefa(BaseModel):
+    id: str
+    sessao: str
+    descricao: str
+    situacao: SituacaoTarefa = "na_fila"
+    progresso: float = 0.0
+    mensagem: str = ""
+    erro: str | None = None
+    tipo_erro: str | None = None
+    resultado: Any = None
+    criada_em: float
+    iniciada_em: float | None = None
+    encerrada_em: float | None = None
+    _cancelamento: threading.Event = PrivateAttr(default_factory=threading.Event)
+
+    @property
+    def encerrada(self) -> bool:
+        return self.encerrada_em is not None
+
+    def cancelar(self) -> None:
+        """
+        Pede o cancelamento. A tarefa para na próxima vez que informar o progresso.
+        """
+        self._cancelamento.set()
+
+    def progredir(self, progresso: float, mensagem: str = "") -> None:
+        """
+        Informa o progresso da tarefa. Chamado pela própria tarefa durante a execução.
+
+        Params:
+            progresso (float): Fração concluída, entre 0 e 1.
+            mensagem (str, optional): Texto exibido junto do progresso. Defaults to "".
+
+        Raises:
+            TarefaCancelada: Se o cancelamento tiver sido pedido.
+        """
+        if self._cancelamento.is_set():
+            raise TarefaCancelada()
+        self.progresso = min(max(progresso, 0.0), 1.0)
+        self.mensagem = mensagem
+
+
+class GerenciadorTarefas:
+    """
+    Executa tarefas longas em segundo plano, fora da thread do script do Streamlit.
+
+    As tarefas continuam rodando entre as execuções do script e as trocas de
+    página, e a sessão consulta o andamento pelo identificador. Tarefas de sessões
+    encerradas são canceladas, e as encerradas são esquecidas após o TTL.
+    """
+
+    def __init__(
+        self,
+        max_tarefas: int = MAX_TAREFAS,
+        ttl_segundos: int = TTL_TAREFAS_SEGUNDOS,
+        sessao_ativa: Callable[[str], bool] = lambda sessao: True,
+    ) -> None:
+        self.ttl_segundos = ttl_segundos
+        self.sessao_ativa = sessao_ativa
+        self._lock = threading.Lock()
+        self._tarefas: dict[str, Tarefa] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_tarefas, thread_name_prefix="tarefa")
+
+    def _executar(self, tarefa: Tarefa, funcao: Callable[[Tarefa], Any]) -> None:
+        tarefa.iniciada_em = time.monotonic()
+        tarefa.situacao = "executando"
+        try:
+            tarefa.progredir(0.0)
+            tarefa.resultado = funcao(tarefa)
+            tarefa.progresso = 1.0
+            tarefa.situacao = "concluida"
+        except TarefaCancelada:
+            logger.debug(f"Tarefa cancelada: {tarefa.descricao} ({tarefa.sessao})")
+            tarefa.situacao = "cancelada"
+        except Exception as ex:
+            logger.error(f"{tarefa.descricao}: {ex}")
+            tarefa.erro = str(ex)
+            tarefa.tipo_erro = type(ex).__name__
+            tarefa.situacao = "erro"
+        finally:
+            tarefa.encerrada_em = time.monotonic()
+
+    def submeter(self, sessao: str, descricao: str, funcao: Callable[[Tarefa], Any]) -> str:
+        """
+        Agenda uma tarefa em segundo plano.
+
+        Params:
+            sessao (str): Sessão dona da tarefa.
+            descricao (str): Descrição exibida e usada nos logs.
+            funcao (Callable[[Tarefa], Any]): Função que recebe a tarefa, informa o
+                progresso com tarefa.progredir() e retorna o resultado.
+
+        Returns:
+            str: Identificador da tarefa.
+        """
+        self.varrer()
+        tarefa = Tarefa(
+            id=uuid.uuid4().hex,
+            sessao=sessao,
+            descricao=descricao,
+            criada_em=time.monotonic(),
+        )
+        with self._lock:
+            self._tarefas[tarefa.id] = tarefa
+        self._executor.submit(self._executar, tarefa, funcao)
+        return tarefa.id
+
+    def obter(self, id: str) -> Tarefa | None:
+        """
+        Retorna uma tarefa.
+
+        Params:
+            id (str): Identificador da tarefa.
+
+        Returns:
+            Tarefa | None: Tarefa ou None se tiver sido esquecida.
+        """
+        with self._lock:
+            return self._tarefas.get(id)
+
+    def cancelar(self, id: str) -> None:
+        """
+        Pede o cancelamento de uma tarefa.
+
+        Params:
+            id (str): Identificador da tarefa.
+        """
+        if tarefa := self.obter(id):
+            tarefa.cancelar()
+
+    def varrer(self) -> None:
+        """
+        Cancela as tarefas de sessões encerradas e esquece as encerradas há mais que o TTL.
+        """
+        limite = time.monotonic() - self.ttl_segundos
+        with self._lock:
+            for id, tarefa in list(self._tarefas.items()):
+                if not tarefa.encerrada:
+                    if not self.sessao_ativa(tarefa.sessao):
+                        tarefa.cancelar()
+                elif tarefa.encerrada_em < limite or not self.sessao_ativa(tarefa.sessao):
+                    del self._tarefas[id]
+
+
+_lock_gerenciador = threading.Lock()
+
+
+@cache
+def _criar_gerenciador_tarefas() -> GerenciadorTarefas:
+    return GerenciadorTarefas(sessao_ativa=sessao_ativa)
+
+
+def obter_gerenciador_tarefas() -> GerenciadorTarefas:
+    """
+    Retorna o gerenciador de tarefas compartilhado por todas as sessões.
+
+    Returns:
+        GerenciadorTarefas: Instância única do gerenciador.
+    """
+    # O cache não serializa a primeira chamada: sem a trava, duas sessões poderiam
+    # criar cada uma o seu gerenciador, e uma tarefa enviada a um não seria achada no outro
+    with _lock_gerenciador:
+        return _criar_gerenciador_tarefas()
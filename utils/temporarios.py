@@ -0,0 +1,250 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import cache
+
+from loguru import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+DIRETORIO_TEMPORARIOS = os.environ.get(
+    "DETUDO_TEMP_DIR", os.path.join(tempfile.gettempdir(), "detudo-temp")
+)
+LIMITE_TEMPORARIOS_BYTES = int(os.environ.get("DETUDO_TEMP_LIMITE_MB", 8192)) * 1024 * 1024
+# Espaço que deve sobrar no disco além das reservas
+MARGEM_DISCO_BYTES = 512 * 1024 * 1024
+INTERVALO_ESPERA_SEGUNDOS = 1.0
+
+
+class EspacoInsuficiente(ValueError):
+    pass
+
+
+# Travas dos diretórios deste processo, abertas enquanto o processo viver
+_travas_diretorios: dict[str, int] = {}
+
+
+def _travar(caminho: str) -> int:
+    while True:
+        fd = os.open(caminho, os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # Outro processo pode ter apagado o arquivo enquanto esperávamos a trava
+        try:
+            if os.stat(caminho).st_ino == os.fstat(fd).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+def _apagar(caminho: str) -> None:
+    if os.path.isdir(caminho):
+        shutil.rmtree(caminho, ignore_errors=True)
+    else:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def _remover_se_orfao(raiz: str, nome: str) -> bool:
+    trava = os.path.join(raiz, f"{nome}.lock")
+    try:
+        fd = os.open(trava, os.O_RDWR)
+    except FileNotFoundError:
+        # Entrada sem trava, deixada por uma versão anterior
+        _apagar(os.path.join(raiz, nome))
+        return True
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        if os.stat(trava).st_ino != os.fstat(fd).st_ino:
+            return False
+        _apagar(os.path.join(raiz, nome))
+        os.remove(trava)
+        return True
+    except FileNotFoundError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def criar_diretorio_processo(raiz: str) -> str:
+    """
+    Cria o diretório de trabalho deste processo dentro de um diretório compartilhado.
+
+    Cada processo usa um subdiretório com o seu pid, travado pelo arquivo <pid>.lock
+    enquanto o processo viver. Os subdiretórios com a trava livre foram deixados por
+    processos encerrados e são removidos; os de processos vivos (ex.: um segundo
+    servidor, ou um reinício que se sobrepõe ao anterior) são mantidos. Sem fcntl
+    (Windows), só as sobras do próprio pid são removidas.
+
+    Params:
+        raiz (str): Diretório compartilhado pelos processos.
+
+    Returns:
+        str: Diretório deste processo, vazio na primeira chamada.
+    """
+    diretorio = os.path.join(raiz, str(os.getpid()))
+    if diretorio in _travas_diretorios:
+        return diretorio
+
+    os.makedirs(raiz, exist_ok=True)
+    if fcntl is None:
+        _travas_diretorios[diretorio] = -1
+    else:
+        _travas_diretorios[diretorio] = _travar(f"{diretorio}.lock")
+        nomes = {nome.removesuffix(".lock") for nome in os.listdir(raiz)} - {str(os.getpid())}
+        orfaos = [nome for nome in nomes if _remover_se_orfao(raiz, nome)]
+        if orfaos:
+            logger.info(f"Removidas {len(orfaos)} sobras de processos encerrados em {raiz}")
+    # Sobras de um processo anterior com o mesmo pid
+    shutil.rmtree(diretorio, ignore_errors=True)
+    os.makedirs(diretorio)
+    return diretorio
+
+
+class GerenciadorTemporarios:
+    """
+    Controla o espaço em disco usado pelos arquivos temporários das conversões.
+
+    Cada conversão reserva uma estimativa do espaço que vai usar e recebe um
+    diretório próprio, apagado ao final em qualquer caso (sucesso, erro ou
+    cancelamento). Quando a soma das reservas passaria do limite, ou o disco
+    ficaria sem a margem mínima, a conversão espera na fila ou é recusada.
+    """
+
+    def __init__(
+        self,
+        diretorio: str = DIRETORIO_TEMPORARIOS,
+        limite_bytes: int = LIMITE_TEMPORARIOS_BYTES,
+        margem_disco_bytes: int = MARGEM_DISCO_BYTES,
+    ) -> None:
+        # As sobras de processos encerrados (ex.: servidor interrompido no meio de uma
+        # conversão) são removidas, sem tocar nas de outros processos vivos
+        self.diretorio = criar_diretorio_processo(diretorio)
+        self.limite_bytes = limite_bytes
+        self.margem_disco_bytes = margem_disco_bytes
+        self._condicao = threading.Condition()
+        self._reservas: dict[str, int] = {}
+
+    def _cabe(self, tamanho: int) -> bool:
+        reservado = sum(self._reservas.values())
+        livre = shutil.disk_usage(self.diretorio).free
+        # O que já foi reservado pode ainda não estar gravado no disco
+        return (
+            reservado + tamanho <= self.limite_bytes
+            and livre - (reservado + tamanho) >= self.margem_disco_bytes
+        )
+
+    @contextmanager
+    def reservar(
+        self,
+        tamanho: int,
+        espera_maxima: float = 0,
+        ao_aguardar: Callable[[], None] | None = None,
+    ) -> Iterator[str]:
+        """
+        Reserva espaço e cria um diretório temporário para uma conversão.
+
+        Params:
+            tamanho (int): Estimativa de bytes que a conversão vai gravar.
+            espera_maxima (float, optional): Segundos que a conversão pode esperar na
+                fila por espaço. Defaults to 0 (recusa na hora).
+            ao_aguardar (Callable[[], None], optional): Chamada a cada intervalo de
+                espera; uma exceção lançada por ela desiste da reserva. Defaults to None.
+
+        Returns:
+            Iterator[str]: Caminho do diretório, apagado ao sair do bloco with.
+
+        Raises:
+            EspacoInsuficiente: Se não houver espaço dentro do tempo de espera.
+        """
+        if tamanho > self.limite_bytes:
+            raise EspacoInsuficiente("O arquivo é grande demais para ser convertido neste servidor.")
+
+        id = uuid.uuid4().hex
+        limite = time.monotonic() + espera_maxima
+        with self._condicao:
+            while not self._cabe(tamanho):
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise EspacoInsuficiente(
+                        "O servidor está sem espaço para conversões no momento. Tente novamente mais tarde."
+                    )
+                self._condicao.wait(min(restante, INTERVALO_ESPERA_SEGUNDOS))
+                if ao_aguardar:
+                    ao_aguardar()
+            self._reservas[id] = tamanho
+
+        diretorio = os.path.join(self.diretorio, id)
+        try:
+            os.makedirs(diretorio)
+            yield diretorio
+        finally:
+            shutil.rmtree(diretorio, ignore_errors=True)
+            with self._condicao:
+                del self._reservas[id]
+                self._condicao.notify_all()
+
+    def estatisticas(self) -> dict:
+        """
+        Retorna o uso atual das reservas.
+
+        Returns:
+            dict: Quantidade de reservas e bytes reservados.
+        """
+        with self._condicao:
+            return {
+                "reservas": len(self._reservas),
+                "bytes": sum(self._reservas.values()),
+            }
+
+
+_lock_gerenciador = threading.Lock()
+
+
+@cache
+def _criar_gerenciador_temporarios() -> GerenciadorTemporarios:
+    return GerenciadorTemporarios()
+
+
+def obter_gerenciador_temporarios() -> GerenciadorTemporarios:
+    """
+    Retorna o gerenciador de temporários compartilhado por todas as sessões.
+
+    Returns:
+        GerenciadorTemporarios: Instância única do gerenciador.
+    """
+    # O cache não serializa a primeira chamada: sem a trava, duas sessões poderiam
+    # criar cada uma o seu gerenciador, com reservas separadas
+    with _lock_gerenciador:
+        return _criar_gerenciador_temporarios()
+
+
+def reservar_temporarios(
+    tamanho: int, espera_maxima: float = 0, ao_aguardar: Callable[[], None] | None = None
+):
+    """
+    Atalho para obter_gerenciador_temporarios().reservar().
+
+    Params:
+        tamanho (int): Estimativa de bytes que a conversão vai gravar.
+        espera_maxima (float, optional): Segundos de espera na fila por espaço. Defaults to 0.
+        ao_aguardar (Callable[[], None], optional): Chamada a cada intervalo de espera. Defaults to None.
+
+    Returns:
+        ContextManager[str]: Diretório temporário da conversão.
+    """
+    return obter_gerenciador_temporarios().reservar(tamanho, espera_maxima, ao_aguardar)
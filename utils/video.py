@@ -0,0 +1,680 @@
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from io import BytesIO
+from typing import Literal
+
+from loguru import logger
+from moviepy.editor import VideoFileClip
+from PIL import Image
+from proglog import ProgressBarLogger
+from pydantic import BaseModel
+
+from utils.ffmpeg import InfoMidia, caminho_ffmpeg, listar_quadros_chave, sondar_midia
+from utils.processos import MAX_PROCESSOS
+
+
+FORMATOS_VIDEO = [
+    "mp4",
+    "avi",
+    "mkv",
+    "mov",
+    "webm",
+]
+
+# Codecs que cada contêiner aceita sem recodificar (nomes do ffprobe)
+CODECS_CONTEINER = {
+    "mp4": {
+        "video": {"h264", "hevc", "mpeg4", "av1", "vp9"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "opus", "flac", "alac"},
+    },
+    "mov": {
+        "video": {"h264", "hevc", "mpeg4", "prores", "mjpeg"},
+        "audio": {"aac", "mp3", "ac3", "alac", "pcm_s16le", "pcm_s24le"},
+    },
+    "mkv": {
+        "video": {"h264", "hevc", "mpeg4", "mpeg2video", "av1", "vp8", "vp9", "theora", "mjpeg", "prores"},
+        "audio": {"aac", "mp3", "ac3", "eac3", "opus", "vorbis", "flac", "alac", "pcm_s16le", "pcm_s24le"},
+    },
+    "webm": {
+        "video": {"vp8", "vp9", "av1"},
+        "audio": {"opus", "vorbis"},
+    },
+    "avi": {
+        "video": {"mpeg4", "h264", "mjpeg", "msmpeg4v3", "mpeg2video"},
+        "audio": {"mp3", "ac3", "pcm_s16le"},
+    },
+}
+# Muxer do ffmpeg de cada formato
+MUXERS = {"mp4": "mp4", "mov": "mov", "mkv": "matroska", "webm": "webm", "avi": "avi"}
+
+MetodoConversao = Literal["copia", "recodificacao", "segmentos"]
+
+# Codec de áudio de cada contêiner na conversão em segmentos, em que o áudio é
+# convertido à parte
+CODECS_AUDIO_SEGMENTOS = {
+    "mp4": ["-c:a", "aac"],
+    "mov": ["-c:a", "aac"],
+    "mkv": ["-c:a", "aac"],
+    "avi": ["-c:a", "libmp3lame"],
+    "webm": ["-c:a", "libopus"],
+}
+# Conversão em segmentos: cada segmento tem pelo menos esta duração
+DURACAO_MINIMA_SEGMENTO_VIDEO = 5.0
+
+# Folha de contato: quadros, largura de cada quadro e colunas
+QUADROS_FOLHA_CONTATO = 12
+LARGURA_QUADRO_FOLHA = 320
+COLUNAS_FOLHA_CONTATO = 4
+# Quadros extraídos ao mesmo tempo somando todas as sessões, como no pool de processos
+_vagas_extracao_quadros = threading.BoundedSemaphore(MAX_PROCESSOS)
+
+# Limite de threads do codificador por conversão, para servidores compartilhados
+LIMITE_THREADS_VIDEO = int(os.environ.get("DETUDO_VIDEO_MAX_THREADS", os.cpu_count() or 1))
+
+# Perfis de codificação: preset e CRF do x264, equivalentes no VP9 (webm) e threads
+# (None usa o limite do servidor)
+PERFIS_VIDEO = {
+    "rascunho": {"preset": "ultrafast", "crf": 30, "cpu_used": 8, "threads": None},
+    "equilibrado": {"preset": "medium", "crf": 23, "cpu_used": 4, "threads": None},
+    "arquivo": {"preset": "slow", "crf": 18, "cpu_used": 1, "threads": None},
+}
+NOMES_PERFIS_VIDEO = {
+    "rascunho": "Rascunho rápido",
+    "equilibrado": "Equilibrado",
+    "arquivo": "Arquivo (melhor qualidade)",
+}
+
+
+def estimar_espaco_video(tamanho_entrada: int) -> int:
+    """
+    Estima o espaço temporário em disco de uma conversão de vídeo.
+
+    Params:
+        tamanho_entrada (int): Tamanho do vídeo original em bytes.
+
+    Returns:
+        int: Bytes estimados: a entrada, a saída (que pode passar do tamanho da
+            entrada com perfis de alta qualidade) e o áudio temporário do moviepy.
+    """
+    return tamanho_entrada * 4
+
+
+class MedicaoConversao(BaseModel):
+    metodo: MetodoConversao
+    duracao_video: float
+    quadros: int
+    tempo_s: float
+
+    @property
+    def quadros_por_segundo(self) -> float:
+        return self.quadros / self.tempo_s if self.tempo_s else 0.0
+
+    @property
+    def fator_tempo_real(self) -> float:
+        return self.duracao_video / self.tempo_s if self.tempo_s else 0.0
+
+
+def parametros_codificador(formato: str, perfil: str = "equilibrado") -> dict:
+    """
+    Monta os parâmetros do write_videofile do moviepy para um perfil.
+
+    Params:
+        formato (str): Formato de destino (ver FORMATOS_VIDEO).
+        perfil (str, optional): Perfil de codificação (ver PERFIS_VIDEO). Defaults to "equilibrado".
+
+    Returns:
+        dict: Argumentos codec, preset, threads e ffmpeg_params.
+    """
+    configuracao = PERFIS_VIDEO[perfil]
+    threads = min(configuracao["threads"] or LIMITE_THREADS_VIDEO, LIMITE_THREADS_VIDEO)
+    if formato == "webm":
+        # No VP9 o CRF só vale com -b:v 0; -cpu-used faz o papel do preset
+        return {
+            "codec": "libvpx-vp9",
+            "threads": threads,
+            "ffmpeg_params": [
+                "-crf", str(configuracao["crf"] + 8),
+                "-b:v", "0",
+                "-deadline", "good",
+                "-cpu-used", str(configuracao["cpu_used"]),
+                "-row-mt", "1",
+            ],
+        }
+    return {
+        "codec": "libx264",
+        "preset": configuracao["preset"],
+        "threads": threads,
+        "ffmpeg_params": ["-crf", str(configuracao["crf"])],
+    }
+
+
+class _ProgressoMoviepy(ProgressBarLogger):
+    """
+    Repassa o progresso da escrita dos quadros do moviepy para uma função.
+    """
+
+    def __init__(self, ao_progredir: Callable[[float, str], None]) -> None:
+        super().__init__()
+        self.ao_progredir = ao_progredir
+
+    def bars_callback(self, bar: str, attr: str, value: int, old_value: int | None = None) -> None:
+        # A barra "t" conta os quadros do vídeo; "chunk" é a do áudio, que vem antes
+        if attr != "index" or not (total := self.bars[bar].get("total")):
+            return None
+        if bar == "t":
+            self.ao_progredir(value / total, f"Quadro {value} de {total}")
+        elif bar == "chunk":
+            self.ao_progredir(0.0, "Processando o áudio")
+
+
+def pode_copiar_fluxos(caminho_entrada: str, formato: str, info: InfoMidia | None = None) -> bool:
+    """
+    Verifica se os fluxos de vídeo e áudio cabem no contêiner de destino sem recodificar.
+
+    Params:
+        caminho_entrada (str): Caminho do vídeo original.
+        formato (str): Formato de destino (ver FORMATOS_VIDEO).
+        info (InfoMidia, optional): Resultado de sondar_midia, se já tiver sido lido. Defaults to None.
+
+    Returns:
+        bool: True se todos os fluxos de vídeo e áudio forem compatíveis.
+    """
+    if info is None:
+        try:
+            info = sondar_midia(caminho_entrada)
+        except RuntimeError as ex:
+            logger.warning(f"Não foi possível sondar o vídeo, ele será recodificado: {ex}")
+            return False
+    compativeis = CODECS_CONTEINER[formato]
+    videos = info.fluxos_do_tipo("video")
+    return bool(videos) and all(
+        fluxo.codec in compativeis[fluxo.tipo]
+        for fluxo in videos + info.fluxos_do_tipo("audio")
+    )
+
+
+def copiar_fluxos(caminho_entrada: str, caminho_saida: str, formato: str) -> None:
+    """
+    Troca o contêiner do vídeo copiando os fluxos de vídeo e áudio, sem recodificar.
+
+    Params:
+        caminho_entrada (str): Caminho do vídeo original.
+        caminho_saida (str): Caminho onde o vídeo será gravado.
+        formato (str): Formato de destino (ver FORMATOS_VIDEO).
+
+    Raises:
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    processo = subprocess.run(
+        [
+            caminho_ffmpeg(),
+            "-hide_banner",
+            "-loglevel", "error",
+            "-nostdin",
+            "-y",
+            "-i", caminho_entrada,
+            "-map", "0:v",
+            "-map", "0:a?",
+            "-c", "copy",
+            # No mp4/mov o índice vai para o início, para o vídeo tocar antes de baixar inteiro
+            *(["-movflags", "+faststart"] if formato in ("mp4", "mov") else []),
+            "-f", MUXERS[formato],
+            caminho_saida,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.decode(errors="replace").strip() or "Falha no ffmpeg")
+
+
+def converter_video(
+    caminho_entrada: str,
+    caminho_saida: str,
+    formato: str,
+    perfil: str = "equilibrado",
+    ao_progredir: Callable[[float, str], None] | None = None,
+) -> MedicaoConversao:
+    """
+    Converte um vídeo em disco para outro formato.
+
+    Params:
+        caminho_entrada (str): Caminho do vídeo original.
+        caminho_saida (str): Caminho onde o vídeo convertido será gravado.
+        formato (str): Formato de destino (ver FORMATOS_VIDEO).
+        perfil (str, optional): Perfil de codificação (ver PERFIS_VIDEO). Defaults to "equilibrado".
+        ao_progredir (Callable[[float, str], None], optional): Recebe a fração de
+            quadros gravados e uma mensagem. Uma exceção lançada por ela interrompe
+            a conversão. Defaults to None.
+
+    Returns:
+        MedicaoConversao: Método usado ("copia" se só o contêiner mudou), duração do
+            vídeo, quadros e tempo gasto.
+    """
+    inicio = time.perf_counter()
+    try:
+        info = sondar_midia(caminho_entrada)
+    except RuntimeError as ex:
+        logger.warning(f"Não foi possível sondar o vídeo, ele será recodificado: {ex}")
+        info = None
+
+    # Quando os codecs cabem no novo contêiner, basta copiar os fluxos. A duração
+    # vem dos cabeçalhos, sem abrir o leitor do moviepy
+    if info and pode_copiar_fluxos(caminho_entrada, formato, info):
+        videos = info.fluxos_do_tipo("video")
+        duracao = info.duracao or 0.0
+        quadros = round(duracao * (videos[0].quadros_por_segundo or 0))
+        if ao_progredir:
+            ao_progredir(0.0, "Copiando os fluxos sem recodificar")
+        try:
+            copiar_fluxos(caminho_entrada, caminho_saida, formato)
+            return MedicaoConversao(
+                metodo="copia",
+                duracao_video=duracao,
+                quadros=quadros,
+                tempo_s=time.perf_counter() - inicio,
+            )
+        except RuntimeError as ex:
+            logger.warning(f"Falha ao copiar os fluxos, recodificando: {ex}")
+
+    video_clip = VideoFileClip(caminho_entrada)
+    try:
+        duracao = video_clip.duration or 0.0
+        quadros = round(duracao * (video_clip.fps or 0))
+
+        # Por padrão o moviepy grava o áudio temporário no diretório atual, e só o
+        # apaga se a conversão terminar; aqui ele fica junto da saída
+        audio_temporario = os.path.join(
+            os.path.dirname(caminho_saida) or ".",
+            f"audio_temporario.{'ogg' if formato == 'webm' else 'mp3'}",
+        )
+        video_clip.write_videofile(
+            caminho_saida,
+            **parametros_codificador(formato, perfil),
+            temp_audiofile=audio_temporario,
+            logger=_ProgressoMoviepy(ao_progredir) if ao_progredir else "bar",
+        )
+    finally:
+        video_clip.close()
+    return MedicaoConversao(
+        metodo="recodificacao",
+        duracao_video=duracao,
+        quadros=quadros,
+        tempo_s=time.perf_counter() - inicio,
+    )
+
+
+def _argumentos_codificador(parametros: dict) -> list[str]:
+    # Converte os parâmetros do write_videofile em argumentos da linha de comando do ffmpeg
+    argumentos = ["-c:v", parametros["codec"]]
+    if preset := parametros.get("preset"):
+        argumentos += ["-preset", preset]
+    return [*argumentos, "-threads", str(parametros["threads"]), *parametros["ffmpeg_params"]]
+
+
+def planejar_segmentos_video(
+    duracao: float, quantidade: int, quadros_chave: list[float], inicio: float = 0.0
+) -> list[tuple[float, float]]:
+    """
+    Divide o vídeo em segmentos de tamanho parecido, cortando sempre em quadros-chave.
+
+    Os instantes dos quadros-chave são absolutos (ver listar_quadros_chave), e os
+    segmentos são relativos ao início do arquivo, como o -ss do ffmpeg.
+
+    Params:
+        duracao (float): Duração total em segundos.
+        quantidade (int): Quantidade desejada de segmentos.
+        quadros_chave (list[float]): Instantes dos quadros-chave.
+        inicio (float, optional): Instante inicial do contêiner (ver InfoMidia). Defaults to 0.0.
+
+    Returns:
+        list[tuple[float, float]]: Início e duração de cada segmento.
+    """
+    quadros_chave = [instante - inicio for instante in quadros_chave]
+    cortes = [0.0]
+    for n in range(1, quantidade):
+        ideal = duracao * n / quantidade
+        corte = min(quadros_chave, key=lambda instante: abs(instante - ideal))
+        if cortes[-1] < corte < duracao:
+            cortes.append(corte)
+    cortes.append(duracao)
+    return [(inicio, fim - inicio) for inicio, fim in zip(cortes, cortes[1:])]
+
+
+def _comando_ffmpeg(argumentos: list[str]) -> list[str]:
+    return [caminho_ffmpeg(), "-hide_banner", "-loglevel", "error", "-nostdin", "-y", *argumentos]
+
+
+def _executar_ffmpeg(argumentos: list[str]) -> None:
+    processo = subprocess.run(
+        _comando_ffmpeg(argumentos),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    if processo.returncode != 0:
+        raise RuntimeError(processo.stderr.decode(errors="replace").strip() or "Falha no ffmpeg")
+
+
+class GrupoFfmpeg:
+    """
+    Processos do ffmpeg de uma conversão, encerrados juntos se ela falhar ou for cancelada.
+
+    Assim um segmento com erro, ou o cancelamento da tarefa, não deixa os outros
+    segmentos ocupando os núcleos e gravando em um diretório que já foi liberado.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._processos: set[subprocess.Popen] = set()
+        self._encerrado = False
+
+    def executar(self, argumentos: list[str]) -> None:
+        """
+        Executa o ffmpeg e espera o término.
+
+        Params:
+            argumentos (list[str]): Argumentos do ffmpeg.
+
+        Raises:
+            RuntimeError: Se o ffmpeg terminar com erro ou o grupo tiver sido encerrado.
+        """
+        with self._lock:
+            if self._encerrado:
+                raise RuntimeError("Conversão interrompida.")
+            processo = subprocess.Popen(
+                _comando_ffmpeg(argumentos),
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+            self._processos.add(processo)
+        try:
+            _, erros = processo.communicate()
+        finally:
+            with self._lock:
+                self._processos.discard(processo)
+        if processo.returncode != 0:
+            raise RuntimeError(erros.decode(errors="replace").strip() or "Falha no ffmpeg")
+
+    def encerrar(self) -> None:
+        """
+        Mata os processos em andamento e impede que novos sejam iniciados.
+        """
+        with self._lock:
+            self._encerrado = True
+            for processo in self._processos:
+                processo.kill()
+
+
+def transcodificar_segmento_video(
+    caminho_entrada: str,
+    caminho_saida: str,
+    inicio: float,
+    duracao: float,
+    argumentos_codificador: list[str],
+    executar: Callable[[list[str]], None] = _executar_ffmpeg,
+) -> str:
+    """
+    Converte só o vídeo de um trecho que começa em um quadro-chave.
+
+    Params:
+        caminho_entrada (str): Caminho do vídeo original.
+        caminho_saida (str): Caminho do segmento convertido (Matroska).
+        inicio (float): Início do trecho em segundos (um quadro-chave).
+        duracao (float): Duração do trecho em segundos.
+        argumentos_codificador (list[str]): Codec e parâmetros do ffmpeg.
+        executar (Callable[[list[str]], None], optional): Executa o ffmpeg (ver
+            GrupoFfmpeg). Defaults to _executar_ffmpeg.
+
+    Returns:
+        str: Caminho do segmento convertido.
+
+    Raises:
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    executar([
+        "-ss", f"{inicio:.6f}",
+        "-i", caminho_entrada,
+        "-t", f"{duracao:.6f}",
+        "-map", "0:v:0",
+        "-an",
+        *argumentos_codificador,
+        "-pix_fmt", "yuv420p",
+        "-f", "matroska",
+        caminho_saida,
+    ])
+    return caminho_saida
+
+
+def transcodificar_audio_video(
+    caminho_entrada: str,
+    caminho_saida: str,
+    formato: str,
+    executar: Callable[[list[str]], None] = _executar_ffmpeg,
+) -> str:
+    """
+    Converte só a trilha de áudio de um vídeo.
+
+    Params:
+        caminho_entrada (str): Caminho do vídeo original.
+        caminho_saida (str): Caminho da trilha convertida (Matroska).
+        formato (str): Formato de vídeo de destino (ver FORMATOS_VIDEO).
+        executar (Callable[[list[str]], None], optional): Executa o ffmpeg (ver
+            GrupoFfmpeg). Defaults to _executar_ffmpeg.
+
+    Returns:
+        str: Caminho da trilha convertida.
+
+    Raises:
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    executar([
+        "-i", caminho_entrada,
+        "-map", "0:a:0",
+        "-vn",
+        *CODECS_AUDIO_SEGMENTOS[formato],
+        "-f", "matroska",
+        caminho_saida,
+    ])
+    return caminho_saida
+
+
+def converter_video_paralelo(
+    caminho_entrada: str,
+    caminho_saida: str,
+    formato: str,
+    perfil: str = "equilibrado",
+    ao_progredir: Callable[[float, str], None] | None = None,
+    diretorio_temporario: str | None = None,
+) -> MedicaoConversao:
+    """
+    Converte um vídeo dividindo-o em segmentos convertidos em paralelo.
+
+    O vídeo é cortado nos quadros-chave, então cada segmento começa em um quadro
+    independente e pode ser convertido por um ffmpeg próprio sem depender dos
+    outros. O áudio é convertido à parte, ao mesmo tempo, e no final os segmentos
+    e o áudio são unidos sem recodificar. Se uma parte falhar ou a conversão for
+    interrompida, os ffmpeg ainda em andamento são encerrados. Quando só o contêiner muda, ou quando não
+    há quadros-chave suficientes, usa converter_video.
+
+    Params:
+        caminho_entrada (str): Caminho do vídeo original.
+        caminho_saida (str): Caminho onde o vídeo convertido será gravado.
+        formato (str): Formato de destino (ver FORMATOS_VIDEO).
+        perfil (str, optional): Perfil de codificação (ver PERFIS_VIDEO). Defaults to "equilibrado".
+        ao_progredir (Callable[[float, str], None], optional): Recebe a fração de
+            segmentos concluídos e uma mensagem. Uma exceção lançada por ela
+            interrompe a conversão. Defaults to None.
+        diretorio_temporario (str, optional): Onde gravar os segmentos. Defaults to None (temporário do sistema).
+
+    Returns:
+        MedicaoConversao: Método usado, duração do vídeo, quadros e tempo gasto.
+    """
+    inicio = time.perf_counter()
+    try:
+        info = sondar_midia(caminho_entrada)
+        quadros_chave = listar_quadros_chave(caminho_entrada)
+    except RuntimeError as ex:
+        logger.warning(f"Não foi possível sondar o vídeo, convertendo sem segmentos: {ex}")
+        return converter_video(caminho_entrada, caminho_saida, formato, perfil, ao_progredir)
+
+    duracao = info.duracao or 0.0
+    quantidade = min(MAX_PROCESSOS, int(duracao // DURACAO_MINIMA_SEGMENTO_VIDEO))
+    segmentos = (
+        planejar_segmentos_video(duracao, quantidade, quadros_chave, info.inicio) if quadros_chave else []
+    )
+    if len(segmentos) < 2 or pode_copiar_fluxos(caminho_entrada, formato, info):
+        return converter_video(caminho_entrada, caminho_saida, formato, perfil, ao_progredir)
+
+    # As threads do codificador são divididas entre os segmentos simultâneos
+    parametros = parametros_codificador(formato, perfil)
+    parametros["threads"] = max(1, parametros["threads"] // len(segmentos))
+    argumentos_codificador = _argumentos_codificador(parametros)
+    tem_audio = bool(info.fluxos_do_tipo("audio"))
+    videos = info.fluxos_do_tipo("video")
+    quadros = round(duracao * (videos[0].quadros_por_segundo or 0))
+
+    with tempfile.TemporaryDirectory(dir=diretorio_temporario) as diretorio:
+        caminhos = [os.path.join(diretorio, f"segmento_{n:03d}.mkv") for n in range(len(segmentos))]
+        caminho_audio = os.path.join(diretorio, "audio.mkv")
+        grupo = GrupoFfmpeg()
+        tarefas = [
+            (transcodificar_segmento_video, caminho_entrada, caminho, inicio_segmento, duracao_segmento, argumentos_codificador, grupo.executar)
+            for caminho, (inicio_segmento, duracao_segmento) in zip(caminhos, segmentos)
+        ]
+        if tem_audio:
+            tarefas.append((transcodificar_audio_video, caminho_entrada, caminho_audio, formato, grupo.executar))
+
+        if ao_progredir:
+            ao_progredir(0.0, f"Convertendo {len(segmentos)} segmentos")
+        # As threads só esperam o ffmpeg, que faz o trabalho em processos próprios
+        executor = ThreadPoolExecutor(max_workers=MAX_PROCESSOS, thread_name_prefix="segmento")
+        try:
+            pendentes = {executor.submit(*tarefa) for tarefa in tarefas}
+            concluidas = 0
+            while pendentes:
+                # Informa o progresso mesmo sem partes novas, para notar logo um cancelamento
+                prontos, pendentes = wait(pendentes, timeout=1.0, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    futuro.result()
+                    concluidas += 1
+                if ao_progredir:
+                    ao_progredir(concluidas / len(tarefas), f"{concluidas} de {len(tarefas)} partes convertidas")
+        finally:
+            # Em caso de erro ou cancelamento, nenhum ffmpeg continua rodando depois
+            # que o diretório temporário e a reserva de espaço forem liberados
+            grupo.encerrar()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        lista = os.path.join(diretorio, "segmentos.txt")
+        with open(lista, "w") as arquivo:
+            for caminho in caminhos:
+                arquivo.write(f"file '{caminho}'\n")
+        _executar_ffmpeg([
+            "-f", "concat",
+            "-safe", "0",
+            "-i", lista,
+            *(["-i", caminho_audio] if tem_audio else []),
+            "-map", "0:v",
+            *(["-map", "1:a"] if tem_audio else []),
+            "-c", "copy",
+            *(["-movflags", "+faststart"] if formato in ("mp4", "mov") else []),
+            "-f", MUXERS[formato],
+            caminho_saida,
+        ])
+
+    return MedicaoConversao(
+        metodo="segmentos",
+        duracao_video=duracao,
+        quadros=quadros,
+        tempo_s=time.perf_counter() - inicio,
+    )
+
+
+def extrair_quadro(caminho: str, instante: float, largura: int = LARGURA_QUADRO_FOLHA) -> Image.Image:
+    """
+    Extrai o quadro-chave mais próximo antes do instante, já reduzido.
+
+    Sem busca precisa, o ffmpeg decodifica só o quadro-chave em que a busca para,
+    em vez de todos os quadros até o instante pedido.
+
+    Params:
+        caminho (str): Caminho do vídeo.
+        instante (float): Instante em segundos.
+        largura (int, optional): Largura do quadro em pixels. Defaults to LARGURA_QUADRO_FOLHA.
+
+    Returns:
+        Image.Image: Quadro extraído.
+
+    Raises:
+        RuntimeError: Se o ffmpeg terminar com erro.
+    """
+    processo = subprocess.run(
+        [
+            caminho_ffmpeg(),
+            "-hide_banner",
+            "-loglevel", "error",
+            "-nostdin",
+            "-noaccurate_seek",
+            "-skip_frame", "nokey",
+            "-ss", f"{instante:.3f}",
+            "-i", caminho,
+            "-frames:v", "1",
+            "-vf", f"scale={largura}:-2",
+            "-f", "image2pipe",
+            "-c:v", "png",
+            "pipe:1",
+        ],
+        capture_output=True,
+    )
+    if processo.returncode != 0 or not processo.stdout:
+        raise RuntimeError(processo.stderr.decode(errors="replace").strip() or "Falha no ffmpeg")
+    return Image.open(BytesIO(processo.stdout))
+
+
+def gerar_folha_contato(
+    caminho: str,
+    duracao: float | None,
+    quantidade: int = QUADROS_FOLHA_CONTATO,
+    colunas: int = COLUNAS_FOLHA_CONTATO,
+) -> bytes:
+    """
+    Monta uma folha de contato com quadros distribuídos ao longo do vídeo.
+
+    Os instantes são espaçados igualmente na duração, e cada quadro é extraído por
+    um ffmpeg que busca direto no quadro-chave anterior (ver extrair_quadro), em
+    paralelo. Assim não é preciso listar os quadros-chave do arquivo inteiro. No
+    servidor todo, no máximo MAX_PROCESSOS desses ffmpeg rodam ao mesmo tempo.
+
+    Params:
+        caminho (str): Caminho do vídeo.
+        duracao (float | None): Duração do vídeo em segundos (ver sondar_midia).
+        quantidade (int, optional): Quantidade de quadros. Defaults to QUADROS_FOLHA_CONTATO.
+        colunas (int, optional): Quadros por linha. Defaults to COLUNAS_FOLHA_CONTATO.
+
+    Returns:
+        bytes: Folha de contato em JPEG.
+    """
+    instantes = [duracao * n / quantidade for n in range(quantidade)] if duracao else [0.0]
+
+    def extrair(instante: float) -> Image.Image:
+        with _vagas_extracao_quadros:
+            return extrair_quadro(caminho, instante)
+
+    with ThreadPoolExecutor(max_workers=min(len(instantes), MAX_PROCESSOS)) as executor:
+        quadros = list(executor.map(extrair, instantes))
+
+    largura = max(quadro.width for quadro in quadros)
+    altura = max(quadro.height for quadro in quadros)
+    linhas = -(-len(quadros) // colunas)
+    folha = Image.new("RGB", (largura * min(colunas, len(quadros)), altura * linhas))
+    for n, quadro in enumerate(quadros):
+        folha.paste(quadro.convert("RGB"), ((n % colunas) * largura, (n // colunas) * altura))
+    folha_bytes = BytesIO()
+    folha.save(folha_bytes, format="jpeg", quality=85)
+    return folha_bytes.getvalue()